@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the per-request overhead of the rate limiters.
+
+Runs check_for_delay(), as RateLimitingMiddleware does for each request,
+against the default limits plus a few route specific ones, for requests
+spread over a number of users. The cost of get_limits(), which is only paid
+by the limits API, is measured separately.
+
+    python tools/limits-benchmark.py [--users N] [--requests N]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from trove.common import limits
+
+ROUTES = [
+    ("GET", "/v1.0/%(tenant)s/instances"),
+    ("POST", "/v1.0/%(tenant)s/instances"),
+    ("GET", "/v1.0/%(tenant)s/instances/7f1e/databases"),
+    ("PUT", "/v1.0/%(tenant)s/instances/7f1e"),
+    ("DELETE", "/v1.0/%(tenant)s/backups/e50c"),
+    ("POST", "/mgmt/instances/7f1e/action"),
+]
+
+EXTRA_LIMITS = (
+    "(POST, */instances, ^/v1.0/[^/]+/instances$, 50, MINUTE);"
+    "(POST, */backups, ^/v1.0/[^/]+/backups, 20, HOUR);"
+    "(GET, */databases, .*/databases, 500, MINUTE);"
+    "(DELETE, */backups/*, ^/v1.0/[^/]+/backups/.+, 100, MINUTE)")
+
+
+def run(limiter, users, requests):
+    checks = []
+    for i in range(requests):
+        user = 'tenant-%d' % (i % users)
+        verb, url = ROUTES[i % len(ROUTES)]
+        checks.append((verb, url % {'tenant': user}, user))
+    start = time.time()
+    for verb, url, user in checks:
+        limiter.check_for_delay(verb, url, user)
+    check_time = (time.time() - start) / requests
+    start = time.time()
+    for verb, url, user in checks:
+        limiter.get_limits(user)
+    return check_time, (time.time() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=50000)
+    args = parser.parse_args()
+
+    rules = limits.DEFAULT_LIMITS + limits.Limiter.parse_limits(EXTRA_LIMITS)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        limiters = [
+            ('Limiter', limits.Limiter(rules)),
+            ('BucketLimiter (memory)', limits.BucketLimiter(rules)),
+            ('BucketLimiter (sqlite)', limits.BucketLimiter(
+                rules, store='trove.common.limits.SQLiteBucketStore',
+                store_path=os.path.join(tmp_dir, 'limits.sqlite'))),
+        ]
+        print("%d limits, %d users, %d requests" %
+              (len(rules), args.users, args.requests))
+        print("%-24s %12s %12s" % ('', 'check (us)', 'limits (us)'))
+        for name, limiter in limiters:
+            check_time, limits_time = run(limiter, args.users, args.requests)
+            print("%-24s %12.1f %12.1f" %
+                  (name, check_time * 1e6, limits_time * 1e6))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the per-request overhead of the API request validation.
+
+Validates representative request bodies against their API schema, as
+Controller.validate_request does for each request: with a jsonschema
+validator built for each request, with one built once, and with the
+compiled validator the API uses.
+
+    python tools/schema-validation-benchmark.py [--requests N] [--nodes N]
+"""
+
+import argparse
+import time
+
+import jsonschema
+
+from trove.common import apischema
+from trove.common import schema_validator
+
+
+def instance_create():
+    return {"instance": {
+        "name": "db-1", "flavorRef": "7", "volume": {"size": 2},
+        "datastore": {"type": "mysql", "version": "5.7"},
+        "databases": [{"name": "db%d" % i} for i in range(3)],
+        "users": [{"name": "user%d" % i, "password": "secret",
+                   "databases": [{"name": "db0"}]} for i in range(3)],
+        "nics": [{"net-id": "1a8a5a8e-1c1e-4a94-9bd1-3b5b4b2b2c3d"}],
+        "availability_zone": "nova", "locality": "anti-affinity"}}
+
+
+def cluster_create(nodes):
+    return {"cluster": {
+        "name": "cluster-1",
+        "datastore": {"type": "mongodb", "version": "3.4"},
+        "instances": [{"flavorRef": "7", "volume": {"size": 2},
+                       "availability_zone": "nova",
+                       "nics": [{"net-id":
+                                 "1a8a5a8e-1c1e-4a94-9bd1-3b5b4b2b2c3d"}]}
+                      for i in range(nodes)],
+        "locality": "anti-affinity"}}
+
+
+def users_create(count):
+    return {"users": [{"name": "user%d" % i, "password": "secret",
+                       "host": "%", "databases": [{"name": "db%d" % i}]}
+                      for i in range(count)]}
+
+
+def databases_create(count):
+    return {"databases": [{"name": "db%d" % i, "character_set": "utf8",
+                           "collate": "utf8_general_ci"}
+                          for i in range(count)]}
+
+
+def run(validate, schema, body, requests):
+    start = time.time()
+    for i in range(requests):
+        validate(schema, body)
+    return (time.time() - start) / requests
+
+
+def per_request(schema, body):
+    return jsonschema.Draft4Validator(schema).is_valid(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--nodes', type=int, default=50)
+    args = parser.parse_args()
+
+    cases = [
+        ('instance create', apischema.instance['create'], instance_create()),
+        ('cluster create', apischema.cluster['create'],
+         cluster_create(args.nodes)),
+        ('users create', apischema.user['create'], users_create(args.nodes)),
+        ('databases create', apischema.dbschema['create'],
+         databases_create(args.nodes)),
+    ]
+    methods = [
+        ('per request', per_request),
+        ('built once',
+         lambda schema, body: validators[id(schema)].is_valid(body)),
+        ('compiled', lambda schema, body: schema_validator.get_validator(
+            schema).is_valid(body)),
+    ]
+    validators = dict((id(schema), jsonschema.Draft4Validator(schema))
+                      for name, schema, body in cases)
+    for name, schema, body in cases:
+        assert schema_validator.get_validator(schema).is_valid(body), name
+
+    print("%d requests, %d nodes/users/databases" %
+          (args.requests, args.nodes))
+    print("%-18s" % '' + ''.join("%18s" % ('%s (us)' % method)
+                                 for method, validate in methods))
+    for name, schema, body in cases:
+        print("%-18s" % name + ''.join(
+            "%18.1f" % (run(validate, schema, body, args.requests) * 1e6)
+            for method, validate in methods))
+
+
+if __name__ == '__main__':
+    main()
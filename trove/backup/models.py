@@ -14,18 +14,25 @@
 
 """Model classes that form the core of snapshots functionality."""
 
+import json
+import uuid
+
 from oslo_log import log as logging
 from requests.exceptions import ConnectionError
-from sqlalchemy import desc
+from sqlalchemy import or_
 from swiftclient.client import ClientException
 
 from trove.backup.state import BackupState
 from trove.common import cfg
 from trove.common import exception
 from trove.common.i18n import _
+from trove.common import pagination
 from trove.common.remote import create_swift_client
+from trove.common.strategies.storage.swift import is_chunk_manifest
+from trove.common import timeutils
 from trove.common import utils
 from trove.datastore import models as datastore_models
+from trove.db import get_db_api
 from trove.db.models import DatabaseModelBase
 from trove.quota.quota import run_with_quotas
 from trove.taskmanager import api
@@ -164,22 +171,20 @@ class Backup(object):
     @classmethod
     def _paginate(cls, context, query):
         """Paginate the results of the base query.
-        We use limit/offset as the results need to be ordered by date
-        and not the primary key.
+        The results are ordered by date, most recent first, and the pages
+        are sought by date and id, as given by the opaque marker.
         """
-        marker = int(context.marker or 0)
+        marker = None
+        if context.marker:
+            marker = pagination.decode_marker(context.marker)
         limit = int(context.limit or CONF.backups_page_size)
         # order by 'updated DESC' to show the most recent backups first
-        query = query.order_by(desc(DBBackup.updated))
-        # Apply limit/offset
-        query = query.limit(limit)
-        query = query.offset(marker)
-        # check if we need to send a marker for the next page
-        if query.count() < limit:
-            marker = None
-        else:
-            marker += limit
-        return query.all(), marker
+        backups, next_marker = get_db_api().find_page(
+            query, [(DBBackup.updated, True), (DBBackup.id, True)],
+            limit, marker)
+        if next_marker:
+            next_marker = pagination.encode_marker(next_marker)
+        return backups, next_marker
 
     @classmethod
     def list(cls, context, datastore=None):
@@ -295,8 +300,152 @@ class Backup(object):
             raise exception.SwiftConnectionError()
 
 
+class BackupChunks(object):
+    """Reference counting of the chunks shared by deduplicated backups.
+
+    The chunk manifests written by DedupSwiftStorage are counted the first
+    time a backup of their tenant is deleted after they completed, so each
+    manifest is only read once to be counted and once more when its own
+    backup is deleted. Chunks nothing references any more are deleted,
+    unless a backup of the tenant is running, or started since the chunks
+    were counted, and may be reusing them; they are then left for the next
+    deletion to collect.
+    """
+
+    @classmethod
+    def delete(cls, client, backup, container, filename):
+        """Delete a chunk manifest and the chunks no other backup uses."""
+        tenant_id = backup.tenant_id
+        # Taken first, so that backups completing from now on are counted
+        # below before anything is collected, and backups started from now
+        # on stop the collection.
+        since = timeutils.utcnow()
+        running = cls._running(tenant_id, since)
+        cls._count(client, tenant_id, container, exclude=backup.id)
+
+        chunks = cls._load_chunks(client, tenant_id, container, filename)
+        get_db_api().update_counters(
+            DBBackupChunk, 'refcount', dict.fromkeys(chunks, -1),
+            guard=(DBBackup, [DBBackup.id == backup.id,
+                              DBBackup.chunks_counted.is_(True)],
+                   {'chunks_counted': False}))
+        # Chunks no counted backup references get a zero count, so that
+        # they are collected even if that cannot happen right now.
+        existing = cls._existing(chunks)
+        inserts = [cls._row(chunk_id, tenant_id, container, name, 0)
+                   for chunk_id, name in chunks.items()
+                   if chunk_id not in existing]
+        if inserts:
+            get_db_api().bulk_save(DBBackupChunk, inserts=inserts)
+        LOG.debug("Deleting chunk manifest %(cont)s/%(filename)s.",
+                  {'cont': container, 'filename': filename})
+        client.delete_object(container, filename)
+
+        if running:
+            LOG.info("Not deleting unreferenced backup chunks while "
+                     "%d backups are running.", running)
+        else:
+            cls._sweep(client, tenant_id, container, since)
+
+    @classmethod
+    def _running(cls, tenant_id, since):
+        """Count the backups of a tenant which are running, or were started
+        since the given time, and so may reuse any chunk.
+        """
+        return DBBackup.query().filter(
+            DBBackup.tenant_id == tenant_id,
+            or_(DBBackup.state.in_(BackupState.RUNNING_STATES),
+                DBBackup.created >= since)).filter_by(deleted=False).count()
+
+    @classmethod
+    def _count(cls, client, tenant_id, container, exclude):
+        """Count the chunk references of the backups not counted yet."""
+        query = DBBackup.query().filter(
+            DBBackup.tenant_id == tenant_id,
+            DBBackup.id != exclude,
+            DBBackup.chunks_counted.isnot(True))
+        query = query.filter_by(deleted=False, state=BackupState.COMPLETED)
+        for backup in query.all():
+            chunks = {}
+            filename = backup.location and backup.location.split('/')[-1]
+            if filename:
+                try:
+                    headers = client.head_object(container, filename)
+                    if is_chunk_manifest(headers):
+                        chunks = cls._load_chunks(client, tenant_id,
+                                                  container, filename)
+                except ClientException as e:
+                    if e.http_status != 404:
+                        raise
+            existing = cls._existing(chunks)
+            inserts = [cls._row(chunk_id, tenant_id, container, name, 0)
+                       for chunk_id, name in chunks.items()
+                       if chunk_id not in existing]
+            get_db_api().update_counters(
+                DBBackupChunk, 'refcount', dict.fromkeys(chunks, 1),
+                inserts=inserts,
+                guard=(DBBackup, [DBBackup.id == backup.id,
+                                  DBBackup.chunks_counted.isnot(True)],
+                       {'chunks_counted': True}))
+            LOG.debug("Counted %(count)d chunks of backup %(id)s.",
+                      {'count': len(chunks), 'id': backup.id})
+
+    @classmethod
+    def _sweep(cls, client, tenant_id, container, since):
+        garbage = DBBackupChunk.find_all(tenant_id=tenant_id,
+                                         container=container,
+                                         refcount=0).all()
+        deleted = 0
+        for chunk in garbage:
+            # Checked again before each chunk, as a backup started after
+            # the chunks were counted may have found the chunk and skipped
+            # uploading it.
+            running = cls._running(tenant_id, since)
+            if running:
+                LOG.info("Not deleting unreferenced backup chunks any "
+                         "more, %d backups were started.", running)
+                break
+            try:
+                client.delete_object(container, chunk.name)
+            except ClientException as e:
+                if e.http_status != 404:
+                    raise
+            DBBackupChunk.find_all(id=chunk.id, refcount=0).delete()
+            deleted += 1
+        LOG.info("Deleted %d unreferenced backup chunks.", deleted)
+
+    @classmethod
+    def _load_chunks(cls, client, tenant_id, container, filename):
+        """Return the distinct chunks of a manifest, by row id."""
+        _headers, manifest = client.get_object(container, filename)
+        if isinstance(manifest, bytes):
+            manifest = manifest.decode('utf-8')
+        chunks = {}
+        for chunk in json.loads(manifest):
+            name = chunk['name'].lstrip('/').split('/', 1)[1]
+            chunks[DBBackupChunk.chunk_id(tenant_id, container, name)] = name
+        return chunks
+
+    @classmethod
+    def _existing(cls, chunk_ids):
+        chunk_ids = list(chunk_ids)
+        existing = set()
+        for start in range(0, len(chunk_ids), 500):
+            query = DBBackupChunk.query().filter(
+                DBBackupChunk.id.in_(chunk_ids[start:start + 500]))
+            existing.update(chunk.id for chunk in query.all())
+        return existing
+
+    @classmethod
+    def _row(cls, chunk_id, tenant_id, container, name, refcount):
+        now = timeutils.utcnow()
+        return {'id': chunk_id, 'tenant_id': tenant_id,
+                'container': container, 'name': name,
+                'refcount': refcount, 'created': now, 'updated': now}
+
+
 def persisted_models():
-    return {'backups': DBBackup}
+    return {'backups': DBBackup, 'backup_chunks': DBBackupChunk}
 
 
 class DBBackup(DatabaseModelBase):
@@ -305,7 +454,7 @@ class DBBackup(DatabaseModelBase):
                     'size', 'tenant_id', 'state', 'instance_id',
                     'checksum', 'backup_timestamp', 'deleted', 'created',
                     'updated', 'deleted_at', 'parent_id',
-                    'datastore_version_id']
+                    'datastore_version_id', 'chunks_counted']
     _table_name = 'backups'
 
     @property
@@ -366,3 +515,15 @@ class DBBackup(DatabaseModelBase):
                 return False
             else:
                 raise exception.SwiftAuthError(tenant_id=context.tenant)
+
+
+class DBBackupChunk(DatabaseModelBase):
+    """A table for the reference counts of deduplicated backup chunks."""
+    _data_fields = ['tenant_id', 'container', 'name', 'refcount',
+                    'created', 'updated']
+    _table_name = 'backup_chunks'
+
+    @staticmethod
+    def chunk_id(tenant_id, container, name):
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, '%s/%s/%s' %
+                              (tenant_id, container, name)))
@@ -23,6 +23,7 @@ from trove.cluster.tasks import ClusterTask
 from trove.cluster.tasks import ClusterTasks
 from trove.common import cfg
 from trove.common import exception
+from trove.common import fanout
 from trove.common.i18n import _
 from trove.common.notification import (
     DBaaSClusterAttachConfiguration,
@@ -55,6 +56,7 @@ LOG = logging.getLogger(__name__)
 def persisted_models():
     return {
         'clusters': DBCluster,
+        'cluster_rolls': DBClusterRoll,
     }
 
 
@@ -90,6 +92,71 @@ class DBCluster(dbmodels.DatabaseModelBase):
         self.task_id = task_status.code
 
 
+class ClusterRollStatus(object):
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+    SUPERSEDED = 'SUPERSEDED'
+
+
+class ClusterRoll(object):
+
+    @staticmethod
+    def start(cluster_id, operation, datastore_version_id=None,
+              resume_failed=False):
+        """Start a rolling operation on the nodes of a cluster, or resume
+        an unfinished one.
+
+        An operation still RUNNING was interrupted, the task manager having
+        stopped before it could finish; it is resumed by the next one of
+        the same kind, to the same datastore version, which then skips the
+        nodes already done. So is an operation which FAILED, if the caller
+        asks for it. Any other unfinished operation of the kind is marked
+        SUPERSEDED, and the new one is run on all the nodes.
+        """
+        unfinished = DBClusterRoll.query().filter(
+            DBClusterRoll.cluster_id == cluster_id,
+            DBClusterRoll.operation == operation,
+            DBClusterRoll.status.in_([ClusterRollStatus.RUNNING,
+                                      ClusterRollStatus.FAILED])).order_by(
+            DBClusterRoll.created.desc()).all()
+        roll = None
+        if unfinished and (
+                unfinished[0].datastore_version_id == datastore_version_id
+                and (unfinished[0].status == ClusterRollStatus.RUNNING or
+                     resume_failed)):
+            roll = unfinished.pop(0)
+        for stale in unfinished:
+            stale.update(status=ClusterRollStatus.SUPERSEDED)
+        if roll:
+            LOG.info("Resuming %(operation)s %(roll)s of cluster "
+                     "%(cluster)s (%(done)d nodes already done).",
+                     {'operation': operation, 'roll': roll.id,
+                      'cluster': cluster_id,
+                      'done': len(roll.completed_ids)})
+            roll.update(status=ClusterRollStatus.RUNNING)
+            return roll
+        return DBClusterRoll.create(
+            cluster_id=cluster_id, operation=operation,
+            datastore_version_id=datastore_version_id,
+            status=ClusterRollStatus.RUNNING, total=0, completed='')
+
+
+class DBClusterRoll(dbmodels.DatabaseModelBase):
+    _data_fields = ['cluster_id', 'operation', 'datastore_version_id',
+                    'status', 'total', 'completed', 'created', 'updated']
+    _table_name = 'cluster_rolls'
+
+    @property
+    def completed_ids(self):
+        """The ids of the nodes the operation is done on."""
+        return [node_id for node_id in (self.completed or '').split(',')
+                if node_id]
+
+    def add_completed(self, node_ids):
+        self.update(completed=','.join(self.completed_ids + list(node_ids)))
+
+
 class Cluster(object):
     DEFAULT_LIMIT = CONF.clusters_page_size
 
@@ -428,8 +495,10 @@ class Cluster(object):
         try:
             configuration = config_models.Configuration.find(
                 self.context, configuration_id, self.datastore_version.id)
-            instances = [inst_models.Instance.load(self.context, instance.id)
-                         for instance in self.instances]
+            instances = fanout.fan_out(
+                lambda instance: inst_models.Instance.load(self.context,
+                                                           instance.id),
+                self.instances)
 
             LOG.debug("Persisting changes on cluster nodes.")
             # Allow re-applying the same configuration (e.g. on configuration
@@ -468,8 +537,9 @@ class Cluster(object):
                 if apply_on_all:
                     LOG.debug(
                         "Applying the changes to the remaining nodes.")
-                    for instance in remaining_nodes:
-                        instance.apply_configuration(configuration)
+                    fanout.fan_out(
+                        lambda instance: instance.apply_configuration(
+                            configuration), remaining_nodes)
                 else:
                     LOG.debug(
                         "Releasing restart-required task on the remaining "
@@ -18,6 +18,7 @@ from oslo_log import log as logging
 from trove.common import cfg
 from trove.common.strategies.cluster import strategy
 from trove.common.views import create_links
+from trove.common import wsgi
 from trove.instance.views import InstanceDetailView
 
 LOG = logging.getLogger(__name__)
@@ -124,10 +125,8 @@ class ClustersView(object):
         self.req = req
 
     def data(self):
-        data = []
-        for cluster in self.clusters:
-            data.append(self.data_for_cluster(cluster))
-        return {'clusters': data}
+        return {'clusters': wsgi.LazyList(self.clusters,
+                                          self.data_for_cluster)}
 
     def data_for_cluster(self, cluster):
         view = load_view(cluster, req=self.req, load_servers=False)
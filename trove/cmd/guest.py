@@ -17,6 +17,7 @@ import sys
 
 from oslo_config import cfg as openstack_cfg
 from oslo_log import log as logging
+from oslo_privsep import priv_context
 from oslo_service import service as openstack_service
 
 from trove.common import cfg
@@ -37,6 +38,8 @@ def main():
     cfg.parse_args(sys.argv)
     logging.setup(CONF, None)
     debug_utils.setup()
+    if CONF.privsep_file_operations:
+        priv_context.init(root_helper=['sudo'])
 
     from trove.guestagent import dbaas
     manager = dbaas.datastore_registry().get(CONF.datastore_manager)
@@ -145,7 +145,7 @@ class Commands(object):
             dsmetadata = datastore_models.DatastoreVersionMetadata
             vtlist = dsmetadata.list_datastore_volume_type_associations(
                 datastore_name, datastore_version_name)
-            if vtlist.count() > 0:
+            if vtlist:
                 for volume_type in vtlist:
                     print("Datastore: %s, Version: %s, Volume Type: %s" %
                           (datastore_name, datastore_version_name,
@@ -22,9 +22,11 @@ eventlet.patcher.monkey_patch(all=False, socket=True)
 
 import datetime
 import errno
+import itertools
 import socket
 import sys
 import time
+import types
 
 import eventlet.wsgi
 from oslo_config import cfg
@@ -44,6 +46,12 @@ from trove.common.i18n import _
 from trove.common.utils import req_to_text
 from trove.common import xmlutils
 
+try:
+    # A faster JSON encoder, used when installed.
+    import orjson
+except ImportError:
+    orjson = None
+
 socket_opts = [
     cfg.IntOpt('backlog',
                default=4096,
@@ -446,16 +454,129 @@ class DictSerializer(ActionDispatcher):
         return ""
 
 
+class LazyList(object):
+    """A list of a response whose items are only made as the response is
+    written, one at a time, so that a long list is never held in memory as
+    a whole, neither as views nor as JSON.
+
+    The first item is made before the response is started, see
+    render_first, so that a view failing on every item fails the request
+    with the error of the view.
+
+    :param items: the objects the list is made from
+    :param view: called with each of them, returns the item of the list
+    """
+
+    def __init__(self, items, view):
+        self.items = items
+        self.view = view
+        self._first = None
+
+    def render_first(self):
+        """Make the first item now, rather than as the list is written."""
+        if self._first is None:
+            self._first = [self.view(item)
+                           for item in itertools.islice(self.items, 1)]
+
+    def __iter__(self):
+        self.render_first()
+        for item in self._first:
+            yield item
+        for item in itertools.islice(self.items, len(self._first), None):
+            yield self.view(item)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _json_sanitizer(obj):
+    if isinstance(obj, datetime.datetime):
+        _dtime = obj - datetime.timedelta(microseconds=obj.microsecond)
+        return _dtime.isoformat()
+    return obj
+
+
+if orjson is not None:
+    def _json_dumps(data):
+        return orjson.dumps(data, default=_json_sanitizer,
+                            option=(orjson.OPT_PASSTHROUGH_DATETIME |
+                                    orjson.OPT_NON_STR_KEYS))
+    _JSON_ITEM_SEPARATOR = b','
+    _JSON_KEY_SEPARATOR = b':'
+else:
+    def _json_dumps(data):
+        return jsonutils.dump_as_bytes(data, default=_json_sanitizer)
+    _JSON_ITEM_SEPARATOR = b', '
+    _JSON_KEY_SEPARATOR = b': '
+
+
 class JSONDictSerializer(DictSerializer):
-    """Default JSON request body serialization."""
+    """Default JSON request body serialization.
+
+    A response with LazyLists is serialized as it is written: the body is
+    then returned as a generator of chunks of at least chunk_size bytes,
+    rather than as bytes. The first item of each list is serialized before
+    the generator is returned, so that errors common to all the items are
+    raised by serialize; errors on later items are logged and raised by
+    the generator, for the server to drop the connection rather than end
+    the response.
+    """
+
+    chunk_size = 65536
 
     def default(self, data):
-        def sanitizer(obj):
-            if isinstance(obj, datetime.datetime):
-                _dtime = obj - datetime.timedelta(microseconds=obj.microsecond)
-                return _dtime.isoformat()
-            return obj
-        return jsonutils.dump_as_bytes(data, default=sanitizer)
+        if isinstance(data, dict) and any(
+                isinstance(value, LazyList) for value in data.values()):
+            lists = dict((key, self._iter_items(value))
+                         for key, value in data.items()
+                         if isinstance(value, LazyList))
+            return self._iter_chunks(self._iter_json(data, lists))
+        return _json_dumps(data)
+
+    def _iter_items(self, items):
+        """Return the items of a LazyList serialized, the first one
+        already.
+        """
+        items = iter(items)
+        for first in items:
+            return itertools.chain([_json_dumps(first)],
+                                   (_json_dumps(item) for item in items))
+        return iter([])
+
+    def _iter_chunks(self, pieces):
+        chunk = []
+        size = 0
+        try:
+            for piece in pieces:
+                chunk.append(piece)
+                size += len(piece)
+                if size >= self.chunk_size:
+                    yield b''.join(chunk)
+                    chunk = []
+                    size = 0
+        except Exception:
+            LOG.exception("Failed to serialize the rest of the response.")
+            raise
+        if chunk:
+            yield b''.join(chunk)
+
+    def _iter_json(self, data, lists):
+        yield b'{'
+        for index, (key, value) in enumerate(data.items()):
+            if index:
+                yield _JSON_ITEM_SEPARATOR
+            yield _json_dumps(key)
+            yield _JSON_KEY_SEPARATOR
+            if key not in lists:
+                yield _json_dumps(value)
+                continue
+            yield b'['
+            for item_index, item in enumerate(lists[key]):
+                if item_index:
+                    yield _JSON_ITEM_SEPARATOR
+                yield item
+            yield b']'
+        yield b'}'
 
 
 class XMLDictSerializer(DictSerializer):
@@ -502,6 +623,8 @@ class XMLDictSerializer(DictSerializer):
         if xmlns:
             result.setAttribute('xmlns', xmlns)
 
+        if isinstance(data, LazyList):
+            data = list(data)
         # TODO(bcwaldon): accomplish this without a type-check
         if type(data) is list:
             collections = metadata.get('list_collections', {})
@@ -600,7 +723,12 @@ class ResponseSerializer(object):
         response.headers['Content-Type'] = content_type
         if data is not None:
             serializer = self.get_body_serializer(content_type)
-            response.body = serializer.serialize(data, action)
+            body = serializer.serialize(data, action)
+            if isinstance(body, types.GeneratorType):
+                # Sent as it is serialized, with chunked transfer encoding.
+                response.app_iter = body
+            else:
+                response.body = body
 
     def get_body_serializer(self, content_type):
         try:
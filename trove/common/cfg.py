@@ -192,6 +192,39 @@ common_opts = [
     cfg.IntOpt('agent_heartbeat_expiry', default=60,
                help='Time (in seconds) after which a guest is considered '
                     'unreachable'),
+    cfg.BoolOpt('agent_heartbeat_delta', default=False,
+                help='Only send a heartbeat from the Guest Agent when the '
+                     'status of the database changes, plus one every half '
+                     'agent_heartbeat_expiry to show that the guest is alive. '
+                     'The status is also probed less often while the '
+                     'database keeps running.'),
+    cfg.IntOpt('agent_status_probe_max_interval', default=120,
+               help='Maximum time (in seconds) between two probes of the '
+                    'status of a running database, when '
+                    'agent_heartbeat_delta is enabled.'),
+    cfg.BoolOpt('status_probe_native', default=True,
+                help='Check that the database is up through a connection '
+                     'kept open by the Guest Agent, before falling back to '
+                     'running the client programs of the datastore.'),
+    cfg.IntOpt('status_probe_timeout', default=10,
+               help='Maximum time (in seconds) to wait for the database to '
+                    'answer a status probe.'),
+    cfg.BoolOpt('privsep_file_operations', default=False,
+                help='Run the root file operations of the Guest Agent '
+                     '(reading, writing, copying and changing the ownership '
+                     'or mode of files) in a long-running privileged helper '
+                     'process, instead of starting a sudo process for each '
+                     'of them. The helper is started through sudo the first '
+                     'time it is needed.'),
+    cfg.BoolOpt('agent_heartbeat_volume_stats', default=False,
+                help='Include the used and total size of the data volume in '
+                     'the status heartbeats of the Guest Agent, so that '
+                     'showing an instance does not have to ask the guest.'),
+    cfg.IntOpt('volume_stats_cache_expiry', default=300,
+               help='Time (in seconds) for which the volume usage reported '
+                    'in guest heartbeats is shown for an instance. Older '
+                    'values are refreshed from the guest. Set to 0 to always '
+                    'ask the guest.'),
     cfg.IntOpt('num_tries', default=3,
                help='Number of times to check if a volume exists.'),
     cfg.StrOpt('volume_fstype', default='ext3',
@@ -226,6 +259,15 @@ common_opts = [
     cfg.IntOpt('trove_conductor_workers',
                help='Number of workers for the Conductor service. The default '
                'will be the number of CPUs available.'),
+    cfg.BoolOpt('conductor_heartbeat_coalescing', default=False,
+                help='Buffer guest heartbeats in the Conductor and write them '
+                     'to the database in bulk, keeping only the most recent '
+                     'heartbeat of each instance, instead of writing every '
+                     'heartbeat as it arrives.'),
+    cfg.IntOpt('conductor_heartbeat_flush_interval', default=1000,
+               help='Interval (in milliseconds) at which buffered heartbeats '
+                    'are written to the database when '
+                    'conductor_heartbeat_coalescing is enabled.'),
     cfg.BoolOpt('use_nova_server_config_drive', default=True,
                 help='Use config drive for file injection when booting '
                 'instance.'),
@@ -235,6 +277,12 @@ common_opts = [
                help='The default datastore id or name to use if one is not '
                'provided by the user. If the default value is None, the field '
                'becomes required in the instance create request.'),
+    cfg.IntOpt('datastore_metadata_cache_ttl', default=10, min=0,
+               help='Seconds the datastores, versions, capabilities and '
+               'their flavor and volume type associations cached by each '
+               'process are used before checking whether they were '
+               'changed. A change made by the same process is seen '
+               'immediately. 0 checks on every lookup.'),
     cfg.StrOpt('datastore_manager', default=None,
                help='Manager class in the Guest Agent, set up by the '
                'Taskmanager on instance provision.'),
@@ -300,7 +348,8 @@ common_opts = [
                 'or equal to the size of the master volume '
                 'during replica creation.'),
     cfg.StrOpt('storage_strategy', default='SwiftStorage',
-               help="Default strategy to store backups."),
+               help="Default strategy to store backups. DedupSwiftStorage "
+               "stores the chunks that backups have in common only once."),
     cfg.StrOpt('storage_namespace',
                default='trove.common.strategies.storage.swift',
                help='Namespace to load the default storage strategy from.'),
@@ -312,6 +361,25 @@ common_opts = [
                 help='Encrypt backups using OpenSSL.'),
     cfg.StrOpt('backup_aes_cbc_key', default='default_aes_cbc_key',
                help='Default OpenSSL aes_cbc key.'),
+    cfg.StrOpt('backup_compression_codec', default='gzip',
+               choices=['gzip', 'pigz', 'zstd'],
+               help='Program used to compress backups when '
+               'backup_use_gzip_compression is enabled. pigz writes gzip '
+               'using several threads, zstd is faster and compresses better '
+               'but must be installed on the guest to restore such backups.'),
+    cfg.IntOpt('backup_compression_level', default=None, min=1, max=19,
+               help='Compression level passed to the compression program. '
+               'The default level of the program is used if not set.'),
+    cfg.IntOpt('backup_compression_threads', default=0, min=0,
+               help='Number of threads used by pigz and zstd to compress '
+               'backups, 0 lets the program decide.'),
+    cfg.StrOpt('backup_encryption_codec', default='openssl',
+               choices=['openssl', 'aes'],
+               help='How backups are encrypted when '
+               'backup_use_openssl_encryption is enabled. openssl runs '
+               'openssl enc in the backup pipeline, aes encrypts the stream '
+               'in the guest agent itself with native threads. Restores '
+               'detect the codec of a backup from its file name.'),
     cfg.BoolOpt('backup_use_snet', default=False,
                 help='Send backup files over snet.'),
     cfg.IntOpt('backup_chunk_size', default=2 ** 16,
@@ -323,6 +391,34 @@ common_opts = [
     cfg.IntOpt('backup_segment_max_size', default=2 * (1024 ** 3),
                help='Maximum size (in bytes) of each segment of the backup '
                'file.'),
+    cfg.IntOpt('backup_upload_concurrency', default=1, min=1,
+               help='Maximum number of backup segments uploaded to Swift at '
+               'the same time. With a value greater than 1, segments are '
+               'read into memory while earlier ones are still being '
+               'uploaded, so the backup process is not stalled by Swift.'),
+    cfg.IntOpt('backup_upload_buffer_size', default=512 * (1024 ** 2),
+               help='Maximum amount of memory (in bytes) used to hold backup '
+               'segments in flight when backup_upload_concurrency is greater '
+               'than 1. Segments are then at most this size divided by '
+               'backup_upload_concurrency (and never larger than '
+               'backup_segment_max_size).'),
+    cfg.IntOpt('restore_download_concurrency', default=1, min=1,
+               help='Maximum number of ranged requests used to download a '
+               'backup from Swift at the same time during a restore. With a '
+               'value greater than 1, the backup is fetched in ranges of '
+               'restore_download_range_size bytes that are downloaded ahead '
+               'of the restore process, and each segment is checked against '
+               'its checksum from the manifest as it completes.'),
+    cfg.IntOpt('restore_download_range_size', default=32 * (1024 ** 2),
+               help='Size (in bytes) of each ranged request used when '
+               'restore_download_concurrency is greater than 1.'),
+    cfg.IntOpt('backup_dedup_chunk_size', default=4 * (1024 ** 2),
+               min=64 * 1024,
+               help='Approximate size (in bytes) of the chunks backups are '
+               'cut into by the DedupSwiftStorage strategy. Chunks are '
+               'between a quarter and four times this size. Only chunks '
+               'with the same content are shared, so compressed backups '
+               'deduplicate poorly and encrypted ones not at all.'),
     cfg.StrOpt('remote_dns_client',
                default='trove.common.remote.dns_client',
                help='Client to send DNS calls to.'),
@@ -438,6 +534,20 @@ common_opts = [
     cfg.IntOpt('cluster_usage_timeout', default=36000,
                help='Maximum time (in seconds) to wait for a cluster to '
                     'become active.'),
+    cfg.IntOpt('cluster_fanout_concurrency', default=10, min=1,
+               help='The maximum number of cluster nodes a step of a cluster '
+                    'operation is run on at any one time.'),
+    cfg.IntOpt('cluster_node_timeout', default=0, min=0,
+               help='Maximum time (in seconds) a step of a cluster operation '
+                    'may take on a single node. 0 means no limit, other '
+                    'than cluster_usage_timeout for the whole operation.'),
+    cfg.IntOpt('cluster_rolling_wave_size', default=1, min=1,
+               help='The number of cluster nodes a rolling restart or '
+                    'upgrade works on at a time. The next nodes are only '
+                    'started on once these are back in the cluster.'),
+    cfg.IntOpt('cluster_rejoin_timeout', default=1800,
+               help='Maximum time (in seconds) to wait for the nodes of a '
+                    'rolling restart or upgrade to rejoin their cluster.'),
     cfg.IntOpt('timeout_wait_for_service', default=120,
                help='Maximum time (in seconds) to wait for a service to '
                     'become alive.'),
@@ -447,11 +557,14 @@ common_opts = [
                 help='A list of module types supported. A module type '
                      'corresponds to the name of a ModuleDriver.'),
     cfg.IntOpt('module_reapply_max_batch_size', default=50,
-               help='The maximum number of instances to reapply a module to '
-                    'at the same time.'),
+               help='The maximum number of instances of a datastore to '
+                    'reapply a module to in each batch.'),
     cfg.IntOpt('module_reapply_min_batch_delay', default=2,
                help='The minimum delay (in seconds) between subsequent '
                     'module batch reapply executions.'),
+    cfg.IntOpt('module_reapply_concurrency', default=10, min=1,
+               help='The maximum number of instances a module is being '
+                    'reapplied to at any one time.'),
     cfg.StrOpt('guest_log_container_name',
                default='database_logs',
                help='Name of container that stores guest log components.'),
@@ -459,6 +572,14 @@ common_opts = [
                help='Maximum size of a chunk saved in guest log container.'),
     cfg.IntOpt('guest_log_expiry', default=2592000,
                help='Expiry (in seconds) of objects in guest log container.'),
+    cfg.IntOpt('guest_log_publish_concurrency', default=4, min=1,
+               help='Maximum number of guest log components uploaded to the '
+               'guest log container at the same time.'),
+    cfg.BoolOpt('guest_log_compress', default=False,
+                help='Compress guest log components with gzip before they '
+                'are uploaded. Each component is a complete gzip file (named '
+                'with a .gz suffix), so the downloaded components of a log '
+                'can be concatenated and decompressed as a whole.'),
     cfg.BoolOpt('enable_secure_rpc_messaging', default=True,
                 help='Should RPC messaging traffic be secured by encryption.'),
     cfg.StrOpt('taskmanager_rpc_encr_key',
@@ -1156,6 +1277,9 @@ postgresql_opts = [
                      'if trove_security_groups_support is True).'),
     cfg.PortOpt('postgresql_port', default=5432,
                 help='The TCP port the server listens on.'),
+    cfg.IntOpt('connection_pool_size', default=4, min=0,
+               help='Number of idle connections to the database the Guest '
+                    'Agent keeps open for reuse.'),
     cfg.StrOpt('backup_strategy', default='PgBaseBackup',
                help='Default strategy to perform backups.'),
     cfg.DictOpt('backup_incremental_strategy',
@@ -235,6 +235,12 @@ class GuestError(TroveError):
                 "%(original_message)s.")
 
 
+class GuestMethodNotSupported(GuestError):
+
+    message = _("The guest does not support version %(version)s of "
+                "%(method)s.")
+
+
 class GuestTimeout(TroveError):
 
     message = _("Timeout trying to connect to the Guest Agent.")
@@ -654,6 +660,24 @@ class ClusterOperationNotSupported(TroveError):
     message = _("The '%(operation)s' operation is not supported for cluster.")
 
 
+class ClusterNodesFailed(TroveError):
+
+    message = _("Failed on %(count)d cluster node(s): %(errors)s")
+
+    def __init__(self, failures, results=None):
+        """
+        :param failures: dict of node to the exception it failed with
+        :param results: the results of all the nodes, None for those
+                        that failed
+        """
+        self.failures = failures
+        self.results = results
+        errors = '; '.join('%s: %s' % (node, failures[node])
+                           for node in sorted(failures))
+        super(ClusterNodesFailed, self).__init__(count=len(failures),
+                                                 errors=errors)
+
+
 class TroveOperationAuthError(TroveError):
     message = _("Operation not allowed for tenant %(tenant_id)s.")
 
@@ -0,0 +1,94 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Run a step of a cluster operation on many nodes at once."""
+
+from eventlet import greenpool
+from eventlet.timeout import Timeout
+from oslo_log import log as logging
+
+from trove.common import cfg
+from trove.common import exception
+from trove.common.i18n import _
+
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+def _node_name(node):
+    if isinstance(node, dict) and 'id' in node:
+        return node['id']
+    return getattr(node, 'id', node)
+
+
+def fan_out(func, nodes, concurrency=None, timeout=None, name=_node_name):
+    """Call func on each of the nodes, in parallel.
+
+    The calls are independent of each other: whatever has to happen
+    before or after them is left to the caller, which makes one call to
+    fan_out per step of the operation. All the calls are run to the end,
+    even when some fail, so that a failure is reported along with the
+    state of every node.
+
+    :param func: called with each node
+    :param concurrency: the most calls running at any one time, defaults
+                        to cluster_fanout_concurrency
+    :param timeout: seconds each call may take, defaults to
+                    cluster_node_timeout; 0 means no limit
+    :param name: returns the name of a node in the error reported
+    :return: the results of the calls, in the order of the nodes
+    :raises: :class:`ClusterNodesFailed` if any of the calls failed
+    """
+    nodes = list(nodes)
+    if concurrency is None:
+        concurrency = CONF.cluster_fanout_concurrency
+    if timeout is None:
+        timeout = CONF.cluster_node_timeout
+
+    def _call(node):
+        node_timeout = Timeout(timeout or None)
+        try:
+            return func(node), None
+        except Timeout as t:
+            if t is not node_timeout:
+                raise  # not my timeout
+            return None, exception.TroveError(
+                _("Timed out after %ds.") % timeout)
+        except Exception as e:
+            LOG.exception("Failed on cluster node %s.", name(node))
+            return None, e
+        finally:
+            node_timeout.cancel()
+
+    pool = greenpool.GreenPool(max(1, min(concurrency, len(nodes))))
+    threads = []
+    try:
+        for node in nodes:
+            threads.append(pool.spawn(_call, node))
+        outcomes = [thread.wait() for thread in threads]
+    except BaseException:
+        # Interrupted, for instance by the timeout of the whole operation;
+        # the calls still running are abandoned.
+        for thread in threads:
+            thread.kill()
+        raise
+
+    results = [result for result, error in outcomes]
+    failures = dict((name(node), error)
+                    for node, (result, error) in zip(nodes, outcomes)
+                    if error is not None)
+    if failures:
+        raise exception.ClusterNodesFailed(failures, results=results)
+    return results
@@ -17,10 +17,14 @@
 Module dedicated functions/classes dealing with rate limiting requests.
 """
 
+import array
 import collections
 import copy
+import functools
 import math
+import os
 import re
+import sqlite3
 import time
 
 from oslo_serialization import jsonutils
@@ -213,7 +217,10 @@ class RateLimitingMiddleware(wsgi.TroveMiddleware):
             retry = time.time() + delay
             return wsgi.OverLimitFault(msg, error, retry)
 
-        req.environ["trove.limits"] = self._limiter.get_limits(tenant_id)
+        # Only the limits API needs these, so they are not built for every
+        # request.
+        req.environ["trove.limits"] = functools.partial(
+            self._limiter.get_limits, tenant_id)
 
         return self.application
 
@@ -330,6 +337,309 @@ class Limiter(object):
         return result
 
 
+def _fill(level, last, now, request_value, capacity):
+    """Add a request to a leaky bucket, as `Limit` does.
+
+    :return: the new level of the bucket and the delay (or None) before
+             the request would be allowed
+    """
+    level = max(level - (now - last), 0) + request_value
+    difference = level - capacity
+    if difference > 0:
+        return level - request_value, difference
+    return level, None
+
+
+class _Routes(object):
+    """Dispatch table of a list of limits.
+
+    The regular expressions of the limits of each verb are compiled into a
+    single one made of an optional lookahead per limit, so one match finds
+    every limit a URL falls under.
+    """
+
+    MATCH_ALL = ('', '.*', '^.*')
+
+    def __init__(self, limits):
+        self.limits = limits
+        # Arguments passed to the bucket store, see BucketLimiter.
+        self.buckets = [
+            (index, '%s %s %d/%d' % (limit.verb, limit.regex, limit.value,
+                                     limit.unit),
+             float(limit.capacity) / limit.value, limit.capacity)
+            for index, limit in enumerate(limits)]
+        indices = collections.defaultdict(list)
+        for index, limit in enumerate(limits):
+            indices[limit.verb].append(index)
+        self._dispatch = dict(
+            (verb, self._compile(verb_indices))
+            for verb, verb_indices in indices.items())
+
+    def _compile(self, indices):
+        match_all = []
+        combined = []
+        separate = []
+        for index in indices:
+            regex = self.limits[index].regex
+            if regex in self.MATCH_ALL:
+                match_all.append(index)
+            elif re.compile(regex).groups:
+                # Group references would break once combined.
+                separate.append((index, re.compile(regex)))
+            else:
+                combined.append(index)
+        pattern = None
+        if combined:
+            try:
+                pattern = re.compile(''.join(
+                    '(?:(?=(%s)))?' % self.limits[index].regex
+                    for index in combined))
+            except re.error:
+                separate.extend((index, re.compile(self.limits[index].regex))
+                                for index in combined)
+                combined = []
+        return match_all, combined, pattern, separate
+
+    def match(self, verb, url):
+        """Return the indices of the limits of the request."""
+        if verb not in self._dispatch:
+            return []
+        match_all, combined, pattern, separate = self._dispatch[verb]
+        indices = list(match_all)
+        if pattern is not None:
+            indices.extend(index for index, group in zip(
+                combined, pattern.match(url).groups()) if group is not None)
+        indices.extend(index for index, regex in separate
+                       if regex.match(url))
+        return indices
+
+
+class MemoryBucketStore(object):
+    """Keeps the buckets of each user in the memory of the process.
+
+    The buckets of a user are packed in a single array of floats, after the
+    time the user was last seen, and users are kept in least recently used
+    order. Users idle for longer than `idle_timeout` seconds are forgotten,
+    as all their buckets have leaked empty by then.
+    """
+
+    def __init__(self, idle_timeout):
+        self.idle_timeout = idle_timeout
+        self._users = collections.OrderedDict()
+
+    def consume(self, username, buckets, now):
+        """Add a request to some buckets of a user.
+
+        :param buckets: list of (index, key, request value, capacity) tuples
+        :return: list of delays (or None) before each bucket would allow it
+        """
+        # Moves the user to the most recently used end.
+        state = self._users.pop(username, None)
+        if state is None:
+            state = array.array('d', [now])
+        state[0] = now
+        delays = []
+        for index, key, request_value, capacity in buckets:
+            position = 2 * index + 1
+            if position >= len(state):
+                state.extend([0.0] * (position + 2 - len(state)))
+            level, delay = _fill(state[position], state[position + 1], now,
+                                 request_value, capacity)
+            state[position] = level
+            state[position + 1] = now
+            delays.append(delay)
+        self._users[username] = state
+        self._evict(now)
+        return delays
+
+    def peek(self, username, buckets):
+        """Return the (level, last request) of some buckets of a user."""
+        state = self._users.get(username)
+        return [(state[2 * index + 1], state[2 * index + 2])
+                if state is not None and 2 * index + 1 < len(state)
+                else (0.0, 0.0)
+                for index, key, request_value, capacity in buckets]
+
+    def _evict(self, now):
+        idle = []
+        for username in self._users:
+            if now - self._users[username][0] < self.idle_timeout:
+                break
+            idle.append(username)
+        for username in idle:
+            del self._users[username]
+
+    def __len__(self):
+        return len(self._users)
+
+
+class SQLiteBucketStore(object):
+    """Keeps buckets in an SQLite database, shared by all the processes that
+    use the same `path`. This lets the API workers of a host enforce limits
+    together instead of each on its own.
+    """
+
+    def __init__(self, idle_timeout, path):
+        self.idle_timeout = idle_timeout
+        self.path = path
+        self._connection = None
+        self._pid = None
+        self._next_eviction = 0
+
+    def _connect(self):
+        # Connections must not be carried over into forked workers.
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None)
+            # Losing the latest levels in a crash is harmless, waiting for
+            # them to reach the disk on every request is not.
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=OFF')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'username TEXT NOT NULL, key TEXT NOT NULL, '
+                'level REAL NOT NULL, last REAL NOT NULL, '
+                'PRIMARY KEY (username, key))')
+            self._pid = os.getpid()
+        return self._connection
+
+    def _select(self, connection, username, buckets):
+        keys = [bucket[1] for bucket in buckets]
+        rows = connection.execute(
+            'SELECT key, level, last FROM buckets '
+            'WHERE username = ? AND key IN (%s)' % ','.join('?' * len(keys)),
+            [username or ''] + keys)
+        return dict((key, (level, last)) for key, level, last in rows)
+
+    def consume(self, username, buckets, now):
+        """See MemoryBucketStore.consume."""
+        connection = self._connect()
+        # Locks out the other workers until the buckets are written.
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            state = self._select(connection, username, buckets)
+            delays = []
+            rows = []
+            for index, key, request_value, capacity in buckets:
+                level, last = state.get(key, (0.0, 0.0))
+                level, delay = _fill(level, last, now, request_value,
+                                     capacity)
+                rows.append((username or '', key, level, now))
+                delays.append(delay)
+            connection.executemany(
+                'INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)', rows)
+            if now >= self._next_eviction:
+                connection.execute('DELETE FROM buckets WHERE last < ?',
+                                   (now - self.idle_timeout,))
+                self._next_eviction = now + self.idle_timeout
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return delays
+
+    def peek(self, username, buckets):
+        """See MemoryBucketStore.peek."""
+        state = self._select(self._connect(), username, buckets)
+        return [state.get(bucket[1], (0.0, 0.0)) for bucket in buckets]
+
+
+class BucketLimiter(Limiter):
+    """
+    Rate-limit checking class with precompiled limits and compact state.
+
+    Limits behave as with `Limiter`, but the limits that apply to a request
+    are found with a single regular expression match, and only the levels of
+    the buckets of each user are kept, in a bucket store. To use it, set
+    ``limiter = trove.common.limits.BucketLimiter`` in the ratelimit filter
+    of the paste configuration. The store defaults to `MemoryBucketStore`;
+    to share limits between the API workers of a host, also set::
+
+        store = trove.common.limits.SQLiteBucketStore
+        store_path = /var/lib/trove/limits.sqlite
+
+    Other ``store_*`` settings are passed to the store as well.
+    """
+
+    def __init__(self, limits, store=None, **kwargs):
+        """
+        Initialize the new `BucketLimiter`.
+
+        @param limits: List of `Limit` objects
+        @param store: String identifying class for storing buckets
+        """
+        self.routes = _Routes(limits)
+        self.user_routes = {}
+        store_kwargs = {}
+        for key, value in kwargs.items():
+            if key.startswith('user:'):
+                self.user_routes[key[5:]] = _Routes(self.parse_limits(value))
+            elif key.startswith('store_'):
+                store_kwargs[key[6:]] = value
+
+        # Buckets are empty once a whole unit went by without requests.
+        idle_timeout = max(
+            [limit.capacity for routes in
+             [self.routes] + list(self.user_routes.values())
+             for limit in routes.limits] or [0])
+        if store is None:
+            store = MemoryBucketStore
+        else:
+            store = importutils.import_class(store)
+        self.store = store(idle_timeout, **store_kwargs)
+
+    def _get_time(self):
+        """Retrieve the current time. Broken out for testability."""
+        return time.time()
+
+    def get_limits(self, username=None):
+        """
+        Return the limits for a given user.
+        """
+        routes = self.user_routes.get(username, self.routes)
+        if not routes.limits:
+            return []
+        now = self._get_time()
+        limits = []
+        for limit, bucket, (level, last) in zip(
+                routes.limits, routes.buckets,
+                self.store.peek(username, routes.buckets)):
+            request_value, capacity = bucket[2:]
+            level = max(level - (now - last), 0)
+            limits.append({
+                "verb": limit.verb,
+                "URI": limit.uri,
+                "regex": limit.regex,
+                "value": limit.value,
+                "remaining": int(math.floor(
+                    (capacity - level) / capacity * limit.value)),
+                "unit": limit.display_unit(),
+                "resetTime": int(
+                    now + max(level + request_value - capacity, 0)),
+            })
+        return limits
+
+    def check_for_delay(self, verb, url, username=None):
+        """
+        Check the given verb/user/user triplet for limit.
+
+        @return: Tuple of delay (in seconds) and error message (or None, None)
+        """
+        routes = self.user_routes.get(username, self.routes)
+        indices = routes.match(verb, url)
+        if not indices:
+            return None, None
+
+        delays = self.store.consume(
+            username, [routes.buckets[index] for index in indices],
+            self._get_time())
+        result = None, None
+        for index, delay in zip(indices, delays):
+            if delay and (result[0] is None or delay < result[0]):
+                result = delay, routes.limits[index].error_message
+        return result
+
+
 class WsgiLimiter(object):
     """
     Rate-limit checking from a WSGI application. Uses an in-memory `Limiter`.
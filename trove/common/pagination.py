@@ -13,10 +13,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import bisect
+import base64
+import binascii
 import collections
+import datetime
+import heapq
+
+from oslo_serialization import jsonutils
+import six
 import six.moves.urllib.parse as urllib_parse
 
+from trove.common import exception
+from trove.common.i18n import _
+
 
 def url_quote(s):
     if s is None:
@@ -28,6 +37,9 @@ def paginate_list(li, limit=None, marker=None, include_marker=False,
                   key=lambda x: x):
     """Sort the given list and return a sublist containing a page of items.
 
+    Only the items after the marker are sorted, and of those only enough
+    to fill the page.
+
     :param list li:             The list to be paginated.
     :param int limit:           Maximum number of items to be returned.
     :param marker:              Key of the first item to appear on the sublist.
@@ -35,20 +47,44 @@ def paginate_list(li, limit=None, marker=None, include_marker=False,
     :param lambda key:          Sorting expression.
     :return:
     """
-    sli = sorted(li, key=key)
-    index = [key(item) for item in sli]
     if marker is None:
         marker = ''
     if include_marker:
-        pos = bisect.bisect_left(index, marker)
+        remaining = [item for item in li if key(item) >= marker]
     else:
-        pos = bisect.bisect(index, marker)
+        remaining = [item for item in li if key(item) > marker]
 
-    if limit and pos + limit < len(sli):
-        page = sli[pos:pos + limit]
+    if limit and limit < len(remaining):
+        page = heapq.nsmallest(limit, remaining, key=key)
         return page, key(page[-1])
     else:
-        return sli[pos:], None
+        return sorted(remaining, key=key), None
+
+
+def encode_marker(values):
+    """Build an opaque marker from the sort key values of the last item of
+    a page, as needed to seek to the next page.
+    """
+    values = [value.isoformat() if isinstance(value, datetime.datetime)
+              else value for value in values]
+    data = base64.urlsafe_b64encode(jsonutils.dump_as_bytes(values))
+    return data.decode('ascii').rstrip('=')
+
+
+def decode_marker(marker):
+    """Return the sort key values of a marker built by encode_marker.
+
+    Datetime values are returned in their ISO 8601 form.
+    """
+    try:
+        data = base64.urlsafe_b64decode(
+            six.text_type(marker + '=' * (-len(marker) % 4)).encode('ascii'))
+        values = jsonutils.loads(data)
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        values = None
+    if not isinstance(values, list):
+        raise exception.BadRequest(_("Invalid marker: %s") % marker)
+    return values
 
 
 def paginate_object_list(li, attr_name, limit=None, marker=None,
@@ -85,4 +85,14 @@ class RpcService(service.Service):
             LOG.info("Failed to stop RPC server before shutdown. ")
             pass
 
+        # Let the manager finish off the work it holds, such as buffered
+        # writes, once no more messages come in.
+        cleanup = getattr(self.manager_impl, 'cleanup', None)
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception:
+                LOG.exception("Failed to clean up the manager before "
+                              "shutdown.")
+
         super(RpcService, self).stop()
@@ -0,0 +1,301 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Validators compiled once for the JSON schemas of the API.
+
+The schemas of the API requests never change, so rather than having
+jsonschema interpret a schema on every request, each schema is turned once
+into nested checks which only tell whether a body is valid. jsonschema is
+only run on the bodies found invalid, to report their errors, and on the
+parts of a schema using keywords the checks do not cover.
+"""
+
+import numbers
+import re
+
+import jsonschema
+import six
+
+_TYPES = {
+    'array': lambda instance: isinstance(instance, list),
+    'boolean': lambda instance: isinstance(instance, bool),
+    'integer': lambda instance: (isinstance(instance, six.integer_types) and
+                                 not isinstance(instance, bool)),
+    'null': lambda instance: instance is None,
+    'number': lambda instance: (isinstance(instance, numbers.Number) and
+                                not isinstance(instance, bool)),
+    'object': lambda instance: isinstance(instance, dict),
+    'string': lambda instance: isinstance(instance, six.string_types),
+}
+
+# Keywords checked by jsonschema on their own, whatever the rest of the
+# schema.
+_DELEGATED = ('multipleOf', 'dependencies')
+
+# Tell True and False from 1 and 0 when looking for duplicate items.
+_TRUE = object()
+_FALSE = object()
+
+_validators = {}
+
+
+class SchemaValidator(object):
+    """Validates instances against a Draft 4 schema, compiled once."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.validator = jsonschema.Draft4Validator(schema)
+        self._check = _compile(schema, self.validator)
+
+    def is_valid(self, instance):
+        return self._check(instance)
+
+    def iter_errors(self, instance):
+        return self.validator.iter_errors(instance)
+
+
+def get_validator(schema):
+    """Return the validator of a schema, compiled on first use.
+
+    Validators are kept for the schema object, which must not change once
+    validated against.
+    """
+    validator = _validators.get(id(schema))
+    if validator is None:
+        # Holding the schema keeps its id from being reused.
+        validator = _validators[id(schema)] = SchemaValidator(schema)
+    return validator
+
+
+def compile_schemas(schemas):
+    """Compile the validators of the schemas of a controller, looking into
+    the maps of action specific schemas.
+    """
+    if any(key in jsonschema.Draft4Validator.VALIDATORS for key in schemas):
+        get_validator(schemas)
+        return
+    for schema in schemas.values():
+        if isinstance(schema, dict):
+            compile_schemas(schema)
+
+
+def _compile(schema, validator):
+    """Return a function telling whether an instance is valid against the
+    schema, with the same outcome as the jsonschema validator.
+    """
+    def fallback(instance):
+        return validator.is_valid(instance, schema)
+
+    if not isinstance(schema, dict) or '$ref' in schema:
+        return fallback
+    checks = []
+    for keyword, value in schema.items():
+        if keyword not in validator.VALIDATORS:
+            # Annotations, such as name or description.
+            continue
+        if keyword == 'format' and validator.format_checker is None:
+            continue
+        if keyword in _DELEGATED:
+            checks.append(_delegate(validator, {keyword: value}))
+            continue
+        compiler = _COMPILERS.get(keyword)
+        check = compiler(value, schema, validator) if compiler else None
+        if check is None:
+            return fallback
+        checks.append(check)
+
+    if not checks:
+        return lambda instance: True
+    if len(checks) == 1:
+        return checks[0]
+    return lambda instance: all(check(instance) for check in checks)
+
+
+def _delegate(validator, schema):
+    return lambda instance: validator.is_valid(instance, schema)
+
+
+def _compile_type(types, schema, validator):
+    if isinstance(types, six.string_types):
+        types = [types]
+    if not all(isinstance(name, six.string_types) and name in _TYPES
+               for name in types):
+        return None
+    type_checks = [_TYPES[name] for name in types]
+    if len(type_checks) == 1:
+        return type_checks[0]
+    return lambda instance: any(check(instance) for check in type_checks)
+
+
+def _compile_properties(properties, schema, validator):
+    if not isinstance(properties, dict):
+        return None
+    property_checks = [(name, _compile(subschema, validator))
+                       for name, subschema in properties.items()]
+
+    def check(instance):
+        if not isinstance(instance, dict):
+            return True
+        for name, property_check in property_checks:
+            if name in instance and not property_check(instance[name]):
+                return False
+        return True
+    return check
+
+
+def _compile_additional_properties(additional, schema, validator):
+    if 'patternProperties' in schema:
+        return None
+    properties = schema.get('properties', {})
+    if isinstance(additional, dict):
+        additional_check = _compile(additional, validator)
+
+        def check(instance):
+            if not isinstance(instance, dict):
+                return True
+            return all(additional_check(value)
+                       for name, value in instance.items()
+                       if name not in properties)
+        return check
+    if additional:
+        return lambda instance: True
+    return lambda instance: (not isinstance(instance, dict) or
+                             all(name in properties for name in instance))
+
+
+def _compile_required(required, schema, validator):
+    if not isinstance(required, list):
+        return None
+    return lambda instance: (not isinstance(instance, dict) or
+                             all(name in instance for name in required))
+
+
+def _compile_items(items, schema, validator):
+    if not isinstance(items, dict):
+        return None
+    item_check = _compile(items, validator)
+    return lambda instance: (not isinstance(instance, list) or
+                             all(item_check(item) for item in instance))
+
+
+def _compile_unique_items(unique, schema, validator):
+    if not unique:
+        return lambda instance: True
+    delegate = _delegate(validator, {'uniqueItems': unique})
+
+    def unbool(item):
+        if item is True:
+            return _TRUE
+        if item is False:
+            return _FALSE
+        return item
+
+    def check(instance):
+        if not isinstance(instance, list) or len(instance) < 2:
+            return True
+        try:
+            return len(set(unbool(item) for item in instance)) == len(
+                instance)
+        except TypeError:
+            # Items which cannot be hashed, such as objects.
+            return delegate(instance)
+    return check
+
+
+def _compile_length(limit, accepts):
+    def compile_length(value, schema, validator):
+        return lambda instance: (not accepts(instance) or
+                                 limit(len(instance), value))
+    return compile_length
+
+
+def _compile_pattern(pattern, schema, validator):
+    try:
+        search = re.compile(pattern).search
+    except (re.error, TypeError):
+        return None
+    return lambda instance: (not isinstance(instance, six.string_types) or
+                             search(instance) is not None)
+
+
+def _compile_minimum(minimum, schema, validator):
+    number = _TYPES['number']
+    if schema.get('exclusiveMinimum', False):
+        return lambda instance: not number(instance) or instance > minimum
+    return lambda instance: not number(instance) or instance >= minimum
+
+
+def _compile_maximum(maximum, schema, validator):
+    number = _TYPES['number']
+    if schema.get('exclusiveMaximum', False):
+        return lambda instance: not number(instance) or instance < maximum
+    return lambda instance: not number(instance) or instance <= maximum
+
+
+def _compile_enum(enums, schema, validator):
+    return lambda instance: instance in enums
+
+
+def _compile_subschemas(combine):
+    def compile_subschemas(subschemas, schema, validator):
+        if not isinstance(subschemas, list):
+            return None
+        checks = [_compile(subschema, validator) for subschema in subschemas]
+        return lambda instance: combine(check(instance) for check in checks)
+    return compile_subschemas
+
+
+def _exactly_one(results):
+    valid = 0
+    for result in results:
+        if result:
+            valid += 1
+            if valid > 1:
+                return False
+    return valid == 1
+
+
+def _compile_not(subschema, schema, validator):
+    check = _compile(subschema, validator)
+    return lambda instance: not check(instance)
+
+
+_COMPILERS = {
+    'type': _compile_type,
+    'properties': _compile_properties,
+    'additionalProperties': _compile_additional_properties,
+    'required': _compile_required,
+    'items': _compile_items,
+    'uniqueItems': _compile_unique_items,
+    'minItems': _compile_length(
+        lambda length, value: length >= value, _TYPES['array']),
+    'maxItems': _compile_length(
+        lambda length, value: length <= value, _TYPES['array']),
+    'minLength': _compile_length(
+        lambda length, value: length >= value, _TYPES['string']),
+    'maxLength': _compile_length(
+        lambda length, value: length <= value, _TYPES['string']),
+    'minProperties': _compile_length(
+        lambda length, value: length >= value, _TYPES['object']),
+    'maxProperties': _compile_length(
+        lambda length, value: length <= value, _TYPES['object']),
+    'pattern': _compile_pattern,
+    'minimum': _compile_minimum,
+    'maximum': _compile_maximum,
+    'enum': _compile_enum,
+    'allOf': _compile_subschemas(all),
+    'anyOf': _compile_subschemas(any),
+    'oneOf': _compile_subschemas(_exactly_one),
+    'not': _compile_not,
+}
@@ -17,6 +17,7 @@ from eventlet.timeout import Timeout
 from oslo_log import log as logging
 
 from trove.common import cfg
+from trove.common import fanout
 from trove.common.strategies.cluster import base
 from trove.common import utils
 from trove.instance.models import DBInstance
@@ -65,11 +66,13 @@ class CassandraClusterTasks(task_models.ClusterTasks):
             try:
                 LOG.debug("Selected seed nodes: %s", seeds)
 
-                for node in cluster_nodes:
+                def _configure_node(node):
                     LOG.debug("Configuring node: %s.", node['id'])
                     node['guest'].set_seeds(seeds)
                     node['guest'].set_auto_bootstrap(False)
 
+                fanout.fan_out(_configure_node, cluster_nodes)
+
                 LOG.debug("Starting seed nodes.")
                 for node in cluster_nodes:
                     if node['ip'] in seeds:
@@ -87,14 +90,15 @@ class CassandraClusterTasks(task_models.ClusterTasks):
                 # Only update the local authentication file on the other nodes.
                 LOG.debug("Securing the cluster.")
                 key = utils.generate_random_password()
-                admin_creds = None
-                for node in cluster_nodes:
-                    if admin_creds is None:
-                        admin_creds = node['guest'].cluster_secure(key)
-                    else:
-                        node['guest'].store_admin_credentials(admin_creds)
+                admin_creds = cluster_nodes[0]['guest'].cluster_secure(key)
+                cluster_nodes[0]['guest'].cluster_complete()
+
+                def _secure_node(node):
+                    node['guest'].store_admin_credentials(admin_creds)
                     node['guest'].cluster_complete()
 
+                fanout.fan_out(_secure_node, cluster_nodes[1:])
+
                 LOG.debug("Cluster configuration finished successfully.")
             except Exception:
                 LOG.exception("Error creating cluster.")
@@ -122,8 +126,9 @@ class CassandraClusterTasks(task_models.ClusterTasks):
 
     @classmethod
     def load_cluster_nodes(cls, context, node_ids):
-        return [cls.build_node_info(Instance.load(context, node_id))
-                for node_id in node_ids]
+        return fanout.fan_out(
+            lambda node_id: cls.build_node_info(
+                Instance.load(context, node_id)), node_ids)
 
     @classmethod
     def build_node_info(cls, instance):
@@ -183,10 +188,7 @@ class CassandraClusterTasks(task_models.ClusterTasks):
             if not self._all_instances_ready(new_instance_ids, cluster_id):
                 return
 
-            new_instances = [Instance.load(context, instance_id)
-                             for instance_id in new_instance_ids]
-            added_nodes = [self.build_node_info(instance)
-                           for instance in new_instances]
+            added_nodes = self.load_cluster_nodes(context, new_instance_ids)
 
             LOG.debug("All nodes ready, proceeding with cluster setup.")
 
@@ -224,8 +226,8 @@ class CassandraClusterTasks(task_models.ClusterTasks):
 
                 # Configure each cluster node with the updated list of seeds.
                 LOG.debug("Updating all nodes with new seeds: %s", seeds)
-                for node in cluster_nodes:
-                    node['guest'].set_seeds(seeds)
+                fanout.fan_out(lambda node: node['guest'].set_seeds(seeds),
+                               cluster_nodes)
 
                 # Run nodetool cleanup on each of the previously existing nodes
                 # to remove the keys that no longer belong to those nodes.
@@ -307,9 +309,9 @@ class CassandraClusterTasks(task_models.ClusterTasks):
                                        if node['id'] not in removal_ids]
                     seeds = self.choose_seed_nodes(remaining_nodes)
                     LOG.debug("Selected seed nodes: %s", seeds)
-                    for node in remaining_nodes:
-                        LOG.debug("Configuring node: %s.", node['id'])
-                        node['guest'].set_seeds(seeds)
+                    fanout.fan_out(
+                        lambda node: node['guest'].set_seeds(seeds),
+                        remaining_nodes)
 
                 # Wait for the removed nodes to go SHUTDOWN.
                 LOG.debug("Waiting for all decommissioned nodes to shutdown.")
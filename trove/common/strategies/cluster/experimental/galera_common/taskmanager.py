@@ -18,6 +18,7 @@ from oslo_log import log as logging
 from trove.common import cfg
 from trove.common.exception import PollTimeOut
 from trove.common.exception import TroveError
+from trove.common import fanout
 from trove.common.i18n import _
 from trove.common.remote import create_nova_client
 from trove.common.strategies.cluster import base as cluster_base
@@ -67,6 +68,21 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
         )
         return config_rendered
 
+    def _write_cluster_configuration(self, context, instance, cluster_ips,
+                                     cluster_context):
+        # render the conf.d/cluster.cnf configuration
+        cluster_configuration = self._render_cluster_config(
+            context,
+            instance,
+            ",".join(cluster_ips),
+            cluster_context['cluster_name'],
+            cluster_context['replication_user'])
+        self.get_guest(instance).write_cluster_configuration_overrides(
+            cluster_configuration)
+
+    def _cluster_complete(self, instance):
+        self.get_guest(instance).cluster_complete()
+
     def create_cluster(self, context, cluster_id):
         LOG.debug("Begin create_cluster for id: %s.", cluster_id)
 
@@ -86,7 +102,6 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                          in instance_ids]
 
             cluster_ips = [self.get_ip(instance) for instance in instances]
-            instance_guests = []
 
             # Create replication user and password for synchronizing the
             # galera cluster
@@ -108,10 +123,8 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                 # instances syncs with the donor instance.
                 admin_password = str(utils.generate_random_password())
 
-                bootstrap = True
-                for instance in instances:
+                def _install_cluster(instance, bootstrap=False):
                     guest = self.get_guest(instance)
-                    instance_guests.append(guest)
                     guest.reset_admin_password(admin_password)
                     # render the conf.d/cluster.cnf configuration
                     cluster_configuration = self._render_cluster_config(
@@ -125,11 +138,14 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                     guest.install_cluster(replication_user,
                                           cluster_configuration,
                                           bootstrap)
-                    bootstrap = False
+
+                # The other instances can only join once the first one has
+                # bootstrapped the cluster.
+                _install_cluster(instances[0], bootstrap=True)
+                fanout.fan_out(_install_cluster, instances[1:])
 
                 LOG.debug("Finalizing cluster configuration.")
-                for guest in instance_guests:
-                    guest.cluster_complete()
+                fanout.fan_out(self._cluster_complete, instances)
             except Exception:
                 LOG.exception("Error creating cluster.")
                 self.update_statuses_on_failure(cluster_id)
@@ -195,7 +211,8 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                              for instance_id in new_instance_ids]
             new_cluster_ips = [self.get_ip(instance) for instance in
                                new_instances]
-            for instance in new_instances:
+
+            def _join_cluster(instance):
                 guest = self.get_guest(instance)
 
                 guest.reset_admin_password(cluster_context['admin_password'])
@@ -214,26 +231,20 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
                                       cluster_configuration,
                                       bootstrap)
 
+            fanout.fan_out(_join_cluster, new_instances)
+
             self._check_cluster_for_root(context,
                                          existing_instances,
                                          new_instances)
 
             # apply the new config to all instances
-            for instance in existing_instances + new_instances:
-                guest = self.get_guest(instance)
-                # render the conf.d/cluster.cnf configuration
-                cluster_configuration = self._render_cluster_config(
-                    context,
-                    instance,
-                    ",".join(existing_cluster_ips + new_cluster_ips),
-                    cluster_context['cluster_name'],
-                    cluster_context['replication_user'])
-                guest.write_cluster_configuration_overrides(
-                    cluster_configuration)
+            fanout.fan_out(
+                lambda instance: self._write_cluster_configuration(
+                    context, instance,
+                    existing_cluster_ips + new_cluster_ips, cluster_context),
+                existing_instances + new_instances)
 
-            for instance in new_instances:
-                guest = self.get_guest(instance)
-                guest.cluster_complete()
+            fanout.fan_out(self._cluster_complete, new_instances)
 
         timeout = Timeout(CONF.cluster_usage_timeout)
         try:
@@ -295,17 +306,11 @@ class GaleraCommonClusterTasks(task_models.ClusterTasks):
             cluster_context = rnd_cluster_guest.get_cluster_context()
 
             # apply the new config to all leftover instances
-            for instance in leftover_instances:
-                guest = self.get_guest(instance)
-                # render the conf.d/cluster.cnf configuration
-                cluster_configuration = self._render_cluster_config(
-                    context,
-                    instance,
-                    ",".join(leftover_cluster_ips),
-                    cluster_context['cluster_name'],
-                    cluster_context['replication_user'])
-                guest.write_cluster_configuration_overrides(
-                    cluster_configuration)
+            fanout.fan_out(
+                lambda instance: self._write_cluster_configuration(
+                    context, instance, leftover_cluster_ips,
+                    cluster_context),
+                leftover_instances)
 
         timeout = Timeout(CONF.cluster_usage_timeout)
         try:
@@ -18,6 +18,7 @@ from oslo_log import log as logging
 
 from trove.common import cfg
 from trove.common.exception import PollTimeOut
+from trove.common import fanout
 from trove.common.instance import ServiceStatuses
 from trove.common.strategies.cluster import base
 from trove.common import utils
@@ -109,8 +110,7 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
                 return
 
             # call to start checking status
-            for instance in instances:
-                self.get_guest(instance).cluster_complete()
+            fanout.fan_out(self._cluster_complete, instances)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -158,8 +158,7 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
             if not self._create_shard(query_routers[0], members):
                 return
 
-            for member in members:
-                self.get_guest(member).cluster_complete()
+            fanout.fan_out(self._cluster_complete, members)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -238,8 +237,7 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
                 ):
                     return
                 instances.extend(query_routers)
-            for instance in instances:
-                self.get_guest(instance).cluster_complete()
+            fanout.fan_out(self._cluster_complete, instances)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -305,11 +303,11 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
         add_members.
         """
         LOG.debug('initializing replica set on %s', primary_member.id)
-        other_members_ips = []
         try:
-            for member in other_members:
-                other_members_ips.append(self.get_ip(member))
-                self.get_guest(member).restart()
+            other_members_ips = [self.get_ip(member)
+                                 for member in other_members]
+            fanout.fan_out(lambda member: self.get_guest(member).restart(),
+                           other_members)
             self.get_guest(primary_member).prep_primary()
             self.get_guest(primary_member).add_members(other_members_ips)
         except Exception:
@@ -319,6 +317,9 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
             return False
         return True
 
+    def _cluster_complete(self, instance):
+        self.get_guest(instance).cluster_complete()
+
     def _create_shard(self, query_router, members):
         """Create a replica set out of the given member instances and add it as
         a shard to the cluster.
@@ -344,10 +345,12 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
 
     def _get_running_query_router_id(self):
         """Get a query router in this cluster that is in the RUNNING state."""
-        for instance_id in [db_instance.id for db_instance in self.db_instances
-                            if db_instance.type == 'query_router']:
-            status = models.InstanceServiceStatus.find_by(
-                instance_id=instance_id).get_status()
+        query_router_ids = [db_instance.id
+                            for db_instance in self.db_instances
+                            if db_instance.type == 'query_router']
+        statuses = models.load_instance_statuses(query_router_ids)
+        for instance_id in query_router_ids:
+            status = statuses.get(instance_id, (None, None))[0]
             if status == ServiceStatuses.RUNNING:
                 return instance_id
         LOG.exception("no query routers ready to accept requests")
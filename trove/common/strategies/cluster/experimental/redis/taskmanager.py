@@ -16,6 +16,7 @@ from oslo_log import log as logging
 
 from trove.common import cfg
 from trove.common.exception import TroveError
+from trove.common import fanout
 from trove.common.i18n import _
 from trove.common.strategies.cluster import base
 from trove.instance.models import DBInstance
@@ -65,25 +66,32 @@ class RedisClusterTasks(task_models.ClusterTasks):
                 cluster_head = instances[0]
                 cluster_head_port = '6379'
                 cluster_head_ip = self.get_ip(cluster_head)
-                for guest in guests[1:]:
-                    guest.cluster_meet(cluster_head_ip, cluster_head_port)
+                fanout.fan_out(
+                    lambda guest: guest.cluster_meet(cluster_head_ip,
+                                                     cluster_head_port),
+                    guests[1:])
 
                 num_nodes = len(instances)
                 total_slots = 16384
                 slots_per_node = total_slots / num_nodes
                 leftover_slots = total_slots % num_nodes
                 first_slot = 0
+                assignments = []
                 for guest in guests:
                     last_slot = first_slot + slots_per_node
                     if leftover_slots > 0:
                         leftover_slots -= 1
                     else:
                         last_slot -= 1
-                    guest.cluster_addslots(first_slot, last_slot)
+                    assignments.append((guest, first_slot, last_slot))
                     first_slot = last_slot + 1
+                fanout.fan_out(
+                    lambda assignment: assignment[0].cluster_addslots(
+                        *assignment[1:]),
+                    assignments, name=lambda assignment: assignment[0].id)
 
-                for guest in guests:
-                    guest.cluster_complete()
+                fanout.fan_out(lambda guest: guest.cluster_complete(),
+                               guests)
             except Exception:
                 LOG.exception("Error creating cluster.")
                 self.update_statuses_on_failure(cluster_id)
@@ -126,14 +134,16 @@ class RedisClusterTasks(task_models.ClusterTasks):
             LOG.debug("All members ready, proceeding for cluster setup.")
             new_insts = [Instance.load(context, instance_id)
                          for instance_id in new_instance_ids]
-            new_guests = map(self.get_guest, new_insts)
+            new_guests = [self.get_guest(instance) for instance in new_insts]
 
             # Connect nodes to the cluster head
-            for guest in new_guests:
-                guest.cluster_meet(cluster_head_ip, cluster_head_port)
+            fanout.fan_out(
+                lambda guest: guest.cluster_meet(cluster_head_ip,
+                                                 cluster_head_port),
+                new_guests)
 
-            for guest in new_guests:
-                guest.cluster_complete()
+            fanout.fan_out(lambda guest: guest.cluster_complete(),
+                           new_guests)
 
         timeout = Timeout(CONF.cluster_usage_timeout)
         try:
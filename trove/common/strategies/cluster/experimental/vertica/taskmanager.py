@@ -15,6 +15,7 @@ from eventlet.timeout import Timeout
 from oslo_log import log as logging
 
 from trove.common import cfg
+from trove.common import fanout
 from trove.common.i18n import _
 from trove.common.strategies.cluster import base
 from trove.common.strategies.cluster.experimental.vertica.api import \
@@ -43,6 +44,16 @@ class VerticaTaskManagerStrategy(base.BaseTaskManagerStrategy):
 
 class VerticaClusterTasks(task_models.ClusterTasks):
 
+    @staticmethod
+    def _authorize_public_keys(guests, user):
+        """Authorize the public keys of a user on each of the guests on all
+        the others.
+        """
+        pub_key = fanout.fan_out(
+            lambda guest: guest.get_public_keys(user), guests)
+        fanout.fan_out(
+            lambda guest: guest.authorize_public_keys(user, pub_key), guests)
+
     def create_cluster(self, context, cluster_id):
         LOG.debug("Begin create_cluster for id: %s.", cluster_id)
 
@@ -75,9 +86,7 @@ class VerticaClusterTasks(task_models.ClusterTasks):
             LOG.debug("Configuring password-less SSH on cluster members.")
             try:
                 for user in authorized_users_without_password:
-                    pub_key = [guest.get_public_keys(user) for guest in guests]
-                    for guest in guests:
-                        guest.authorize_public_keys(user, pub_key)
+                    self._authorize_public_keys(guests, user)
 
                 LOG.debug("Installing cluster with members: %s.", member_ips)
                 for db_instance in db_instances:
@@ -89,8 +98,8 @@ class VerticaClusterTasks(task_models.ClusterTasks):
                         break
 
                 LOG.debug("Finalizing cluster configuration.")
-                for guest in guests:
-                    guest.cluster_complete()
+                fanout.fan_out(lambda guest: guest.cluster_complete(),
+                               guests)
             except Exception:
                 LOG.exception("Error creating cluster.")
                 self.update_statuses_on_failure(cluster_id)
@@ -139,9 +148,7 @@ class VerticaClusterTasks(task_models.ClusterTasks):
             new_ips = [self.get_ip(instance) for instance in new_insts]
 
             for user in authorized_users_without_password:
-                pub_key = [guest.get_public_keys(user) for guest in all_guests]
-                for guest in all_guests:
-                    guest.authorize_public_keys(user, pub_key)
+                self._authorize_public_keys(all_guests, user)
 
             for db_instance in db_instances:
                 if db_instance['type'] == 'master':
@@ -151,8 +158,8 @@ class VerticaClusterTasks(task_models.ClusterTasks):
                     self.get_guest(master_instance).grow_cluster(new_ips)
                     break
 
-            for guest in new_guests:
-                guest.cluster_complete()
+            fanout.fan_out(lambda guest: guest.cluster_complete(),
+                           new_guests)
 
         timeout = Timeout(CONF.cluster_usage_timeout)
 
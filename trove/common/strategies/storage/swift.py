@@ -14,9 +14,14 @@
 #    under the License.
 #
 
+import collections
 import hashlib
 import json
+import math
 
+import eventlet
+from eventlet import queue
+from eventlet import semaphore
 from oslo_log import log as logging
 import six
 
@@ -32,6 +37,10 @@ CHUNK_SIZE = CONF.backup_chunk_size
 MAX_FILE_SIZE = CONF.backup_segment_max_size
 BACKUP_CONTAINER = CONF.backup_swift_container
 
+# Chunks of deduplicated backups are stored as <CHUNK_PREFIX><sha256>
+CHUNK_PREFIX = 'chunks/'
+CHUNK_MANIFEST_TYPE = 'application/x-trove-chunk-manifest'
+
 
 class DownloadError(Exception):
     """Error running the Swift Download Command."""
@@ -94,6 +103,83 @@ class StreamReader(object):
         self.segment_length += len(chunk)
         return chunk
 
+    def read_segment(self, chunk_size=CHUNK_SIZE):
+        """Read the whole current segment into memory."""
+        chunks = []
+        chunk = self.read(chunk_size)
+        while chunk:
+            chunks.append(chunk)
+            chunk = self.read(chunk_size)
+        return b''.join(chunks)
+
+
+def is_chunk_manifest(headers):
+    """Tell whether an object was written by DedupSwiftStorage."""
+    content_type = headers.get('content-type', '').split(';')[0].strip()
+    return content_type == CHUNK_MANIFEST_TYPE
+
+
+class ContentDefinedChunker(object):
+    """Cut a stream into chunks at boundaries defined by its content.
+
+    Every byte is mapped to a pseudo-random hex digit and a chunk ends where
+    the digits of the last few bytes match a fixed pattern. Boundaries
+    therefore move along with the data when bytes are inserted or removed,
+    and the chunks around a change are cut exactly as before. Matching is
+    done with bytes.translate() and find() so the stream is never walked
+    in Python.
+    """
+
+    # Changing either of these would stop new backups from sharing chunks
+    # with the existing ones.
+    DIGIT_TABLE = bytes(bytearray(
+        bytearray(b'0123456789abcdef')[
+            bytearray(hashlib.md5(six.int2byte(i)).digest())[0] & 0xf]
+        for i in range(256)))
+    BOUNDARY = hashlib.sha256(b'trove-backup-chunk').hexdigest().encode()
+
+    def __init__(self, stream, avg_size, min_size=None, max_size=None,
+                 read_size=CHUNK_SIZE):
+        self.stream = stream
+        self.min_size = min_size or avg_size // 4
+        self.max_size = max_size or avg_size * 4
+        self.read_size = read_size
+        # A pattern of n hex digits shows up every 16^n bytes on average.
+        window = int(round(math.log(max(avg_size - self.min_size, 16), 16)))
+        self.window = min(window, self.min_size, len(self.BOUNDARY))
+        self.boundary = self.BOUNDARY[:self.window]
+
+    def __iter__(self):
+        data = bytearray()
+        digits = bytearray()
+        start = 0
+        end_of_file = False
+        while True:
+            while not end_of_file and len(data) - start < self.max_size:
+                chunk = self.stream.read(self.read_size)
+                if chunk:
+                    data += chunk
+                    digits += chunk.translate(self.DIGIT_TABLE)
+                else:
+                    end_of_file = True
+            if start == len(data):
+                break
+            end = digits.find(self.boundary,
+                              start + self.min_size - self.window,
+                              start + self.max_size)
+            if end < 0:
+                end = min(len(data), start + self.max_size)
+            else:
+                end += self.window
+            yield bytes(data[start:end])
+            start = end
+            # Drop what was consumed once in a while rather than moving the
+            # rest of the buffer after every chunk.
+            if start >= self.max_size:
+                del data[:start]
+                del digits[:start]
+                start = 0
+
 
 class SwiftStorage(base.Storage):
     """Implementation of Storage Strategy for Swift."""
@@ -119,48 +205,37 @@ class SwiftStorage(base.Storage):
         LOG.debug('Creating container %s.', BACKUP_CONTAINER)
         self.connection.put_container(BACKUP_CONTAINER)
 
-        # Swift Checksum is the checksum of the concatenated segment checksums
-        swift_checksum = hashlib.md5()
+        concurrency = CONF.backup_upload_concurrency
+        if concurrency > 1:
+            segment_size = min(MAX_FILE_SIZE,
+                               CONF.backup_upload_buffer_size // concurrency)
+        else:
+            segment_size = MAX_FILE_SIZE
 
         # Wrap the output of the backup process to segment it for swift
-        stream_reader = StreamReader(stream, filename, MAX_FILE_SIZE)
+        stream_reader = StreamReader(stream, filename, segment_size)
         LOG.debug('Using segment size %s', stream_reader.max_file_size)
 
         url = self.connection.url
         # Full location where the backup manifest is stored
         location = "%s/%s/%s" % (url, BACKUP_CONTAINER, filename)
 
-        # Information about each segment upload job
-        segment_results = []
-
         # Read from the stream and write to the container in swift
-        while not stream_reader.end_of_file:
-            LOG.debug('Saving segment %s.', stream_reader.segment)
-            path = stream_reader.segment_path
-            etag = self.connection.put_object(BACKUP_CONTAINER,
-                                              stream_reader.segment,
-                                              stream_reader)
-
-            segment_checksum = stream_reader.segment_checksum.hexdigest()
-
-            # Check each segment MD5 hash against swift etag
-            # Raise an error and mark backup as failed
-            if etag != segment_checksum:
-                LOG.error("Error saving data segment to swift. "
-                          "ETAG: %(tag)s Segment MD5: %(checksum)s.",
-                          {'tag': etag, 'checksum': segment_checksum})
-                return False, "Error saving data to Swift!", None, location
-
-            segment_results.append({
-                'path': path,
-                'etag': etag,
-                'size_bytes': stream_reader.segment_length
-            })
+        if concurrency > 1:
+            segment_results = self._save_segments_concurrently(stream_reader,
+                                                               concurrency)
+        else:
+            segment_results = self._save_segments(stream_reader)
+        if segment_results is None:
+            return False, "Error saving data to Swift!", None, location
 
+        # Swift Checksum is the checksum of the concatenated segment checksums
+        swift_checksum = hashlib.md5()
+        for segment_result in segment_results:
             if six.PY3:
-                swift_checksum.update(segment_checksum.encode())
+                swift_checksum.update(segment_result['etag'].encode())
             else:
-                swift_checksum.update(segment_checksum)
+                swift_checksum.update(segment_result['etag'])
 
         # All segments uploaded.
         num_segments = len(segment_results)
@@ -229,6 +304,108 @@ class SwiftStorage(base.Storage):
         return (True, "Successfully saved data to Swift!",
                 final_swift_checksum, location)
 
+    def _connection_pool(self, size):
+        """Return a queue of `size` swift connections, ours included."""
+        connections = queue.LightQueue()
+        connections.put(self.connection)
+        while connections.qsize() < size:
+            connections.put(create_swift_client(self.context))
+        return connections
+
+    def _check_segment_etag(self, etag, segment_checksum):
+        # Check each segment MD5 hash against swift etag
+        if etag != segment_checksum:
+            LOG.error("Error saving data segment to swift. "
+                      "ETAG: %(tag)s Segment MD5: %(checksum)s.",
+                      {'tag': etag, 'checksum': segment_checksum})
+            return False
+        return True
+
+    def _save_segments(self, stream_reader):
+        """Stream the segments to swift one after another.
+
+        :return: the list of uploaded segments, or None if a segment failed
+                 its checksum verification
+        """
+        segment_results = []
+        while not stream_reader.end_of_file:
+            LOG.debug('Saving segment %s.', stream_reader.segment)
+            path = stream_reader.segment_path
+            etag = self.connection.put_object(BACKUP_CONTAINER,
+                                              stream_reader.segment,
+                                              stream_reader)
+
+            segment_checksum = stream_reader.segment_checksum.hexdigest()
+            if not self._check_segment_etag(etag, segment_checksum):
+                return None
+
+            segment_results.append({
+                'path': path,
+                'etag': etag,
+                'size_bytes': stream_reader.segment_length
+            })
+        return segment_results
+
+    def _save_segments_concurrently(self, stream_reader, concurrency):
+        """Upload up to `concurrency` segments to swift at the same time.
+
+        The next segment is read from the backup stream while the previous
+        ones are still being uploaded, each upload using its own connection
+        from a pool. No more than `concurrency` segments are held in memory
+        at any time: reading a new segment waits for an upload slot.
+
+        :return: the list of uploaded segments in order, or None if a segment
+                 failed its checksum verification
+        """
+        connections = self._connection_pool(concurrency)
+        slots = semaphore.Semaphore(concurrency)
+        pool = eventlet.GreenPool(concurrency)
+        chunk_size = min(CHUNK_SIZE, stream_reader.max_file_size)
+        segment_results = []
+        errors = []
+
+        def _upload(segment, data, segment_result):
+            connection = connections.get()
+            try:
+                etag = connection.put_object(BACKUP_CONTAINER, segment, data)
+                if self._check_segment_etag(etag, segment_result['etag']):
+                    LOG.debug('Saved segment %s.', segment)
+                else:
+                    errors.append(None)
+            except Exception as e:
+                LOG.exception("Error saving data segment %s to swift.",
+                              segment)
+                errors.append(e)
+            finally:
+                connections.put(connection)
+                slots.release()
+
+        while not stream_reader.end_of_file and not errors:
+            slots.acquire()
+            segment = stream_reader.segment
+            path = stream_reader.segment_path
+            data = stream_reader.read_segment(chunk_size)
+            if not data and segment_results:
+                # The stream ended right at a segment boundary.
+                slots.release()
+                break
+            segment_result = {
+                'path': path,
+                'etag': stream_reader.segment_checksum.hexdigest(),
+                'size_bytes': stream_reader.segment_length
+            }
+            segment_results.append(segment_result)
+            LOG.debug('Saving segment %s.', segment)
+            pool.spawn_n(_upload, segment, data, segment_result)
+        pool.waitall()
+
+        for error in errors:
+            if error is not None:
+                raise error
+        if errors:
+            return None
+        return segment_results
+
     def _explodeLocation(self, location):
         storage_url = "/".join(location.split('/')[:-2])
         container = location.split('/')[-2]
@@ -253,6 +430,14 @@ class SwiftStorage(base.Storage):
         """Restore a backup from the input stream to the restore_location."""
         storage_url, container, filename = self._explodeLocation(location)
 
+        concurrency = CONF.restore_download_concurrency
+        if concurrency > 1:
+            headers = self.connection.head_object(container, filename)
+            if CONF.verify_swift_checksum_on_restore:
+                self._verify_checksum(headers.get('etag', ''), backup_checksum)
+            segments = self._get_segments(container, filename, headers)
+            return self._load_segments_concurrently(segments, concurrency)
+
         headers, info = self.connection.get_object(container, filename,
                                                    resp_chunk_size=CHUNK_SIZE)
 
@@ -261,6 +446,95 @@ class SwiftStorage(base.Storage):
 
         return info
 
+    def _get_segments(self, container, filename, headers):
+        """List the (container, name, md5, size) of each segment of a backup.
+
+        A backup stored as a single object is its own only segment.
+        """
+        if headers.get('x-static-large-object', '').lower() != 'true':
+            return [(container, filename, headers.get('etag', '').strip('"'),
+                     int(headers.get('content-length', 0)))]
+
+        _headers, manifest = self.connection.get_object(
+            container, filename, query_string='multipart-manifest=get')
+        return self._parse_segments(manifest)
+
+    def _parse_segments(self, manifest):
+        if isinstance(manifest, six.binary_type):
+            manifest = manifest.decode('utf-8')
+        segments = []
+        for segment in json.loads(manifest):
+            # Segment names are in the format /<container>/<name>
+            segment_container, name = (
+                segment['name'].lstrip('/').split('/', 1))
+            segments.append((segment_container, name, segment['hash'],
+                             int(segment['bytes'])))
+        return segments
+
+    def _load_segments_concurrently(self, segments, concurrency):
+        """Download the segments with ranged requests run concurrently.
+
+        Up to `concurrency` ranges are being fetched ahead of the consumer
+        at any time, each over its own connection from a pool, while the
+        data is yielded in order. The MD5 of each segment is checked when its
+        last range arrives, before that range is handed to the consumer.
+        """
+        range_size = CONF.restore_download_range_size
+        connections = self._connection_pool(concurrency)
+        pool = eventlet.GreenPool(concurrency)
+
+        def _ranges():
+            for container, name, checksum, size in segments:
+                for start in range(0, size, range_size):
+                    end = min(start + range_size, size) - 1
+                    last = end + 1 == size
+                    yield container, name, checksum, start, end, last
+
+        def _fetch(container, name, start, end):
+            connection = connections.get()
+            try:
+                _headers, data = connection.get_object(
+                    container, name,
+                    headers={'Range': 'bytes=%d-%d' % (start, end)})
+            finally:
+                connections.put(connection)
+            if len(data) != end - start + 1:
+                raise DownloadError(
+                    _("Got %(got)d bytes from %(name)s instead of "
+                      "%(expected)d.") % {'got': len(data), 'name': name,
+                                          'expected': end - start + 1})
+            return data
+
+        def _stream():
+            ranges = _ranges()
+            in_flight = collections.deque()
+
+            def _read_ahead():
+                while len(in_flight) < concurrency:
+                    try:
+                        (container, name, checksum,
+                         start, end, last) = next(ranges)
+                    except StopIteration:
+                        return
+                    in_flight.append((name, checksum, last, pool.spawn(
+                        _fetch, container, name, start, end)))
+
+            segment_checksum = hashlib.md5()
+            _read_ahead()
+            while in_flight:
+                name, checksum, last, fetch = in_flight.popleft()
+                data = fetch.wait()
+                _read_ahead()
+                segment_checksum.update(data)
+                if last:
+                    self._verify_checksum(checksum,
+                                          segment_checksum.hexdigest())
+                    LOG.debug('Downloaded segment %s.', name)
+                    segment_checksum = hashlib.md5()
+                yield data
+
+        return _stream()
+
     def _get_attr(self, original):
         """Get a friendly name from an object header key."""
         key = original.replace('-', '_')
@@ -300,3 +574,123 @@ class SwiftStorage(base.Storage):
 
         LOG.info("Writing metadata: %s", str(headers))
         self.connection.post_object(container, filename, headers=headers)
+
+
+class DedupSwiftStorage(SwiftStorage):
+    """Swift storage keeping every distinct chunk of the backups once.
+
+    The backup stream is cut into content-defined chunks, which are stored
+    as <CHUNK_PREFIX><sha256> objects shared by all the backups in the
+    container; only chunks not stored yet are uploaded. The backup object
+    itself is a manifest listing the chunks, in the format of a Static
+    Large Object manifest, but not an SLO since those are limited in size
+    and delete their segments with them. Chunks are garbage collected by
+    the task manager when backups are deleted (see BackupChunks).
+
+    Backups saved by SwiftStorage can still be loaded.
+    """
+    __strategy_name__ = 'dedupswift'
+
+    def save(self, filename, stream, metadata=None):
+        """Persist the chunks missing from swift and the backup manifest.
+
+        The manifest is saved to the location <BACKUP_CONTAINER>/<filename>
+        and its checksum is the one of the backup.
+        """
+        LOG.info('Saving %(filename)s to %(container)s in swift, '
+                 'deduplicated.',
+                 {'filename': filename, 'container': BACKUP_CONTAINER})
+        self.connection.put_container(BACKUP_CONTAINER)
+        location = "%s/%s/%s" % (self.connection.url, BACKUP_CONTAINER,
+                                 filename)
+
+        _headers, objects = self.connection.get_container(
+            BACKUP_CONTAINER, prefix=CHUNK_PREFIX, full_listing=True)
+        stored = set(obj['name'] for obj in objects)
+        LOG.debug('Found %d chunks already stored.', len(stored))
+
+        concurrency = CONF.backup_upload_concurrency
+        connections = self._connection_pool(concurrency)
+        slots = semaphore.Semaphore(concurrency)
+        pool = eventlet.GreenPool(concurrency)
+        manifest = []
+        errors = []
+        reused = 0
+
+        def _upload(name, data, checksum):
+            connection = connections.get()
+            try:
+                etag = connection.put_object(BACKUP_CONTAINER, name, data)
+                if not self._check_segment_etag(etag, checksum):
+                    errors.append(None)
+            except Exception as e:
+                LOG.exception("Error saving chunk %s to swift.", name)
+                errors.append(e)
+            finally:
+                connections.put(connection)
+                slots.release()
+
+        chunker = ContentDefinedChunker(stream, CONF.backup_dedup_chunk_size)
+        for data in chunker:
+            if errors:
+                break
+            name = CHUNK_PREFIX + hashlib.sha256(data).hexdigest()
+            checksum = hashlib.md5(data).hexdigest()
+            manifest.append({'name': '/%s/%s' % (BACKUP_CONTAINER, name),
+                             'hash': checksum,
+                             'bytes': len(data)})
+            if name in stored:
+                reused += len(data)
+                continue
+            stored.add(name)
+            slots.acquire()
+            pool.spawn_n(_upload, name, data, checksum)
+        pool.waitall()
+
+        for error in errors:
+            if error is not None:
+                raise error
+        if errors:
+            return False, "Error saving data to Swift!", None, location
+
+        if metadata is None:
+            metadata = {}
+        metadata.update(stream.metadata())
+        headers = {}
+        for key, value in metadata.items():
+            headers[self._set_attr(key)] = value
+
+        manifest_data = json.dumps(manifest)
+        checksum = hashlib.md5(manifest_data.encode('utf-8')).hexdigest()
+        etag = self.connection.put_object(BACKUP_CONTAINER, filename,
+                                          manifest_data,
+                                          content_type=CHUNK_MANIFEST_TYPE,
+                                          headers=headers)
+        if etag != checksum:
+            LOG.error("Error saving manifest to swift. ETAG: %(tag)s "
+                      "Manifest MD5: %(checksum)s.",
+                      {'tag': etag, 'checksum': checksum})
+            return False, "Error saving data to Swift!", None, location
+
+        LOG.info('Saved %(filename)s in %(count)d chunks, %(reused)d of '
+                 '%(size)d bytes were already stored.',
+                 {'filename': filename, 'count': len(manifest),
+                  'reused': reused,
+                  'size': sum(chunk['bytes'] for chunk in manifest)})
+        return (True, "Successfully saved data to Swift!",
+                checksum, location)
+
+    def load(self, location, backup_checksum):
+        """Stream the chunks of a backup back in order."""
+        storage_url, container, filename = self._explodeLocation(location)
+        headers = self.connection.head_object(container, filename)
+        if not is_chunk_manifest(headers):
+            return super(DedupSwiftStorage, self).load(location,
+                                                       backup_checksum)
+
+        headers, manifest = self.connection.get_object(container, filename)
+        if CONF.verify_swift_checksum_on_restore:
+            self._verify_checksum(headers.get('etag', ''), backup_checksum)
+        return self._load_segments_concurrently(
+            self._parse_segments(manifest),
+            CONF.restore_download_concurrency)
@@ -82,3 +82,13 @@ def isotime(tm=None, subsecond=False):
         ts = _dt.isoformat()
 
     return ts
+
+
+def parse_isotime(timestr):
+    """Parse a naive time in the ISO 8601 format of datetime.isoformat(),
+       with or without subsecond information.
+    """
+    try:
+        return datetime.strptime(timestr, '%Y-%m-%dT%H:%M:%S.%f')
+    except ValueError:
+        return datetime.strptime(timestr, '%Y-%m-%dT%H:%M:%S')
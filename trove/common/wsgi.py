@@ -21,7 +21,6 @@ import traceback
 import uuid
 
 import eventlet.wsgi
-import jsonschema
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_service import service
@@ -37,6 +36,7 @@ from trove.common import context as rd_context
 from trove.common import exception
 from trove.common.i18n import _
 from trove.common import pastedeploy
+from trove.common import schema_validator
 from trove.common import utils
 
 CONTEXT_KEY = 'trove.context'
@@ -44,6 +44,7 @@ Router = base_wsgi.Router
 Debug = base_wsgi.Debug
 Middleware = base_wsgi.Middleware
 JSONDictSerializer = base_wsgi.JSONDictSerializer
+LazyList = base_wsgi.LazyList
 RequestDeserializer = base_wsgi.RequestDeserializer
 
 CONF = cfg.CONF
@@ -228,6 +229,15 @@ class Result(object):
             return self._data.data_for_json()
         return self._data
 
+    def render_first(self):
+        """Make the first item of the lists of the result which are made as
+        the response is written, see LazyList.render_first.
+        """
+        if isinstance(self._data, dict):
+            for value in self._data.values():
+                if isinstance(value, LazyList):
+                    value.render_first()
+
 
 class Resource(base_wsgi.Resource):
     def __init__(self, controller, deserializer, serializer,
@@ -251,6 +261,9 @@ class Resource(base_wsgi.Resource):
                 **action_args)
             if type(result) is dict:
                 result = Result(result)
+            if isinstance(result, Result):
+                # Errors of the views are handled as those of the action.
+                result.render_first()
             return result
 
         except exception.TroveError as trove_error:
@@ -403,7 +416,7 @@ class Controller(object):
         body = action_args.get('body', {})
         schema = self.get_schema(action, body)
         if schema:
-            validator = jsonschema.Draft4Validator(schema)
+            validator = schema_validator.get_validator(schema)
             if not validator.is_valid(body):
                 errors = sorted(validator.iter_errors(body),
                                 key=lambda e: e.path)
@@ -412,6 +425,8 @@ class Controller(object):
                 raise exception.BadRequest(message=error_msg)
 
     def create_resource(self):
+        # Compiled once, rather than on the first request of each action.
+        schema_validator.compile_schemas(self.schemas)
         return Resource(
             self,
             RequestDeserializer(),
@@ -0,0 +1,213 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+from datetime import timedelta
+import threading
+import time
+
+from oslo_log import log as logging
+from oslo_service import loopingcall
+
+from trove.common import cfg
+from trove.common.instance import ServiceStatus
+from trove.common import timeutils
+from trove.conductor.models import LastSeen
+from trove.db import get_db_api
+from trove.instance import models as inst_models
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+HEARTBEAT_METHOD = 'heartbeat'
+
+
+class HeartbeatBuffer(object):
+    """Coalesces guest heartbeats in memory and writes them in bulk.
+
+    Only the most recent heartbeat (by 'sent' timestamp) of each instance is
+    kept between flushes; older ones are dropped on arrival. A flush loads
+    the service status and last seen rows of all buffered instances with one
+    query each and writes the changes back with one bulk statement per
+    table. Service statuses that did not change are not written, unless the
+    stored row is old enough that the guest would start to look unreachable
+    (see agent_heartbeat_expiry), or the volume usage carried by the
+    heartbeat changed or is about to expire (see volume_stats_cache_expiry).
+    """
+
+    def __init__(self, flush_interval=None):
+        """
+        :param flush_interval: time between flushes, in milliseconds
+        """
+        if flush_interval is None:
+            flush_interval = CONF.conductor_heartbeat_flush_interval
+        self.flush_interval = flush_interval / 1000.0
+        self.counters = collections.Counter()
+        self.last_flush_time = None
+        self.max_flush_time = 0.0
+        self._pending = {}
+        self._last_sent = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, instance_id, payload, sent=None):
+        """Buffer a heartbeat, replacing an older one for the instance."""
+        status = None
+        if payload.get('service_status') is not None:
+            # Reject bogus statuses right away, as the unbuffered path does.
+            status = ServiceStatus.from_description(payload['service_status'])
+        if sent is None:
+            LOG.error("[Instance %s] sent field not present. Cannot "
+                      "compare.", instance_id)
+        with self._lock:
+            self.counters['received'] += 1
+            if self._is_stale(instance_id, sent):
+                self.counters['dropped'] += 1
+                LOG.debug("[Instance %s] Rec'd heartbeat is older than last "
+                          "seen. Discarding.", instance_id)
+                return
+            if instance_id in self._pending:
+                self.counters['coalesced'] += 1
+            self._pending[instance_id] = (sent, status, payload.get('volume'))
+        self._start()
+
+    def _is_stale(self, instance_id, sent):
+        if sent is None:
+            return False
+        # A buffered heartbeat is always newer than the last flushed one.
+        last_sent = self._pending.get(instance_id, (None,))[0]
+        if last_sent is None:
+            last_sent = self._last_sent.get(instance_id)
+        return last_sent is not None and sent <= last_sent
+
+    def _start(self):
+        if self._flusher is None:
+            self._flusher = loopingcall.FixedIntervalLoopingCall(self.flush)
+            self._flusher.start(interval=self.flush_interval,
+                                initial_delay=self.flush_interval)
+
+    def stop(self):
+        if self._flusher is not None:
+            self._flusher.stop()
+            self._flusher = None
+        self.flush()
+
+    def flush(self):
+        """Write out every buffered heartbeat."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        start = time.time()
+        try:
+            self._write(pending)
+        except Exception:
+            LOG.exception("Failed to write %d buffered heartbeats, they will "
+                          "be retried.", len(pending))
+            self._requeue(pending)
+            return
+        elapsed = time.time() - start
+        self.counters['flushes'] += 1
+        self.last_flush_time = elapsed
+        self.max_flush_time = max(self.max_flush_time, elapsed)
+        LOG.debug("Flushed %(count)d heartbeats in %(time).3fs "
+                  "(counters: %(counters)s).",
+                  {'count': len(pending), 'time': elapsed,
+                   'counters': dict(self.counters)})
+
+    def _requeue(self, pending):
+        with self._lock:
+            for instance_id, heartbeat in pending.items():
+                if not self._is_stale(instance_id, heartbeat[0]):
+                    self._pending[instance_id] = heartbeat
+
+    def _write(self, pending):
+        instance_ids = list(pending)
+        seen_rows = dict(
+            (seen.instance_id, seen)
+            for seen in LastSeen.load_all(instance_ids, HEARTBEAT_METHOD))
+        status_rows = dict(
+            (status.instance_id, status)
+            for status in inst_models.InstanceServiceStatus.find_by_filter(
+                filters=[inst_models.InstanceServiceStatus.instance_id.in_(
+                    instance_ids)]).all())
+
+        now = timeutils.utcnow()
+        touch_before = now - timedelta(
+            seconds=CONF.agent_heartbeat_expiry / 2.0)
+        volume_touch_before = now - timedelta(
+            seconds=CONF.volume_stats_cache_expiry / 2.0)
+        seen_inserts = []
+        seen_updates = []
+        status_updates = []
+        for instance_id, (sent, status, volume) in pending.items():
+            if instance_id not in status_rows:
+                LOG.error("[Instance %s] Service status not found, "
+                          "discarding heartbeat.", instance_id)
+                self.counters['dropped'] += 1
+                continue
+            if sent is not None:
+                seen = seen_rows.get(instance_id)
+                if seen is None:
+                    seen_inserts.append({'instance_id': instance_id,
+                                         'method_name': HEARTBEAT_METHOD,
+                                         'sent': sent})
+                elif float(seen.sent) < sent:
+                    seen_updates.append({'instance_id': instance_id,
+                                         'method_name': HEARTBEAT_METHOD,
+                                         'sent': sent})
+                else:
+                    LOG.info("[Instance %s] Rec'd message is older than "
+                             "last seen. Discarding.", instance_id)
+                    self.counters['dropped'] += 1
+                    continue
+                self._last_sent[instance_id] = sent
+
+            row = status_rows[instance_id]
+            changed = status is not None and status.code != row.status_id
+            volume_changed = volume is not None and (
+                _volume_changed(row, volume) or
+                row.volume_updated is None or
+                row.volume_updated <= volume_touch_before)
+            if (not changed and not volume_changed and
+                    row.updated_at is not None and
+                    row.updated_at > touch_before):
+                self.counters['unchanged'] += 1
+                continue
+            update = {'id': row.id, 'updated_at': now}
+            if status is not None:
+                update['status_id'] = status.code
+                update['status_description'] = status.description
+            if volume is not None:
+                update['volume_used'] = volume['used']
+                update['volume_total'] = volume['total']
+                update['volume_updated'] = now
+            status_updates.append(update)
+
+        db_api = get_db_api()
+        if seen_inserts or seen_updates:
+            db_api.bulk_save(LastSeen, inserts=seen_inserts,
+                             updates=seen_updates)
+        if status_updates:
+            db_api.bulk_save(inst_models.InstanceServiceStatus,
+                             updates=status_updates)
+        self.counters['written'] += len(status_updates)
+
+
+def _volume_changed(row, volume):
+    # Sizes are reported in GB rounded to two decimals, but may not be
+    # stored exactly.
+    return (row.volume_used is None or row.volume_total is None or
+            round(row.volume_used, 2) != round(volume['used'], 2) or
+            round(row.volume_total, 2) != round(volume['total'], 2))
@@ -22,6 +22,7 @@ from trove.common import exception as trove_exception
 from trove.common.instance import ServiceStatus
 from trove.common.rpc import version as rpc_version
 from trove.common.serializable_notification import SerializableNotification
+from trove.conductor.heartbeat import HeartbeatBuffer
 from trove.conductor.models import LastSeen
 from trove.extensions.mysql import models as mysql_models
 from trove.instance import models as inst_models
@@ -36,6 +37,14 @@ class Manager(periodic_task.PeriodicTasks):
 
     def __init__(self):
         super(Manager, self).__init__(CONF)
+        self.heartbeat_buffer = None
+        if CONF.conductor_heartbeat_coalescing:
+            self.heartbeat_buffer = HeartbeatBuffer()
+
+    def cleanup(self):
+        """Write out the buffered heartbeats, called on shutdown."""
+        if self.heartbeat_buffer is not None:
+            self.heartbeat_buffer.stop()
 
     def _message_too_old(self, instance_id, method_name, sent):
         fields = {
@@ -84,6 +93,9 @@ class Manager(periodic_task.PeriodicTasks):
         LOG.debug("Instance ID: %(instance)s, Payload: %(payload)s",
                   {"instance": str(instance_id),
                    "payload": str(payload)})
+        if self.heartbeat_buffer is not None:
+            self.heartbeat_buffer.add(instance_id, payload, sent=sent)
+            return
         status = inst_models.InstanceServiceStatus.find_by(
             instance_id=instance_id)
         if self._message_too_old(instance_id, 'heartbeat', sent):
@@ -91,6 +103,8 @@ class Manager(periodic_task.PeriodicTasks):
         if payload.get('service_status') is not None:
             status.set_status(ServiceStatus.from_description(
                 payload['service_status']))
+        if payload.get('volume') is not None:
+            status.set_volume_info(payload['volume'])
         status.save()
 
     def update_backup(self, context, instance_id, backup_id,
@@ -47,3 +47,9 @@ class LastSeen(object):
     def create(cls, instance_id, method_name, sent):
         seen = LastSeen(instance_id, method_name, sent)
         return seen.save()
+
+    @classmethod
+    def load_all(cls, instance_ids, method_name):
+        return get_db_api().find_by_filter(
+            cls, filters=[cls.instance_id.in_(instance_ids)],
+            method_name=method_name).all()
@@ -45,14 +45,9 @@ class Configurations(object):
 
         if context.is_admin:
             db_info = DBConfiguration.find_all(deleted=False)
-            if db_info.count() == 0:
-                LOG.debug("No configurations found for admin user")
         else:
             db_info = DBConfiguration.find_all(tenant_id=context.tenant,
                                                deleted=False)
-            if db_info.count() == 0:
-                LOG.debug("No configurations found for tenant %s",
-                          context.tenant)
 
         limit = utils.pagination_limit(context.limit,
                                        Configurations.DEFAULT_LIMIT)
@@ -61,6 +56,12 @@ class Configurations(object):
                                                        "foo",
                                                        limit=limit,
                                                        marker=context.marker)
+        if not data_view.collection and not context.marker:
+            if context.is_admin:
+                LOG.debug("No configurations found for admin user")
+            else:
+                LOG.debug("No configurations found for tenant %s",
+                          context.tenant)
         next_marker = data_view.next_page_marker
         return data_view.collection, next_marker
 
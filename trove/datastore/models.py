@@ -15,7 +15,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import threading
+import time
+
 from oslo_log import log as logging
+from oslo_utils import excutils
 
 from trove.common import cfg
 from trove.common import exception
@@ -32,6 +37,10 @@ LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 db_api = get_db_api()
 
+# The row of the metadata_generations table counting the changes to the
+# datastore metadata.
+DATASTORE_GENERATION = 'datastores'
+
 
 def persisted_models():
     return {
@@ -39,50 +48,204 @@ def persisted_models():
         'capabilities': DBCapabilities,
         'datastore_versions': DBDatastoreVersion,
         'capability_overrides': DBCapabilityOverrides,
-        'datastore_version_metadata': DBDatastoreVersionMetadata
+        'datastore_version_metadata': DBDatastoreVersionMetadata,
+        'metadata_generations': DBMetadataGeneration
     }
 
 
-class DBDatastore(dbmodels.DatabaseModelBase):
+class DBMetadataGeneration(dbmodels.DatabaseModelBase):
+
+    _data_fields = ['generation', 'created', 'updated']
+    _table_name = 'metadata_generations'
+
+
+@contextlib.contextmanager
+def changing_metadata():
+    """Invalidate the metadata cache of every process once the datastore
+    metadata written within the block is saved.
+    """
+    try:
+        yield
+    except Exception:
+        with excutils.save_and_reraise_exception():
+            # The cached rows may have been changed before the write failed.
+            metadata_cache.reset()
+    metadata_cache.invalidate()
+
+
+class CachedModelBase(dbmodels.DatabaseModelBase):
+    """A model whose rows are held by the metadata cache."""
+
+    def save(self):
+        with changing_metadata():
+            return super(CachedModelBase, self).save()
+
+    def delete(self):
+        with changing_metadata():
+            return super(CachedModelBase, self).delete()
+
+    def update(self, **values):
+        with changing_metadata():
+            return super(CachedModelBase, self).update(**values)
+
+
+class DBDatastore(CachedModelBase):
 
     _data_fields = ['name', 'default_version_id']
     _table_name = 'datastores'
 
 
-class DBCapabilities(dbmodels.DatabaseModelBase):
+class DBCapabilities(CachedModelBase):
 
     _data_fields = ['name', 'description', 'enabled']
     _table_name = 'capabilities'
 
 
-class DBCapabilityOverrides(dbmodels.DatabaseModelBase):
+class DBCapabilityOverrides(CachedModelBase):
 
     _data_fields = ['capability_id', 'datastore_version_id', 'enabled']
     _table_name = 'capability_overrides'
 
 
-class DBDatastoreVersion(dbmodels.DatabaseModelBase):
+class DBDatastoreVersion(CachedModelBase):
 
     _data_fields = ['datastore_id', 'name', 'image_id', 'packages',
                     'active', 'manager']
     _table_name = 'datastore_versions'
 
 
-class DBDatastoreVersionMetadata(dbmodels.DatabaseModelBase):
+class DBDatastoreVersionMetadata(CachedModelBase):
 
     _data_fields = ['datastore_version_id', 'key', 'value',
                     'created', 'deleted', 'deleted_at', 'updated_at']
     _table_name = 'datastore_version_metadata'
 
 
+def _get_generation():
+    row = DBMetadataGeneration.get_by(id=DATASTORE_GENERATION)
+    return row.generation if row else 0
+
+
+def _bump_generation():
+    updated = DBMetadataGeneration.query().filter_by(
+        id=DATASTORE_GENERATION).update(
+        {'generation': DBMetadataGeneration.generation + 1,
+         'updated': timeutils.utcnow()}, synchronize_session=False)
+    if not updated:
+        try:
+            DBMetadataGeneration.create(id=DATASTORE_GENERATION,
+                                        generation=1)
+        except exception.DBConstraintError:
+            # Created concurrently.
+            _bump_generation()
+
+
+class MetadataSnapshot(object):
+    """The datastores, versions, capabilities, capability overrides and
+    version metadata, as of one generation, indexed for lookups.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.datastores = {}
+        self.datastores_by_name = {}
+        for datastore in DBDatastore.find_all():
+            self.datastores[datastore.id] = datastore
+            self.datastores_by_name[datastore.name] = datastore
+
+        self.versions = {}
+        self.versions_by_name = {}
+        for version in DBDatastoreVersion.find_all():
+            self.versions[version.id] = version
+            self.versions_by_name.setdefault(
+                (version.datastore_id, version.name), []).append(version)
+
+        self.capabilities = tuple(DBCapabilities.find_all())
+        self.capabilities_by_id = {}
+        self.capabilities_by_name = {}
+        for capability in self.capabilities:
+            self.capabilities_by_id[capability.id] = capability
+            self.capabilities_by_name[capability.name] = capability
+
+        self.overrides = {}
+        for override in DBCapabilityOverrides.find_all():
+            self.overrides.setdefault(override.datastore_version_id, {})[
+                override.capability_id] = override
+
+        self.version_metadata = {}
+        for metadata in DBDatastoreVersionMetadata.find_all(deleted=False):
+            self.version_metadata.setdefault(
+                (metadata.datastore_version_id, metadata.key),
+                []).append(metadata)
+
+
+class MetadataCache(object):
+    """Process wide cache of the datastore metadata.
+
+    A snapshot is used for datastore_metadata_cache_ttl seconds. It is then
+    kept if the generation counter, raised by every change to the metadata,
+    did not move, and reloaded otherwise. Lookups that miss the snapshot go
+    to the database, so the cache never hides a row, it may only return a
+    row for up to the ttl after another process changed or deleted it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked = 0
+        self._resets = 0
+
+    def get(self):
+        snapshot = self._snapshot
+        if (snapshot is not None and
+                time.time() - self._checked <
+                CONF.datastore_metadata_cache_ttl):
+            return snapshot
+        with self._lock:
+            resets = self._resets
+            checked = time.time()
+            generation = _get_generation()
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != generation:
+                snapshot = MetadataSnapshot(generation)
+            # A snapshot loaded while this process changed the metadata may
+            # predate the change, so it is only used for this lookup.
+            if resets == self._resets:
+                self._snapshot = snapshot
+                self._checked = checked
+        return snapshot
+
+    def reset(self):
+        """Drop the metadata cached by this process."""
+        self._resets += 1
+        self._snapshot = None
+
+    def invalidate(self):
+        """Drop the metadata cached by every process."""
+        self.reset()
+        _bump_generation()
+
+
+metadata_cache = MetadataCache()
+
+
 class Capabilities(object):
 
     def __init__(self, datastore_version_id=None):
         self.capabilities = []
         self.datastore_version_id = datastore_version_id
 
+    @property
+    def capabilities(self):
+        return self._capabilities
+
+    @capabilities.setter
+    def capabilities(self, capabilities):
+        self._capabilities = capabilities
+        self._names = set(capability.name for capability in capabilities)
+
     def __contains__(self, item):
-        return item in [capability.name for capability in self.capabilities]
+        return item in self._names
 
     def __len__(self):
         return len(self.capabilities)
@@ -110,34 +273,19 @@ class Capabilities(object):
         Bulk load and override default capabilities with configured
         datastore version specific settings.
         """
-        capability_defaults = [Capability(c)
-                               for c in DBCapabilities.find_all()]
-
-        capability_overrides = []
-        if self.datastore_version_id is not None:
-            # This should always happen but if there is any future case where
-            # we don't have a datastore version id number it won't stop
-            # defaults from rendering.
-            capability_overrides = [
-                CapabilityOverride(ce)
-                for ce in DBCapabilityOverrides.find_all(
-                    datastore_version_id=self.datastore_version_id)
-            ]
+        snapshot = metadata_cache.get()
+        # This should always have a datastore version id but if there is any
+        # future case where we don't it won't stop defaults from rendering.
+        overrides = snapshot.overrides.get(self.datastore_version_id, {})
 
         def override(cap):
-            # This logic is necessary to apply datastore version specific
-            # capability overrides when they are present in the database.
-            for capability_override in capability_overrides:
-                if cap.id == capability_override.capability_id:
-                    # we have a mapped entity that indicates this datastore
-                    # version has an override so we honor that.
-                    return capability_override
+            # Datastore version specific overrides are honored over the
+            # default setting of the capability.
+            if cap.id in overrides:
+                return CapabilityOverride(overrides[cap.id])
+            return Capability(cap)
 
-            # There were no overrides for this capability so we just hand it
-            # right back.
-            return cap
-
-        self.capabilities = [override(obj) for obj in capability_defaults]
+        self.capabilities = [override(obj) for obj in snapshot.capabilities]
 
         LOG.debug('Capabilities for datastore %(ds_id)s: %(capabilities)s',
                   {'ds_id': self.datastore_version_id,
@@ -317,6 +465,11 @@ class Capability(BaseCapability):
 
         :returns: Capability
         """
+        snapshot = metadata_cache.get()
+        db_info = (snapshot.capabilities_by_id.get(capability_id_or_name) or
+                   snapshot.capabilities_by_name.get(capability_id_or_name))
+        if db_info is not None:
+            return cls(db_info)
         try:
             return cls(DBCapabilities.find_by(id=capability_id_or_name))
         except exception.ModelNotFoundError:
@@ -347,6 +500,11 @@ class Datastore(object):
 
     @classmethod
     def load(cls, id_or_name):
+        snapshot = metadata_cache.get()
+        db_info = (snapshot.datastores.get(id_or_name) or
+                   snapshot.datastores_by_name.get(id_or_name))
+        if db_info is not None:
+            return cls(db_info)
         try:
             return cls(DBDatastore.find_by(id=id_or_name))
         except exception.ModelNotFoundError:
@@ -401,6 +559,15 @@ class DatastoreVersion(object):
 
     @classmethod
     def load(cls, datastore, id_or_name):
+        snapshot = metadata_cache.get()
+        db_info = snapshot.versions.get(id_or_name)
+        if db_info is not None and db_info.datastore_id == datastore.id:
+            return cls(db_info)
+        versions = snapshot.versions_by_name.get((datastore.id, id_or_name))
+        if versions:
+            if len(versions) > 1:
+                raise exception.NoUniqueMatch(name=id_or_name)
+            return cls(versions[0])
         try:
             return cls(DBDatastoreVersion.find_by(datastore_id=datastore.id,
                                                   id=id_or_name))
@@ -415,6 +582,9 @@ class DatastoreVersion(object):
 
     @classmethod
     def load_by_uuid(cls, uuid):
+        db_info = metadata_cache.get().versions.get(uuid)
+        if db_info is not None:
+            return cls(db_info)
         try:
             return cls(DBDatastoreVersion.find_by(id=uuid))
         except exception.ModelNotFoundError:
@@ -574,7 +744,8 @@ def update_datastore(name, default_version):
     else:
         datastore.default_version_id = None
 
-    db_api.save(datastore)
+    with changing_metadata():
+        db_api.save(datastore)
 
 
 def update_datastore_version(datastore, name, manager, image_id, packages,
@@ -595,7 +766,8 @@ def update_datastore_version(datastore, name, manager, image_id, packages,
     version.packages = packages
     version.active = active
 
-    db_api.save(version)
+    with changing_metadata():
+        db_api.save(version)
 
 
 class DatastoreVersionMetadata(object):
@@ -607,6 +779,14 @@ class DatastoreVersionMetadata(object):
         datastore and datastore version name.
         """
         db_api.configure_db(CONF)
+        snapshot = metadata_cache.get()
+        db_ds_record = snapshot.datastores_by_name.get(datastore_name)
+        if db_ds_record is not None:
+            versions = snapshot.versions_by_name.get(
+                (db_ds_record.id, datastore_version_name))
+            if versions:
+                return versions[0].id
+
         db_ds_record = DBDatastore.find_by(
             name=datastore_name
         )
@@ -617,6 +797,21 @@ class DatastoreVersionMetadata(object):
 
         return db_dsv_record.id
 
+    @classmethod
+    def get_values(cls, datastore_version_id, key):
+        """
+        The values of the specified key in the metadata table for a
+        datastore version.
+        """
+        return tuple(metadata.value for metadata in
+                     cls._datastore_version_metadata(datastore_version_id,
+                                                     key))
+
+    @classmethod
+    def _datastore_version_metadata(cls, datastore_version_id, key):
+        return tuple(metadata_cache.get().version_metadata.get(
+            (datastore_version_id, key), ()))
+
     @classmethod
     def _datastore_version_metadata_add(cls, datastore_name,
                                         datastore_version_name,
@@ -723,12 +918,8 @@ class DatastoreVersionMetadata(object):
             # metadata table return all the associated flavors for
             # that datastore version.
             nova_flavors = create_nova_client(context).flavors.list()
-            bound_flavors = DBDatastoreVersionMetadata.find_all(
-                datastore_version_id=datastore_version.id,
-                key='flavor', deleted=False
-            )
-            if (bound_flavors.count() != 0):
-                bound_flavors = tuple(f.value for f in bound_flavors)
+            bound_flavors = cls.get_values(datastore_version.id, 'flavor')
+            if bound_flavors:
                 # Generate a filtered list of nova flavors
                 ds_nova_flavors = (f for f in nova_flavors
                                    if f.id in bound_flavors)
@@ -779,10 +970,8 @@ class DatastoreVersionMetadata(object):
         empty set (if no associations are provided)
         """
         if datastore_version_id:
-            return DBDatastoreVersionMetadata.find_all(
-                datastore_version_id=datastore_version_id,
-                key='volume_type', deleted=False
-            )
+            return cls._datastore_version_metadata(datastore_version_id,
+                                                   'volume_type')
         else:
             msg = _("Specify the datastore_version_id.")
             raise exception.BadRequest(msg)
@@ -807,9 +996,9 @@ class DatastoreVersionMetadata(object):
     def datastore_volume_type_associations_exist(cls,
                                                  datastore_name,
                                                  datastore_version_name):
-        return cls.list_datastore_volume_type_associations(
+        return len(cls.list_datastore_volume_type_associations(
             datastore_name,
-            datastore_version_name).count() > 0
+            datastore_version_name)) > 0
 
     @classmethod
     def allowed_datastore_version_volume_types(cls, context,
@@ -835,7 +1024,7 @@ class DatastoreVersionMetadata(object):
 
             # if there's metadata: intersect,
             # else, whatever cinder has.
-            if (metadata.count() != 0):
+            if metadata:
                 # the volume types from metadata first
                 ds_volume_types = tuple(f.value for f in metadata)
 
@@ -13,9 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import six
+import sqlalchemy
 import sqlalchemy.exc
 
 from trove.common import exception
+from trove.common.i18n import _
+from trove.common import timeutils
+from trove.common import utils
 from trove.db.sqlalchemy import migration
 from trove.db.sqlalchemy import session
 
@@ -46,6 +51,62 @@ def find_all_by_limit(query_func, model, conditions, limit, marker=None,
                    marker_column).all()
 
 
+def find_page(query, sort_keys, limit, marker=None):
+    """Return a page of the rows of a query, in the order of the sort keys.
+
+    The page starts right after the row the marker was taken from. That
+    row is sought through the ordered index rather than reached by
+    skipping rows with an offset, so the cost only depends on the size of
+    the page, not on its position.
+
+    :param sort_keys: list of (column, descending) tuples; the last column
+                      must be unique, such as the id
+    :param marker: the sort key values of the last row of the previous
+                   page, as returned for it
+    :return: the rows of the page, and the sort key values of its last row
+             if there is a next page, None otherwise
+    """
+    if marker:
+        if len(marker) != len(sort_keys):
+            raise exception.BadRequest(_("Invalid marker: %s") % marker)
+        query = query.filter(_seek(sort_keys, marker))
+    query = query.order_by(*[column.desc() if descending else column.asc()
+                             for column, descending in sort_keys])
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, [getattr(rows[-1], column.key)
+                  for column, descending in sort_keys]
+
+
+def _seek(sort_keys, marker):
+    """Filter for the rows after the marker, that is, for (a, b) after
+    (x, y): a > x or (a = x and b > y).
+    """
+    values = [_column_value(column, value)
+              for (column, descending), value in zip(sort_keys, marker)]
+    clauses = []
+    for pos, (column, descending) in enumerate(sort_keys):
+        after = (column < values[pos]) if descending else (
+            column > values[pos])
+        clauses.append(sqlalchemy.and_(*[
+            sort_keys[prev][0] == values[prev] for prev in range(pos)] +
+            [after]))
+    return sqlalchemy.or_(*clauses)
+
+
+def _column_value(column, value):
+    # Markers carry datetimes in their ISO 8601 form.
+    if (isinstance(column.type, sqlalchemy.DateTime) and
+            isinstance(value, six.string_types)):
+        try:
+            return timeutils.parse_isotime(value)
+        except ValueError:
+            raise exception.BadRequest(_("Invalid marker: %s") % value)
+    return value
+
+
 def find_by(model, **kwargs):
     return _query_by(model, **kwargs).first()
 
@@ -66,6 +127,183 @@ def save(model):
                                           error=str(error.orig))
 
 
+def bulk_save(model, inserts=None, updates=None):
+    """Insert and update rows of a model in bulk, in a single transaction.
+
+    :param inserts: list of dicts, one per row to insert
+    :param updates: list of dicts, one per row to update; each must contain
+                    the primary key of the row
+    """
+    db_session = session.get_session()
+    try:
+        with db_session.begin():
+            if inserts:
+                db_session.bulk_insert_mappings(model, inserts)
+            if updates:
+                db_session.bulk_update_mappings(model, updates)
+    except sqlalchemy.exc.IntegrityError as error:
+        raise exception.DBConstraintError(model_name=model.__name__,
+                                          error=str(error.orig))
+
+
+def update_counters(model, column, deltas, inserts=None, guard=None):
+    """Add to a counter column of many rows, in a single transaction.
+
+    :param deltas: dict of row id to the amount added to the counter
+    :param inserts: list of dicts, rows to insert before the counters are
+                    updated
+    :param guard: optional (model, filters, values) update which must match
+                  exactly one row for anything to be written; this makes
+                  sure the same adjustment is only ever applied once
+    :return: False if the guard did not match, True otherwise
+    """
+    counter = getattr(model, column)
+    by_delta = {}
+    for row_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(row_id)
+    db_session = session.get_session()
+    try:
+        with db_session.begin():
+            if guard is not None:
+                guard_model, filters, values = guard
+                matched = db_session.query(guard_model).filter(
+                    *filters).update(values, synchronize_session=False)
+                if matched != 1:
+                    return False
+            if inserts:
+                db_session.bulk_insert_mappings(model, inserts)
+            for delta, ids in by_delta.items():
+                for start in range(0, len(ids), 500):
+                    db_session.query(model).filter(
+                        model.id.in_(ids[start:start + 500])).update(
+                        {column: counter + delta},
+                        synchronize_session=False)
+    except sqlalchemy.exc.IntegrityError as error:
+        raise exception.DBConstraintError(model_name=model.__name__,
+                                          error=str(error.orig))
+    return True
+
+
+def quota_reserve(usage_model, reservation_model, tenant_id, deltas, limits):
+    """Check the quotas of a tenant and reserve resources against them,
+    in a single transaction.
+
+    The usage rows are locked while the quotas are checked, and the reserved
+    counts are only raised if they still fit once the lock is held, so
+    concurrent reservations of a tenant can never exceed its quotas.
+
+    :param deltas: dict of resource to the amount reserved
+    :param limits: dict of resource to its hard limit, negative if unlimited
+    :return: list of dicts, the reservation rows inserted
+    :raises: :class:`QuotaExceeded` if any of the resources is over quota
+    """
+    _create_quota_usages(usage_model, tenant_id, deltas)
+    now = timeutils.utcnow()
+    db_session = session.get_session()
+    with db_session.begin():
+        usages = {usage.resource: usage for usage in db_session.query(
+            usage_model).filter(
+            usage_model.tenant_id == tenant_id,
+            usage_model.resource.in_(tuple(deltas))).order_by(
+            usage_model.id).with_for_update()}
+
+        def fits(resource):
+            return (deltas[resource] <= 0 or limits[resource] < 0 or
+                    usages[resource].in_use + usages[resource].reserved +
+                    deltas[resource] <= limits[resource])
+
+        overs = [resource for resource in deltas if not fits(resource)]
+        if overs:
+            raise exception.QuotaExceeded(overs=sorted(overs))
+
+        # Guarded, should the database not honor the lock.
+        guards = []
+        for resource, delta in deltas.items():
+            guard = usage_model.id == usages[resource].id
+            if delta > 0 and limits[resource] >= 0:
+                guard = sqlalchemy.and_(
+                    guard, usage_model.in_use + usage_model.reserved + delta
+                    <= limits[resource])
+            guards.append(guard)
+        reserved = sqlalchemy.case(
+            dict((usages[resource].id, delta)
+                 for resource, delta in deltas.items()),
+            value=usage_model.id)
+        updated = db_session.query(usage_model).filter(
+            sqlalchemy.or_(*guards)).update(
+            {'reserved': usage_model.reserved + reserved, 'updated': now},
+            synchronize_session=False)
+        if updated != len(deltas):
+            raise exception.QuotaExceeded(overs=sorted(
+                resource for resource in deltas
+                if deltas[resource] > 0 and limits[resource] >= 0))
+
+        reservations = [{'id': utils.generate_uuid(),
+                         'usage_id': usages[resource].id,
+                         'delta': deltas[resource],
+                         'status': reservation_model.Statuses.RESERVED,
+                         'created': now,
+                         'updated': now}
+                        for resource in sorted(deltas)]
+        db_session.bulk_insert_mappings(reservation_model, reservations)
+    return reservations
+
+
+def _create_quota_usages(usage_model, tenant_id, resources):
+    """Insert the missing usage rows of a tenant, each in its own
+    transaction, so that a row inserted concurrently is just skipped.
+    """
+    existing = {row.resource for row in _query_by_filter(
+        usage_model, usage_model.resource.in_(tuple(resources)),
+        tenant_id=tenant_id)}
+    now = timeutils.utcnow()
+    for resource in set(resources) - existing:
+        try:
+            bulk_save(usage_model, inserts=[{
+                'id': utils.generate_uuid(), 'tenant_id': tenant_id,
+                'resource': resource, 'in_use': 0, 'reserved': 0,
+                'created': now, 'updated': now}])
+        except exception.DBConstraintError:
+            pass
+
+
+def reservation_commit(usage_model, reservation_model, reservation_ids):
+    """Move reserved resources to the in use counts, in one transaction."""
+    _finish_reservations(usage_model, reservation_model, reservation_ids,
+                         reservation_model.Statuses.COMMITTED, True)
+
+
+def reservation_rollback(usage_model, reservation_model, reservation_ids):
+    """Release reserved resources, in one transaction."""
+    _finish_reservations(usage_model, reservation_model, reservation_ids,
+                         reservation_model.Statuses.ROLLEDBACK, False)
+
+
+def _finish_reservations(usage_model, reservation_model, reservation_ids,
+                         status, commit):
+    # Only reservations still pending are applied, so that finishing the
+    # same reservations twice has no effect.
+    pending = sqlalchemy.and_(
+        reservation_model.id.in_(tuple(reservation_ids)),
+        reservation_model.status == reservation_model.Statuses.RESERVED)
+    delta = sqlalchemy.select(
+        [sqlalchemy.func.sum(reservation_model.delta)]).where(
+        sqlalchemy.and_(reservation_model.usage_id == usage_model.id,
+                        pending)).as_scalar()
+    now = timeutils.utcnow()
+    values = {'reserved': usage_model.reserved - delta, 'updated': now}
+    if commit:
+        in_use = usage_model.in_use + delta
+        values['in_use'] = sqlalchemy.case([(in_use < 0, 0)], else_=in_use)
+    db_session = session.get_session()
+    with db_session.begin():
+        db_session.query(usage_model).filter(usage_model.id.in_(
+            sqlalchemy.select([reservation_model.usage_id]).where(
+                pending))).update(values, synchronize_session=False)
+        db_session.query(reservation_model).filter(pending).update(
+            {'status': status, 'updated': now}, synchronize_session=False)
+
+
 def delete(model):
     db_session = session.get_session()
     model = db_session.merge(model)
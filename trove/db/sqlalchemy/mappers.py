@@ -40,6 +40,8 @@ def map(engine, models):
                Table('capabilities', meta, autoload=True))
     orm.mapper(models['capability_overrides'],
                Table('capability_overrides', meta, autoload=True))
+    orm.mapper(models['metadata_generations'],
+               Table('metadata_generations', meta, autoload=True))
     orm.mapper(models['service_statuses'],
                Table('service_statuses', meta, autoload=True))
     orm.mapper(models['dns_records'],
@@ -54,6 +56,8 @@ def map(engine, models):
                Table('reservations', meta, autoload=True))
     orm.mapper(models['backups'],
                Table('backups', meta, autoload=True))
+    orm.mapper(models['backup_chunks'],
+               Table('backup_chunks', meta, autoload=True))
     orm.mapper(models['security_groups'],
                Table('security_groups', meta, autoload=True))
     orm.mapper(models['security_group_rules'],
@@ -69,6 +73,8 @@ def map(engine, models):
                Table('conductor_lastseen', meta, autoload=True))
     orm.mapper(models['clusters'],
                Table('clusters', meta, autoload=True))
+    orm.mapper(models['cluster_rolls'],
+               Table('cluster_rolls', meta, autoload=True))
     orm.mapper(models['datastore_configuration_parameters'],
                Table('datastore_configuration_parameters', meta,
                      autoload=True))
@@ -76,6 +82,8 @@ def map(engine, models):
                Table('modules', meta, autoload=True))
     orm.mapper(models['instance_modules'],
                Table('instance_modules', meta, autoload=True))
+    orm.mapper(models['module_reapplies'],
+               Table('module_reapplies', meta, autoload=True))
 
 
 def mapping_exists(model):
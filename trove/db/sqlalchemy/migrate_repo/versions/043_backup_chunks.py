@@ -0,0 +1,50 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy.schema import Column
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from trove.db.sqlalchemy.migrate_repo.schema import Boolean
+from trove.db.sqlalchemy.migrate_repo.schema import create_tables
+from trove.db.sqlalchemy.migrate_repo.schema import DateTime
+from trove.db.sqlalchemy.migrate_repo.schema import Integer
+from trove.db.sqlalchemy.migrate_repo.schema import String
+from trove.db.sqlalchemy.migrate_repo.schema import Table
+
+
+meta = MetaData()
+
+backup_chunks = Table(
+    'backup_chunks',
+    meta,
+    Column('id', String(36), primary_key=True, nullable=False),
+    Column('tenant_id', String(36), nullable=False),
+    Column('container', String(255), nullable=False),
+    Column('name', String(255), nullable=False),
+    Column('refcount', Integer(), nullable=False, default=0),
+    Column('created', DateTime()),
+    Column('updated', DateTime()),
+    Index('backup_chunks_tenant_id_refcount', 'tenant_id', 'refcount'),
+)
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+    create_tables([backup_chunks])
+
+    backups = Table('backups', meta, autoload=True)
+    is_nullable = True if migrate_engine.name == "sqlite" else False
+    backups.create_column(Column('chunks_counted', Boolean(),
+                                 nullable=is_nullable, default=0))
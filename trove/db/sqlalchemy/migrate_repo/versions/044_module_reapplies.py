@@ -0,0 +1,54 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.schema import Column
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from trove.db.sqlalchemy.migrate_repo.schema import Boolean
+from trove.db.sqlalchemy.migrate_repo.schema import create_tables
+from trove.db.sqlalchemy.migrate_repo.schema import DateTime
+from trove.db.sqlalchemy.migrate_repo.schema import Integer
+from trove.db.sqlalchemy.migrate_repo.schema import String
+from trove.db.sqlalchemy.migrate_repo.schema import Table
+
+
+meta = MetaData()
+
+module_reapplies = Table(
+    'module_reapplies',
+    meta,
+    Column('id', String(length=64), primary_key=True, nullable=False),
+    Column('module_id', String(length=64),
+           ForeignKey('modules.id', ondelete="CASCADE",
+                      onupdate="CASCADE"), nullable=False),
+    Column('md5', String(length=32), nullable=False),
+    Column('status', String(length=32), nullable=False),
+    Column('include_clustered', Boolean(), default=0),
+    Column('force', Boolean(), default=0),
+    Column('total', Integer(), default=0),
+    Column('applied', Integer(), default=0),
+    Column('skipped', Integer(), default=0),
+    Column('failed', Integer(), default=0),
+    Column('created', DateTime()),
+    Column('updated', DateTime()),
+    Index('module_reapplies_module_id_status', 'module_id', 'status'),
+)
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+    Table('modules', meta, autoload=True)
+    create_tables([module_reapplies])
@@ -0,0 +1,62 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_log import log as logging
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from trove.db.sqlalchemy.migrate_repo.schema import Table
+
+logger = logging.getLogger('trove.db.sqlalchemy.migrate_repo.schema')
+
+# The columns filtered on by the list APIs, followed by those the pages are
+# ordered and sought by, so that a page is read straight from the index.
+INDEXES = {
+    'backups': [
+        ('backups_tenant_id_deleted_updated',
+         ['tenant_id', 'deleted', 'updated', 'id']),
+        ('backups_instance_id_deleted_updated',
+         ['instance_id', 'deleted', 'updated', 'id']),
+    ],
+    'instances': [
+        ('instances_tenant_id_deleted_id', ['tenant_id', 'deleted', 'id']),
+    ],
+    'clusters': [
+        ('clusters_tenant_id_deleted_id', ['tenant_id', 'deleted', 'id']),
+    ],
+    'configurations': [
+        ('configurations_tenant_id_deleted_id',
+         ['tenant_id', 'deleted', 'id']),
+    ],
+    'instance_modules': [
+        ('instance_modules_instance_id_deleted_id',
+         ['instance_id', 'deleted', 'id']),
+        ('instance_modules_module_id_deleted_id',
+         ['module_id', 'deleted', 'id']),
+    ],
+}
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for table_name, indexes in INDEXES.items():
+        table = Table(table_name, meta, autoload=True)
+        for name, columns in indexes:
+            try:
+                Index(name, *[table.c[column] for column in columns]).create()
+            except OperationalError as e:
+                logger.info(e)
@@ -0,0 +1,51 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.schema import Column
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from trove.db.sqlalchemy.migrate_repo.schema import create_tables
+from trove.db.sqlalchemy.migrate_repo.schema import DateTime
+from trove.db.sqlalchemy.migrate_repo.schema import Integer
+from trove.db.sqlalchemy.migrate_repo.schema import String
+from trove.db.sqlalchemy.migrate_repo.schema import Table
+from trove.db.sqlalchemy.migrate_repo.schema import Text
+
+
+meta = MetaData()
+
+cluster_rolls = Table(
+    'cluster_rolls',
+    meta,
+    Column('id', String(length=64), primary_key=True, nullable=False),
+    Column('cluster_id', String(length=36),
+           ForeignKey('clusters.id', ondelete="CASCADE",
+                      onupdate="CASCADE"), nullable=False),
+    Column('operation', String(length=32), nullable=False),
+    Column('datastore_version_id', String(length=36), nullable=True),
+    Column('status', String(length=32), nullable=False),
+    Column('total', Integer(), default=0),
+    Column('completed', Text(), nullable=True),
+    Column('created', DateTime()),
+    Column('updated', DateTime()),
+    Index('cluster_rolls_cluster_id_status', 'cluster_id', 'status'),
+)
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+    Table('clusters', meta, autoload=True)
+    create_tables([cluster_rolls])
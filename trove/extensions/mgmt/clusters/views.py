@@ -15,6 +15,7 @@
 
 from trove.cluster.views import ClusterView
 from trove.common.strategies.cluster import strategy
+from trove.common import wsgi
 
 
 class MgmtClusterView(ClusterView):
@@ -42,10 +43,8 @@ class MgmtClustersView(object):
         self.req = req
 
     def data(self):
-        data = []
-        for cluster in self.clusters:
-            data.append(self.data_for_cluster(cluster))
-        return {'clusters': data}
+        return {'clusters': wsgi.LazyList(self.clusters,
+                                          self.data_for_cluster)}
 
     def data_for_cluster(self, cluster):
         view = load_mgmt_view(cluster, req=self.req, load_servers=False)
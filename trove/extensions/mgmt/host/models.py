@@ -25,6 +25,7 @@ from trove.common.i18n import _
 from trove.common.remote import create_guest_client
 from trove.common.remote import create_nova_client
 from trove.instance.models import DBInstance
+from trove.instance.models import InstanceRecords
 from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import SimpleInstance
 
@@ -58,6 +59,7 @@ class DetailedHost(object):
         self.total_ram = host_info.totalRAM
         self.used_ram = host_info.usedRAM
         self.instances = host_info.instances
+        records = InstanceRecords()
         for instance in self.instances:
             instance['server_id'] = instance['uuid']
             del instance['uuid']
@@ -68,7 +70,8 @@ class DetailedHost(object):
                 instance['tenant_id'] = db_info.tenant_id
                 status = InstanceServiceStatus.find_by(
                     instance_id=db_info.id)
-                instance_info = SimpleInstance(None, db_info, status)
+                instance_info = SimpleInstance(None, db_info, status,
+                                               records=records)
                 instance['status'] = instance_info.status
             except exception.TroveError as re:
                 LOG.error(re)
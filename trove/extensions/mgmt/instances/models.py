@@ -29,7 +29,7 @@ CONF = cfg.CONF
 
 
 def load_mgmt_instances(context, deleted=None, client=None,
-                        include_clustered=None):
+                        include_clustered=None, records=None):
     if not client:
         client = remote.create_nova_client(context, CONF.os_region_name)
     try:
@@ -46,7 +46,8 @@ def load_mgmt_instances(context, deleted=None, client=None,
     db_infos = instance_models.DBInstance.find_all(**args)
 
     instances = MgmtInstances.load_status_from_existing(context, db_infos,
-                                                        mgmt_servers)
+                                                        mgmt_servers,
+                                                        records=records)
     return instances
 
 
@@ -80,9 +81,11 @@ def load_mgmt_instance(cls, context, id, include_deleted):
 
 
 class SimpleMgmtInstance(instance_models.BaseInstance):
-    def __init__(self, context, db_info, server, datastore_status):
+    def __init__(self, context, db_info, server, datastore_status,
+                 records=None):
         super(SimpleMgmtInstance, self).__init__(context, db_info, server,
-                                                 datastore_status)
+                                                 datastore_status,
+                                                 records=records)
 
     @property
     def status(self):
@@ -146,9 +149,13 @@ class MgmtInstance(instance_models.Instance):
 
 class MgmtInstances(instance_models.Instances):
     @staticmethod
-    def load_status_from_existing(context, db_infos, servers):
+    def load_status_from_existing(context, db_infos, servers, records=None):
+        if records is None:
+            records = instance_models.InstanceRecords()
+
         def load_instance(context, db, status, server=None):
-            return SimpleMgmtInstance(context, db, server, status)
+            return SimpleMgmtInstance(context, db, server, status,
+                                      records=records)
 
         if context is None:
             raise TypeError(_("Argument context not defined."))
@@ -226,6 +233,7 @@ class NotificationTransformer(object):
         audit_start, audit_end = NotificationTransformer._get_audit_period()
         messages = []
         db_infos = instance_models.DBInstance.find_all(deleted=False)
+        records = instance_models.InstanceRecords()
         for db_info in db_infos:
             try:
                 service_status = instance_models.InstanceServiceStatus.find_by(
@@ -239,7 +247,8 @@ class NotificationTransformer(object):
                 LOG.debug("InstanceServiceStatus not found for %s. "
                           "Will wait to send notification.", db_info.id)
                 continue
-            instance = SimpleMgmtInstance(None, db_info, None, service_status)
+            instance = SimpleMgmtInstance(None, db_info, None, service_status,
+                                          records=records)
             message = self.transform_instance(instance, audit_start, audit_end)
             messages.append(message)
         return messages
@@ -14,6 +14,7 @@
 #    under the License.
 
 
+from trove.common import wsgi
 from trove.instance.views import InstanceDetailView
 
 
@@ -105,11 +106,9 @@ class MgmtInstancesView(object):
         self.req = req
 
     def data(self):
-        data = []
-        # These are model instances
-        for instance in self.instances:
-            data.append(self.data_for_instance(instance))
-        return {'instances': data}
+        # These are model instances, viewed as the response is written.
+        return {'instances': wsgi.LazyList(self.instances,
+                                           self.data_for_instance)}
 
     def data_for_instance(self, instance):
         view = MgmtInstanceView(instance, req=self.req)
@@ -36,13 +36,14 @@ class API(object):
 
     API version history:
         * 1.0 - Initial version.
+        * 1.1 - Added cluster_node_healthy.
 
     When updating this API, also update API_LATEST_VERSION
     """
 
     # API_LATEST_VERSION should bump the minor number each time
     # a method signature is added or changed
-    API_LATEST_VERSION = '1.0'
+    API_LATEST_VERSION = '1.1'
 
     # API_BASE_VERSION should only change on major version upgrade
     API_BASE_VERSION = '1.0'
@@ -93,6 +94,9 @@ class API(object):
             return result
         except RemoteError as r:
             LOG.exception("Error calling %s", method_name)
+            if r.exc_type in ('UnsupportedVersion', 'NoSuchMethod'):
+                raise exception.GuestMethodNotSupported(method=method_name,
+                                                        version=version)
             raise exception.GuestError(original_message=r.value)
         except Exception as e:
             LOG.exception("Error calling %s", method_name)
@@ -610,6 +614,22 @@ class API(object):
         self._call("demote_replication_master", self.agent_high_timeout,
                    version=version)
 
+    def cluster_node_healthy(self):
+        """Whether the node has (re)joined its cluster and is healthy.
+
+        Returns None if the guest agent is too old to tell.
+        """
+        LOG.debug("Checking the cluster health of %s.", self.id)
+        version = '1.1'
+
+        if not self.client.can_send_version(version):
+            return None
+        try:
+            return self._call("cluster_node_healthy", self.agent_low_timeout,
+                              version=version)
+        except exception.GuestMethodNotSupported:
+            return None
+
     def guest_log_list(self):
         LOG.debug("Retrieving guest log list for %s.", self.id)
         version = self.API_BASE_VERSION
@@ -22,12 +22,16 @@ import tempfile
 
 from functools import reduce
 from oslo_concurrency.processutils import UnknownArgumentError
+from oslo_utils import encodeutils
 
+from trove.common import cfg
 from trove.common import exception
 from trove.common.i18n import _
 from trove.common.stream_codecs import IdentityCodec
 from trove.common import utils
 
+CONF = cfg.CONF
+
 REDHAT = 'redhat'
 DEBIAN = 'debian'
 SUSE = 'suse'
@@ -92,6 +96,8 @@ def exists(path, is_directory=False, as_root=False):
     # Only check as root if we can't see it as the regular user, since
     # this is more expensive
     if not found and as_root:
+        if CONF.privsep_file_operations:
+            return _privileged('exists', path, is_directory)
         test_flag = '-d' if is_directory else '-f'
         cmd = 'test %s %s && echo 1 || echo 0' % (test_flag, path)
         stdout, _ = utils.execute_with_timeout(
@@ -114,6 +120,12 @@ def _read_file_as_root(path, open_flag, convert_func):
     :param convert_func:       The function for converting data.
     :type convert_func:        callable
     """
+    if CONF.privsep_file_operations:
+        data = _privileged('read_file', path)
+        if 'b' not in open_flag:
+            data = encodeutils.safe_decode(data)
+        return convert_func(data)
+
     with tempfile.NamedTemporaryFile(open_flag) as fp:
         copy(path, fp.name, force=True, dereference=True, as_root=True)
         chmod(fp.name, FileMode.ADD_READ_ALL(), as_root=True)
@@ -176,6 +188,11 @@ def _write_file_as_root(path, data, open_flag, convert_func):
     :param convert_func:       The function for converting data.
     :type convert_func:        callable
     """
+    if CONF.privsep_file_operations:
+        _privileged('write_file', path,
+                    encodeutils.safe_encode(convert_func(data)))
+        return
+
     # The files gets removed automatically once the managing object goes
     # out of scope.
     with tempfile.NamedTemporaryFile(open_flag, delete=False) as fp:
@@ -520,6 +537,11 @@ def chown(path, user, group, recursive=True, force=False, **kwargs):
         raise exception.UnprocessableEntity(
             _("Please specify owner or group, or both."))
 
+    if _use_privsep(kwargs):
+        _privileged('chown', path, user, group, recursive, force,
+                    **kwargs)
+        return
+
     owner_group_modifier = _build_user_group_pair(user, group)
     options = (('f', force), ('R', recursive))
     _execute_shell_cmd('chown', options, owner_group_modifier, path, **kwargs)
@@ -540,6 +562,10 @@ def _create_directory(dir_path, force=True, **kwargs):
     :type force:            boolean
     """
 
+    if _use_privsep(kwargs):
+        _privileged('create_directory', dir_path, force, **kwargs)
+        return
+
     options = (('p', force),)
     _execute_shell_cmd('mkdir', options, dir_path, **kwargs)
 
@@ -571,6 +597,14 @@ def chmod(path, mode, recursive=True, force=False, **kwargs):
     if path:
         options = (('f', force), ('R', recursive))
         shell_modes = _build_shell_chmod_mode(mode)
+        if _use_privsep(kwargs):
+            if inspect.ismethod(mode):
+                mode = mode()
+            _privileged('chmod', path, mode.get_reset_mode(),
+                        mode.get_add_mode() or 0,
+                        mode.get_remove_mode() or 0,
+                        recursive, force, **kwargs)
+            return
         _execute_shell_cmd('chmod', options, shell_modes, path, **kwargs)
     else:
         raise exception.UnprocessableEntity(
@@ -661,6 +695,9 @@ def remove(path, force=False, recursive=True, **kwargs):
     """
 
     if path:
+        if _use_privsep(kwargs):
+            _privileged('remove', path, recursive, force, **kwargs)
+            return
         options = (('f', force), ('R', recursive))
         _execute_shell_cmd('rm', options, path, **kwargs)
     else:
@@ -692,6 +729,10 @@ def move(source, destination, force=False, **kwargs):
     elif not destination:
         raise exception.UnprocessableEntity(_("Missing destination path."))
 
+    if _use_privsep(kwargs):
+        _privileged('move', source, destination, **kwargs)
+        return
+
     options = (('f', force),)
     _execute_shell_cmd('mv', options, source, destination, **kwargs)
 
@@ -732,6 +773,11 @@ def copy(source, destination, force=False, preserve=False, recursive=True,
     elif not destination:
         raise exception.UnprocessableEntity(_("Missing destination path."))
 
+    if _use_privsep(kwargs):
+        _privileged('copy', source, destination, preserve, recursive,
+                    dereference, **kwargs)
+        return
+
     options = (('f', force), ('p', preserve), ('R', recursive),
                ('L', dereference))
     _execute_shell_cmd('cp', options, source, destination, **kwargs)
@@ -814,6 +860,37 @@ def _execute_shell_cmd(cmd, options, *args, **kwargs):
     return stdout
 
 
+def _use_privsep(kwargs):
+    """Whether a root file operation goes through the privileged helper
+    instead of a sudo command.
+    """
+    return kwargs.get('as_root', False) and CONF.privsep_file_operations
+
+
+def _privileged(name, *args, **kwargs):
+    """Run the named file operation in the privileged helper.
+    Failures are raised as if the equivalent command had failed.
+
+    Takes the optional keyword arguments of _execute_shell_cmd;
+    the timeout is not used.
+    """
+    kwargs.pop('as_root', None)
+    kwargs.pop('timeout', None)
+    if kwargs:
+        raise UnknownArgumentError(_("Got unknown keyword args: %r") % kwargs)
+
+    # Imported here, so that oslo.privsep is only loaded where the helper
+    # is used.
+    from trove.guestagent.privsep import fileops
+
+    try:
+        return getattr(fileops, name)(*args)
+    except (EnvironmentError, KeyError) as e:
+        raise exception.ProcessExecutionError(
+            description=_("Privileged file operation failed."),
+            stderr=encodeutils.exception_to_unicode(e))
+
+
 def _build_command_options(options):
     """Build a list of flags from given pairs (option, is_enabled).
     Each option is prefixed with a single '-'.
@@ -290,6 +290,9 @@ class Manager(manager.Manager):
     def set_auto_bootstrap(self, context, enabled):
         self.app.set_auto_bootstrap(enabled)
 
+    def cluster_node_healthy(self, context):
+        return self.status.is_running and self.app.is_cluster_healthy()
+
     def node_cleanup_begin(self, context):
         self.app.node_cleanup_begin()
 
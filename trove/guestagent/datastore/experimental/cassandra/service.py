@@ -30,6 +30,7 @@ from trove.common.db.cassandra import models
 from trove.common import exception
 from trove.common.i18n import _
 from trove.common import instance as rd_instance
+from trove.common import pagination
 from trove.common.stream_codecs import IniCodec
 from trove.common.stream_codecs import PropertiesCodec
 from trove.common.stream_codecs import SafeYamlCodec
@@ -71,6 +72,10 @@ class CassandraApp(object):
 
     CASSANDRA_KILL_CMD = "sudo killall java  || true"
 
+    # The state of a node in the output of 'nodetool status': Up or Down,
+    # followed by Normal, Leaving, Joining or Moving.
+    _NODETOOL_STATUS_STATE = re.compile(r'^([UD][NLJM])\s', re.MULTILINE)
+
     def __init__(self):
         self.state_change_wait_time = CONF.state_change_wait_time
         self.status = CassandraAppStatus(self.get_current_superuser())
@@ -642,6 +647,16 @@ class CassandraApp(object):
         updates = {'auto_bootstrap': enabled}
         self.configuration_manager.apply_system_override(updates)
 
+    def is_cluster_healthy(self):
+        """Whether all the nodes of the cluster are up and in the normal
+        state, as seen from this node.
+        """
+        # nodetool -h <HOST> -p <PORT> -u <USER> -pw <PASSWORD> status
+        out, err = self._run_nodetool_command('status')
+        states = self._NODETOOL_STATUS_STATE.findall(out)
+        LOG.debug("Cluster node states: %s", states)
+        return bool(states) and all(state == 'UN' for state in states)
+
     def node_cleanup_begin(self):
         """Suspend periodic status updates and mark the instance busy
         throughout the operation.
@@ -861,8 +876,9 @@ class CassandraAdmin(object):
         Omit user names on the ignore list.
         Return a new Cassandra user instance or None if no match is found.
         """
-        return next((user for user in self._get_listed_users(client)
-                     if user.name == username), None)
+        return next((user for user in self._get_listed_users(
+            client, limit=1, marker=username, include_marker=True)
+            if user.name == username), None)
 
     def list_users(self, context, limit=None, marker=None,
                    include_marker=False):
@@ -871,16 +887,37 @@ class CassandraAdmin(object):
         Return an empty set if None.
         """
         return guestagent_utils.serialize_list(
-            self._get_listed_users(self.client),
+            self._get_listed_users(self.client, limit=limit, marker=marker,
+                                   include_marker=include_marker),
             limit=limit, marker=marker, include_marker=include_marker)
 
-    def _get_listed_users(self, client):
+    def _get_listed_users(self, client, limit=None, marker=None,
+                          include_marker=False):
         """
         Return a set of unique user instances.
         Omit user names on the ignore list.
+
+        If a limit is given, only the page starting at the marker is built,
+        along with the first user past it so that the caller can tell there
+        are more.
         """
-        return self._get_users(
-            client, lambda user: user.name not in self.ignore_users)
+        names = [user.name for user in client.execute("LIST USERS;")
+                 if user.name not in self.ignore_users]
+        if limit is None and marker is None:
+            return self._build_users(names, self._get_acl(client))
+
+        names, _ = pagination.paginate_list(
+            names, limit=limit + 1 if limit else None, marker=marker,
+            include_marker=include_marker)
+        if limit is None:
+            acl = self._get_acl(client)
+        else:
+            # A few targeted lookups are cheaper than the permissions of
+            # every user on the instance.
+            acl = {}
+            for name in names:
+                acl.update(self._get_acl(client, username=name))
+        return self._build_users(names, acl)
 
     def _get_users(self, client, matcher=None):
         """
@@ -888,9 +925,12 @@ class CassandraAdmin(object):
         :type matcher                 callable
         """
         acl = self._get_acl(client)
-        return {self._build_user(user.name, acl)
-                for user in client.execute("LIST USERS;")
-                if not matcher or matcher(user)}
+        return self._build_users(
+            [user.name for user in client.execute("LIST USERS;")
+             if not matcher or matcher(user)], acl)
+
+    def _build_users(self, names, acl):
+        return {self._build_user(name, acl) for name in names}
 
     def _load_user(self, client, username, check_reserved=True):
         if check_reserved:
@@ -940,14 +980,6 @@ class CassandraAdmin(object):
                 return {match.group(1)}
             return {}
 
-        def update_acl(username, keyspace, permission, acl):
-            permissions = acl.get(username, {}).get(keyspace)
-            if permissions is None:
-                guestagent_utils.update_dict({user: {keyspace: {permission}}},
-                                             acl)
-            else:
-                permissions.add(permission)
-
         all_keyspace_names = None
         acl = dict()
         for item in client.execute(build_list_query(username)):
@@ -968,7 +1000,8 @@ class CassandraAdmin(object):
                     keyspaces = parse_keyspace_name(resource)
 
                 for keyspace in keyspaces:
-                    update_acl(user, keyspace, permission, acl)
+                    acl.setdefault(user, {}).setdefault(
+                        keyspace, set()).add(permission)
 
         return acl
 
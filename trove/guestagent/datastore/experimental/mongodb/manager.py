@@ -266,3 +266,6 @@ class Manager(manager.Manager):
 
     def is_shard_active(self, context, replica_set_name):
         return self.app.is_shard_active(replica_set_name)
+
+    def cluster_node_healthy(self, context):
+        return self.status.is_running and self.app.is_cluster_node_healthy()
@@ -79,11 +79,13 @@ class MongoDBApp(object):
         return system.MONGOD_SERVICE_CANDIDATES
 
     def stop_db(self, update_db=False, do_not_start_on_reboot=False):
+        MongoDBClient.reset_sessions()
         self.status.stop_db_service(
             self._get_service_candidates(), self.state_change_wait_time,
             disable_on_boot=do_not_start_on_reboot, update_db=update_db)
 
     def restart(self):
+        MongoDBClient.reset_sessions()
         self.status.restart_db_service(
             self._get_service_candidates(), self.state_change_wait_time)
 
@@ -432,6 +434,18 @@ class MongoDBApp(object):
             LOG.debug('Replica set %s is not active.', replica_set_name)
             return False
 
+    def is_cluster_node_healthy(self):
+        """Whether the node is the primary or a secondary of its replica
+        set. Nodes outside of a replica set, such as query routers, have
+        nothing more to rejoin once they are running.
+        """
+        try:
+            status = MongoDBAdmin().get_repl_status()
+        except pymongo.errors.OperationFailure:
+            LOG.debug("The node is not a replica set member.")
+            return True
+        return status['ok'] == 1 and status['myState'] in (1, 2)
+
 
 class MongoDBAppStatus(service.BaseDbStatus):
 
@@ -771,10 +785,18 @@ class MongoDBAdmin(object):
 
 
 class MongoDBClient(object):
-    """A wrapper to manage a MongoDB connection."""
+    """A wrapper to manage a MongoDB connection.
+
+    The driver clients, and so their connection pools, are kept for the
+    lifetime of the agent. A client is created and authenticated once per
+    user; it is only dropped when the server address changes, the database
+    is stopped, or a call on it fails to reach the server.
+    """
 
     # engine information is cached by making it a class attribute
     engine = {}
+    # authenticated clients, keyed by (database, username)
+    sessions = {}
 
     def __init__(self, user, host=None, port=None):
         """Get the client. Specifying host and/or port updates cached values.
@@ -784,7 +806,6 @@ class MongoDBClient(object):
         :return:
         """
         new_client = False
-        self._logged_in = False
         if not type(self).engine:
             # no engine cached
             type(self).engine['host'] = (host if host else 'localhost')
@@ -798,29 +819,71 @@ class MongoDBClient(object):
                 type(self).engine['port'] = port
             new_client = True
         if new_client:
-            host = type(self).engine['host']
-            port = type(self).engine['port']
-            LOG.debug("Creating MongoDB client to %(host)s:%(port)s.",
-                      {'host': host, 'port': port})
-            type(self).engine['client'] = pymongo.MongoClient(host=host,
-                                                              port=port,
-                                                              connect=False)
-        self.session = type(self).engine['client']
+            if 'client' in type(self).engine:
+                type(self).engine['client'].close()
+            type(self).reset_sessions()
+            type(self).engine['client'] = type(self)._create_client()
+        self._key = None
         if user:
-            db_name = user.database.name
-            LOG.debug("Authenticating MongoDB client on %s.", db_name)
-            self._db = self.session[db_name]
-            self._db.authenticate(user.username, password=user.password)
-            self._logged_in = True
+            self._key = (user.database.name, user.username)
+            self.session = type(self)._get_session(user)
+        else:
+            self.session = type(self).engine['client']
+
+    @classmethod
+    def _create_client(cls):
+        host = cls.engine['host']
+        port = cls.engine['port']
+        LOG.debug("Creating MongoDB client to %(host)s:%(port)s.",
+                  {'host': host, 'port': port})
+        return pymongo.MongoClient(host=host, port=port, connect=False)
+
+    @classmethod
+    def _get_session(cls, user):
+        key = (user.database.name, user.username)
+        password, client = cls.sessions.get(key, (None, None))
+        if client and password == user.password:
+            return client
+        if client:
+            # The password was changed, log in again.
+            cls._drop_session(key)
+        client = cls._create_client()
+        LOG.debug("Authenticating MongoDB client on %s.", user.database.name)
+        try:
+            client[user.database.name].authenticate(
+                user.username, password=user.password)
+        except Exception:
+            client.close()
+            raise
+        cls.sessions[key] = (user.password, client)
+        return client
+
+    @classmethod
+    def _drop_session(cls, key):
+        password, client = cls.sessions.pop(key, (None, None))
+        if client:
+            client.close()
+
+    @classmethod
+    def reset_sessions(cls):
+        """Close the authenticated clients, they log in again when next
+        used.
+        """
+        for key in list(cls.sessions):
+            cls._drop_session(key)
 
     def __enter__(self):
         return self.session
 
     def __exit__(self, exc_type, exc_value, traceback):
-        LOG.debug("Disconnecting from MongoDB.")
-        if self._logged_in:
-            self._db.logout()
-        self.session.close()
+        if exc_type and issubclass(exc_type, pymongo.errors.ConnectionFailure):
+            # Pooled connections may all be stale, start over on the next
+            # call rather than failing once per connection.
+            LOG.debug("Disconnecting from MongoDB after a failure.")
+            if self._key:
+                type(self)._drop_session(self._key)
+            else:
+                self.session.close()
 
 
 class MongoDBCredentials(object):
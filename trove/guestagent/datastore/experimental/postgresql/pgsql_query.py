@@ -74,6 +74,38 @@ class UserQuery(object):
 
         return statement
 
+    @classmethod
+    def list_page(cls, ignore=(), limit=None, marker=None,
+                  include_marker=False):
+        """Query to list a page of users, ordered by name, along with the
+        databases they have access to.
+
+        Names are compared in the "C" collation, by code point, which is the
+        order the page is sorted in afterwards, whatever the collation of
+        the database.
+        """
+
+        conditions = ["usename != '{name}'".format(name=name)
+                      for name in ignore]
+        if marker is not None:
+            conditions.append("usename COLLATE \"C\" {op} '{marker}'".format(
+                op='>=' if include_marker else '>',
+                marker=marker.replace("'", "''")))
+        users = "SELECT usename FROM pg_catalog.pg_user"
+        if conditions:
+            users += " WHERE " + " AND ".join(conditions)
+        users += " ORDER BY usename COLLATE \"C\""
+        if limit:
+            users += " LIMIT {limit}".format(limit=int(limit))
+
+        return (
+            "SELECT usename, datname, pg_encoding_to_char(encoding), "
+            "datcollate FROM ({users}) AS users "
+            "LEFT JOIN pg_catalog.pg_database "
+            "ON CONCAT(usename, '=CTc/os_admin') = ANY(datacl::text[]) "
+            "AND datistemplate = false "
+            "ORDER BY usename COLLATE \"C\"".format(users=users))
+
     @classmethod
     def list_root(cls, ignore=()):
         """Query to list all superuser accounts."""
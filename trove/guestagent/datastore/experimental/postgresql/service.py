@@ -16,11 +16,15 @@
 #    under the License.
 
 from collections import OrderedDict
+import contextlib
 import os
 import re
+import time
 
+from eventlet import corolocal
 from oslo_log import log as logging
 import psycopg2
+import psycopg2.extensions
 
 from trove.common import cfg
 from trove.common.db.postgresql import models
@@ -382,6 +386,7 @@ class PgSqlApp(object):
         return version_file, version.strip()
 
     def restart(self):
+        PostgresConnectionPool.close_all()
         self.status.restart_db_service(
             self.service_candidates, CONF.state_change_wait_time)
 
@@ -391,6 +396,7 @@ class PgSqlApp(object):
             enable_on_boot=enable_on_boot, update_db=update_db)
 
     def stop_db(self, do_not_start_on_reboot=False, update_db=False):
+        PostgresConnectionPool.close_all()
         self.status.stop_db_service(
             self.service_candidates, CONF.state_change_wait_time,
             disable_on_boot=do_not_start_on_reboot, update_db=update_db)
@@ -565,6 +571,23 @@ class PgSqlApp(object):
         self.status.set_ready()
 
 
+class PgSqlStatusProbe(service.StatusProbe):
+    """Runs an empty query as the Trove admin user."""
+
+    def _connect(self, timeout):
+        connection = psycopg2.connect(
+            user=PgSqlApp.ADMIN_USER, host=PgSqlAppStatus.HOST,
+            port=cfg.get_configuration_property('postgresql_port'),
+            connect_timeout=timeout,
+            options='-c statement_timeout=%d' % (timeout * 1000))
+        connection.autocommit = True
+        return connection
+
+    def _ping(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
 class PgSqlAppStatus(service.BaseDbStatus):
 
     HOST = 'localhost'
@@ -572,8 +595,11 @@ class PgSqlAppStatus(service.BaseDbStatus):
     def __init__(self, tools_dir):
         super(PgSqlAppStatus, self).__init__()
         self._cmd = guestagent_utils.build_file_path(tools_dir, 'pg_isready')
+        self.probe = PgSqlStatusProbe()
 
     def _get_actual_db_status(self):
+        if CONF.status_probe_native and self.probe.is_alive():
+            return instance.ServiceStatuses.RUNNING
         try:
             utils.execute_with_timeout(
                 self._cmd, '-h', self.HOST, log_output_on_error=True)
@@ -600,6 +626,30 @@ class PgSqlAdmin(object):
     def __init__(self, user):
         port = cfg.get_configuration_property('postgresql_port')
         self.__connection = PostgresLocalhostConnection(user.name, port=port)
+        # The session of the transaction() block a green thread is in, the
+        # admin being shared by the concurrent requests to the guest.
+        self.__local = corolocal.local()
+
+    @property
+    def __session(self):
+        return getattr(self.__local, 'session', None)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run all the statements of the block in a single transaction.
+
+        Statements which cannot run in a transaction block (like
+        CREATE DATABASE) must not be used within it.
+        """
+        if self.__session is not None:
+            yield
+            return
+        with self.__connection.session() as session:
+            self.__local.session = session
+            try:
+                yield
+            finally:
+                self.__local.session = None
 
     def grant_access(self, context, username, hostname, databases):
         """Give a user permission to use a given database.
@@ -608,21 +658,22 @@ class PgSqlAdmin(object):
         The databases parameter is a list of strings representing the names of
         the databases to grant permission on.
         """
-        for database in databases:
-            LOG.info(
-                "{guest_id}: Granting user ({user}) access to database "
-                "({database}).".format(
-                    guest_id=CONF.guest_id,
-                    user=username,
-                    database=database,)
-            )
-            self.psql(
-                pgsql_query.AccessQuery.grant(
-                    user=username,
-                    database=database,
-                ),
-                timeout=30,
-            )
+        with self.transaction():
+            for database in databases:
+                LOG.info(
+                    "{guest_id}: Granting user ({user}) access to database "
+                    "({database}).".format(
+                        guest_id=CONF.guest_id,
+                        user=username,
+                        database=database,)
+                )
+                self.psql(
+                    pgsql_query.AccessQuery.grant(
+                        user=username,
+                        database=database,
+                    ),
+                    timeout=30,
+                )
 
     def revoke_access(self, context, username, hostname, database):
         """Revoke a user's permission to use a given database.
@@ -735,10 +786,11 @@ class PgSqlAdmin(object):
 
         The users parameter is a list of serialized Postgres users.
         """
-        for user in users:
-            self._create_user(
-                context,
-                models.PostgreSQLUser.deserialize(user), None)
+        with self.transaction():
+            for user in users:
+                self._create_user(
+                    context,
+                    models.PostgreSQLUser.deserialize(user), None)
 
     def _create_user(self, context, user, encrypt_password=None, *options):
         """Create a user and grant privileges for the specified databases.
@@ -797,18 +849,37 @@ class PgSqlAdmin(object):
         Return a paginated list of serialized Postgres users.
         """
         return guestagent_utils.serialize_list(
-            self._get_users(context),
+            self._get_users(context, limit=limit, marker=marker,
+                            include_marker=include_marker),
             limit=limit, marker=marker, include_marker=include_marker)
 
-    def _get_users(self, context):
-        """Return all non-system Postgres users on the instance."""
+    def _get_users(self, context, limit=None, marker=None,
+                   include_marker=False):
+        """Return non-system Postgres users on the instance.
+
+        Only the page starting at the marker is fetched, along with the
+        first user past it so that the caller can tell there are more.
+        """
         results = self.query(
-            pgsql_query.UserQuery.list(ignore=self.ignore_users),
+            pgsql_query.UserQuery.list_page(
+                ignore=self.ignore_users,
+                limit=limit + 1 if limit else None,
+                marker=marker, include_marker=include_marker),
             timeout=30,
         )
 
-        names = set([row[0].strip() for row in results])
-        return [self._build_user(context, name, results) for name in names]
+        # The rows are ordered by user name, so each user is built from a
+        # single run of rows.
+        users = []
+        for row in results:
+            username = row[0].strip()
+            if not users or users[-1].name != username:
+                users.append(models.PostgreSQLUser(username))
+            if row[1] is not None:
+                users[-1].databases.append(models.PostgreSQLSchema(
+                    row[1].strip(), character_set=row[2],
+                    collate=row[3]).serialize())
+        return users
 
     def _build_user(self, context, username, acl=None):
         """Build a model representation of a Postgres user.
@@ -887,10 +958,11 @@ class PgSqlAdmin(object):
         """Change the passwords of one or more existing users.
         The users parameter is a list of serialized Postgres users.
         """
-        for user in users:
-            self.alter_user(
-                context,
-                models.PostgreSQLUser.deserialize(user), None)
+        with self.transaction():
+            for user in users:
+                self.alter_user(
+                    context,
+                    models.PostgreSQLUser.deserialize(user), None)
 
     def alter_user(self, context, user, encrypt_password=None, *options):
         """Change the password and options of an existing users.
@@ -980,13 +1052,18 @@ class PgSqlAdmin(object):
     def psql(self, statement, timeout=30):
         """Execute a non-returning statement (usually DDL);
         Turn autocommit ON (this is necessary for statements that cannot run
-        within an implicit transaction, like CREATE DATABASE).
+        within an implicit transaction, like CREATE DATABASE), unless
+        running within transaction().
         """
+        if self.__session is not None:
+            return self.__session.execute(statement)
         return self.__connection.execute(statement)
 
     def query(self, query, timeout=30):
         """Execute a query and return the result set.
         """
+        if self.__session is not None:
+            return self.__session.query(query)
         return self.__connection.query(query)
 
     @property
@@ -998,35 +1075,181 @@ class PgSqlAdmin(object):
         return cfg.get_ignored_dbs()
 
 
-class PostgresConnection(object):
+class PostgresConnectionPool(object):
+    """Connections to a Postgres server, kept open for reuse.
+
+    Connections which have been idle for a while are checked with a ping
+    before they are handed out again; broken ones are thrown away. Any
+    transaction left open on a connection is rolled back when it is
+    returned. The pools are closed whenever the server is stopped or
+    restarted, which would break all their connections.
+    """
+
+    # Idle time (in seconds) after which a connection is checked.
+    PING_AFTER = 30
+
+    _pools = {}
+
+    @classmethod
+    def get(cls, **connection_args):
+        key = tuple(sorted(connection_args.items()))
+        if key not in cls._pools:
+            cls._pools[key] = cls(**connection_args)
+        return cls._pools[key]
+
+    @classmethod
+    def close_all(cls):
+        """Close all the pools, new ones are opened on next use."""
+        while cls._pools:
+            cls._pools.popitem()[1].close()
 
     def __init__(self, **connection_args):
         self._connection_args = connection_args
+        self._idle = []
+        self._closed = False
+
+    @contextlib.contextmanager
+    def connection(self, autocommit=False):
+        connection = self._checkout()
+        try:
+            if connection.autocommit != autocommit:
+                connection.autocommit = autocommit
+            yield connection
+        finally:
+            self._release(connection)
+
+    def _checkout(self):
+        while self._idle:
+            connection, last_used = self._idle.pop()
+            if self._is_usable(connection, last_used):
+                return connection
+            self._close(connection)
+        return psycopg2.connect(**self._connection_args)
+
+    def _is_usable(self, connection, last_used):
+        if connection.closed:
+            return False
+        if time.time() - last_used < self.PING_AFTER:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+            return True
+        except psycopg2.Error as e:
+            LOG.debug("Discarding broken Postgres connection: %s", e)
+            return False
+
+    def _release(self, connection):
+        if not connection.closed and (
+                connection.get_transaction_status() !=
+                psycopg2.extensions.TRANSACTION_STATUS_IDLE):
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                self._close(connection)
+                return
+        if (connection.closed or self._closed or
+                len(self._idle) >= cfg.get_configuration_property(
+                    'connection_pool_size')):
+            self._close(connection)
+            return
+        self._idle.append((connection, time.time()))
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def close(self):
+        """Close all the idle connections, and those in use once they are
+        returned.
+        """
+        self._closed = True
+        while self._idle:
+            self._close(self._idle.pop()[0])
+
+
+class PostgresSession(object):
+    """Statements run on a single connection, see PostgresConnection."""
+
+    def __init__(self, connection, bind):
+        self._connection = connection
+        self._bind = bind
 
     def execute(self, statement, identifiers=None, data_values=None):
         """Execute a non-returning statement.
         """
-        self._execute_stmt(statement, identifiers, data_values, False,
-                           autocommit=True)
+        self._execute_stmt(statement, identifiers, data_values, False)
 
     def query(self, query, identifiers=None, data_values=None):
         """Execute a query and return the result set.
         """
         return self._execute_stmt(query, identifiers, data_values, True)
 
-    def _execute_stmt(self, statement, identifiers, data_values, fetch,
-                      autocommit=False):
-        if statement:
-            with psycopg2.connect(**self._connection_args) as connection:
-                connection.autocommit = autocommit
-                with connection.cursor() as cursor:
-                    cursor.execute(
-                        self._bind(statement, identifiers), data_values)
-                    if fetch:
-                        return cursor.fetchall()
-        else:
+    def _execute_stmt(self, statement, identifiers, data_values, fetch):
+        if not statement:
             raise exception.UnprocessableEntity(_("Invalid SQL statement: %s")
                                                 % statement)
+        with self._connection.cursor() as cursor:
+            cursor.execute(self._bind(statement, identifiers), data_values)
+            if fetch:
+                return cursor.fetchall()
+
+
+class PostgresConnection(object):
+
+    def __init__(self, **connection_args):
+        self._connection_args = connection_args
+
+    @property
+    def pool(self):
+        return PostgresConnectionPool.get(**self._connection_args)
+
+    def execute(self, statement, identifiers=None, data_values=None):
+        """Execute a non-returning statement.
+        """
+        self._run(lambda session: session.execute(
+            statement, identifiers, data_values))
+
+    def query(self, query, identifiers=None, data_values=None):
+        """Execute a query and return the result set.
+        """
+        return self._run(lambda session: session.query(
+            query, identifiers, data_values))
+
+    def _run(self, work):
+        """Run a statement on its own pooled connection.
+
+        Connections idle for less than PING_AFTER are handed out unchecked,
+        so a statement is run once more on a new connection if the server
+        had closed the pooled one.
+        """
+        for attempt in range(2):
+            with self.pool.connection(autocommit=True) as connection:
+                try:
+                    return work(PostgresSession(connection, self._bind))
+                except (psycopg2.OperationalError,
+                        psycopg2.InterfaceError) as e:
+                    if attempt or not connection.closed:
+                        raise
+                    LOG.debug("Postgres connection was closed, retrying "
+                              "on a new one: %s", e)
+
+    @contextlib.contextmanager
+    def session(self, autocommit=False):
+        """Run statements on one pooled connection.
+
+        Unless autocommit is set, the statements run in a single transaction
+        which is committed at the end of the block, or rolled back if the
+        block raises.
+        """
+        with self.pool.connection(autocommit=autocommit) as connection:
+            yield PostgresSession(connection, self._bind)
+            if not autocommit:
+                connection.commit()
 
     def _bind(self, statement, identifiers):
         if identifiers:
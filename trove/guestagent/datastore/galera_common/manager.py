@@ -70,6 +70,11 @@ class GaleraManager(manager.MySqlManager):
         app = self.mysql_app(self.mysql_app_status.get())
         return app.get_cluster_context()
 
+    def cluster_node_healthy(self, context):
+        LOG.debug("Checking the Galera state of the node.")
+        app = self.mysql_app(self.mysql_app_status.get())
+        return app.is_cluster_node_synced()
+
     def write_cluster_configuration_overrides(self, context,
                                               cluster_configuration):
         LOG.debug("Apply the updated cluster configuration.")
@@ -73,6 +73,18 @@ class GaleraApp(service.BaseMySqlApp):
         else:
             self.start_mysql(timeout=CONF.restore_usage_timeout)
 
+    def is_cluster_node_synced(self):
+        """Whether the node is a member of the cluster, in sync with it and
+        ready to serve queries.
+        """
+        with self.local_sql_client(self.get_engine()) as client:
+            status = dict(client.execute(
+                "SHOW GLOBAL STATUS WHERE Variable_name IN "
+                "('wsrep_ready', 'wsrep_local_state_comment')").fetchall())
+        LOG.debug("Galera state: %s", status)
+        return (status.get('wsrep_ready', '').upper() == 'ON' and
+                status.get('wsrep_local_state_comment') == 'Synced')
+
     @abc.abstractproperty
     def cluster_configuration(self):
         """
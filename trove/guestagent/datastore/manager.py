@@ -468,6 +468,13 @@ class Manager(periodic_task.PeriodicTasks):
         LOG.debug("Cluster creation complete, starting status checks.")
         self.status.end_install()
 
+    def cluster_node_healthy(self, context):
+        """Whether this node has (re)joined its cluster and is healthy.
+        Datastores that can tell more than whether the database is running
+        should override this.
+        """
+        return self.status.is_running
+
     #############
     # Log related
     #############
@@ -25,6 +25,7 @@ import uuid
 
 from oslo_log import log as logging
 from oslo_utils import encodeutils
+import pymysql
 from pymysql import err as pymysql_err
 from six.moves import urllib
 import sqlalchemy
@@ -135,6 +136,20 @@ def load_mysqld_options():
         return {}
 
 
+class MySqlStatusProbe(service.StatusProbe):
+    """Pings MySQL like 'mysqladmin ping', as the Trove admin user."""
+
+    def _connect(self, timeout):
+        return pymysql.connect(
+            host='127.0.0.1', port=3306, user=ADMIN_USER_NAME,
+            password=BaseMySqlApp.get_auth_password().strip(),
+            connect_timeout=timeout, read_timeout=timeout,
+            write_timeout=timeout)
+
+    def _ping(self, connection):
+        connection.ping(reconnect=False)
+
+
 class BaseMySqlAppStatus(service.BaseDbStatus):
 
     @classmethod
@@ -143,7 +158,15 @@ class BaseMySqlAppStatus(service.BaseDbStatus):
             cls._instance = BaseMySqlAppStatus()
         return cls._instance
 
+    @property
+    def probe(self):
+        if not hasattr(self, '_probe'):
+            self._probe = MySqlStatusProbe()
+        return self._probe
+
     def _get_actual_db_status(self):
+        if CONF.status_probe_native and self.probe.is_alive():
+            return rd_instance.ServiceStatuses.RUNNING
         try:
             out, err = utils.execute_with_timeout(
                 "/usr/bin/mysqladmin",
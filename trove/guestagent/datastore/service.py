@@ -14,6 +14,7 @@
 #    under the License.
 
 
+import collections
 import os
 import time
 
@@ -25,6 +26,7 @@ from trove.common import context as trove_context
 from trove.common.i18n import _
 from trove.common import instance
 from trove.conductor import api as conductor_api
+from trove.guestagent import dbaas
 from trove.guestagent.common import guestagent_utils
 from trove.guestagent.common import operating_system
 
@@ -33,6 +35,64 @@ LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
 
+class StatusProbe(object):
+    """Checks that DB is up from within the guest agent process.
+
+    This saves starting a client program (often through sudo) on every
+    status update. A connection to DB is kept open between checks and
+    pinged; if that fails, a new connection is tried once before DB is
+    reported as down. The time taken by each check is recorded.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self.counters = collections.Counter()
+        self.last_latency = None
+        self.max_latency = 0.0
+
+    def is_alive(self):
+        start = time.time()
+        alive = self._check()
+        latency = time.time() - start
+        self.counters['alive' if alive else 'failed'] += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        LOG.debug("Status probe of DB took %(time).3fs (counters: "
+                  "%(counters)s).",
+                  {'time': latency, 'counters': dict(self.counters)})
+        return alive
+
+    def _check(self):
+        reconnect = self._connection is not None
+        for attempt in range(2 if reconnect else 1):
+            try:
+                if self._connection is None:
+                    self._connection = self._connect(
+                        CONF.status_probe_timeout)
+                self._ping(self._connection)
+                return True
+            except Exception as e:
+                LOG.debug("Status probe of DB failed: %s", e)
+                self.close()
+        return False
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def _connect(self, timeout):
+        """Open a connection to DB."""
+        raise NotImplementedError()
+
+    def _ping(self, connection):
+        """Raise an exception unless DB answers on the connection."""
+        raise NotImplementedError()
+
+
 class BaseDbStatus(object):
     """
     Answers the question "what is the status of the DB application on
@@ -67,6 +127,11 @@ class BaseDbStatus(object):
             raise RuntimeError(_("Cannot instantiate twice."))
         self.status = None
         self.restart_mode = False
+        # Heartbeats sent and suppressed, and status probes skipped.
+        self.heartbeat_counters = collections.Counter()
+        self._last_heartbeat = None
+        self._probe_interval = 0
+        self._next_probe = 0
 
         self.__prepare_completed = None
 
@@ -127,6 +192,7 @@ class BaseDbStatus(object):
     def end_restart(self):
         self.restart_mode = False
         LOG.info("Ending restart.")
+        self._reset_probe_interval()
         self._end_install_or_restart(False)
 
     def _end_install_or_restart(self, force):
@@ -167,19 +233,36 @@ class BaseDbStatus(object):
             context = trove_context.TroveContext()
 
             heartbeat = {'service_status': status.description}
+            if CONF.agent_heartbeat_volume_stats:
+                volume_info = self._get_volume_info()
+                if volume_info:
+                    heartbeat['volume'] = volume_info
             conductor_api.API(context).heartbeat(
                 CONF.guest_id, heartbeat,
                 sent=timeutils.utcnow_ts(microsecond=True))
             LOG.debug("Successfully cast set_status.")
+            self._last_heartbeat = time.time()
             self.status = status
         else:
             LOG.debug("Prepare has not completed yet, skipping heartbeat.")
 
+    def _get_volume_info(self):
+        """Used and total size of the data volume, for the heartbeat."""
+        mount_point = CONF.get(CONF.datastore_manager).mount_point
+        try:
+            stats = dbaas.get_filesystem_volume_stats(mount_point)
+        except RuntimeError:
+            return None
+        return {'used': stats['used'], 'total': stats['total']}
+
     def update(self):
         """Find and report status of DB on this machine.
         The database is updated and the status is also returned.
         """
         if self.is_installed and not self._is_restarting:
+            if CONF.agent_heartbeat_delta:
+                self._update_delta()
+                return
             LOG.debug("Determining status of DB server.")
             status = self._get_actual_db_status()
             self.set_status(status)
@@ -188,6 +271,51 @@ class BaseDbStatus(object):
                      "for now we'll skip determining the status of DB on "
                      "this instance.")
 
+    def _update_delta(self):
+        """Report the status of DB only when it changes.
+
+        A heartbeat is still sent every half agent_heartbeat_expiry, so the
+        guest does not look unreachable. While the DB stays running the
+        status is probed less and less often, up to every
+        agent_status_probe_max_interval seconds; any other status, a change
+        of status or a restart go back to probing on every update.
+        """
+        now = time.time()
+        # Updates run every report_interval seconds, give or take.
+        slack = CONF.report_interval / 2.0
+        keepalive_due = (
+            self._last_heartbeat is None or
+            now - self._last_heartbeat + slack >=
+            CONF.agent_heartbeat_expiry / 2.0)
+        if not keepalive_due and now + slack < self._next_probe:
+            self.heartbeat_counters['probes_skipped'] += 1
+            return
+
+        LOG.debug("Determining status of DB server.")
+        status = self._get_actual_db_status()
+        if (status != self.status or
+                status != instance.ServiceStatuses.RUNNING):
+            self._reset_probe_interval()
+        else:
+            self._probe_interval = min(
+                max(self._probe_interval * 2, CONF.report_interval),
+                CONF.agent_status_probe_max_interval)
+            self._next_probe = now + self._probe_interval
+
+        if keepalive_due or status != self.status:
+            self.set_status(status)
+            self.heartbeat_counters['sent'] += 1
+        else:
+            self.heartbeat_counters['suppressed'] += 1
+            LOG.debug("DB status is still '%(status)s', skipping heartbeat "
+                      "(counters: %(counters)s).",
+                      {'status': status.description,
+                       'counters': dict(self.heartbeat_counters)})
+
+    def _reset_probe_interval(self):
+        self._probe_interval = 0
+        self._next_probe = 0
+
     def restart_db_service(self, service_candidates, timeout):
         """Restart the database.
         Do not change the service auto-start setting.
@@ -16,7 +16,11 @@ import enum
 import hashlib
 import os
 from requests.exceptions import ConnectionError
+import zlib
 
+import eventlet
+from eventlet import queue
+from eventlet import tpool
 from oslo_log import log as logging
 from swiftclient.client import ClientException
 
@@ -85,6 +89,7 @@ class GuestLog(object):
     MF_LABEL_LOG_FILE = 'log_file'
     MF_LABEL_LOG_SIZE = 'log_size'
     MF_LABEL_LOG_HEADER = 'log_header_digest'
+    MF_LABEL_LOG_SERIES = 'log_component_series'
 
     def __init__(self, log_context, log_name, log_type, log_user, log_file,
                  log_exposed):
@@ -98,6 +103,7 @@ class GuestLog(object):
         self._published_size = None
         self._header_digest = 'abc'
         self._published_header_digest = None
+        self._component_series = None
         self._status = None
         self._cached_context = None
         self._cached_swift_client = None
@@ -224,6 +230,8 @@ class GuestLog(object):
                     meta_details[self.MF_LABEL_LOG_SIZE])
                 self._published_header_digest = (
                     meta_details[self.MF_LABEL_LOG_HEADER])
+                self._component_series = meta_details.get(
+                    self.MF_LABEL_LOG_SERIES)
             except ClientException as ex:
                 if ex.http_status == 404:
                     LOG.debug("No published metadata found for log '%s'",
@@ -294,7 +302,7 @@ class GuestLog(object):
             return True
 
     def _update_log_header_digest(self, log_file):
-        with open(log_file, 'r') as log:
+        with open(log_file, 'rb') as log:
             self._header_digest = hashlib.md5(log.readline()).hexdigest()
 
     def _get_headers(self):
@@ -337,46 +345,89 @@ class GuestLog(object):
         self._set_status(self._type == LogType.USER,
                          LogStatus.Disabled, LogStatus.Enabled)
         self._published_size = 0
+        self._component_series = None
 
     def _publish_to_container(self, log_filename):
-        log_component, log_lines = '', 0
-        chunk_size = CONF.guest_log_limit
+        """Upload the unpublished part of the log in components.
+
+        Up to guest_log_publish_concurrency components are uploaded at the
+        same time. The published size in the metafile is advanced after
+        each component, in log order, so an interrupted publish resumes
+        after the last component known to be stored. Components are named
+        after their offset in the log: one that is uploaded again replaces
+        the earlier copy instead of duplicating it.
+        """
         container_name = self.get_container_name(force=True)
-
-        def _read_chunk(f):
-            while True:
-                current_chunk = f.read(chunk_size)
-                if not current_chunk:
-                    break
-                yield current_chunk
-
-        def _write_log_component():
-            object_headers.update({'x-object-meta-lines': str(log_lines)})
-            component_name = '%s%s' % (self._object_prefix(),
-                                       self._object_name())
-            self.swift_client.put_object(container_name,
-                                         component_name, log_component,
-                                         headers=object_headers)
-            self._published_size = (
-                self._published_size + len(log_component))
-            self._published_header_digest = self._header_digest
-
         self._refresh_details()
-        self._put_meta_details()
-        object_headers = self._get_headers()
-        with open(log_filename, 'r') as log:
-            LOG.debug("seeking to %s", self._published_size)
-            log.seek(self._published_size)
-            for chunk in _read_chunk(log):
-                for log_line in chunk.splitlines():
-                    if len(log_component) + len(log_line) > chunk_size:
-                        _write_log_component()
-                        log_component, log_lines = '', 0
-                    log_component = log_component + log_line + '\n'
-                    log_lines += 1
-        if log_lines > 0:
-            _write_log_component()
-        self._put_meta_details()
+        if self._component_series is None:
+            # Orders the components of this log after any older ones.
+            self._component_series = timeutils.utcnow().isoformat()
+            self._put_meta_details()
+        compress = CONF.guest_log_compress
+        # The metafile is written with our own client, each upload takes
+        # one from this queue (or creates one).
+        swift_clients = queue.LightQueue()
+
+        def _upload(component):
+            offset, data = component
+            headers = self._get_headers()
+            headers['x-object-meta-lines'] = str(data.count(b'\n'))
+            content_type = None
+            name = self._object_prefix() + self._object_name(offset)
+            end = offset + len(data)
+            if compress:
+                data = tpool.execute(_gzip, data)
+                content_type = 'application/gzip'
+            try:
+                swift_client = swift_clients.get_nowait()
+            except queue.Empty:
+                swift_client = create_swift_client(self.context)
+            try:
+                swift_client.put_object(container_name, name, data,
+                                        content_type=content_type,
+                                        headers=headers)
+            except Exception as e:
+                # Raised in log order, from the loop below.
+                return e
+            finally:
+                swift_clients.put(swift_client)
+            LOG.debug("Published %(name)s of log '%(log)s'.",
+                      {'name': name, 'log': self._name})
+            return end
+
+        pool = eventlet.GreenPool(CONF.guest_log_publish_concurrency)
+        with open(log_filename, 'rb') as log:
+            # Whatever is written to the log from now on is left for the
+            # next publish.
+            components = self._read_components(log, self._size)
+            for published_size in pool.imap(_upload, components):
+                if isinstance(published_size, Exception):
+                    raise published_size
+                self._published_size = published_size
+                self._published_header_digest = self._header_digest
+                self._put_meta_details()
+
+    def _read_components(self, log, end):
+        """Cut the log from the published size up to `end` into
+        components of at most guest_log_limit bytes each, ending on a line
+        boundary unless a single line fills a whole component.
+        """
+        limit = CONF.guest_log_limit
+        offset = self._published_size
+        LOG.debug("seeking to %s", offset)
+        log.seek(offset)
+        tail = b''
+        while offset < end:
+            data = tail + log.read(min(limit, end - offset) - len(tail))
+            if not data:
+                break
+            size = len(data)
+            if offset + size < end:
+                # The partial last line starts the next component.
+                size = data.rfind(b'\n') + 1 or size
+            tail = data[size:]
+            yield offset, data[:size]
+            offset += size
 
     def _put_meta_details(self):
         metafile_name = self._metafile_name()
@@ -386,6 +437,7 @@ class GuestLog(object):
             self.MF_LABEL_LOG_FILE: self._file,
             self.MF_LABEL_LOG_SIZE: self._published_size,
             self.MF_LABEL_LOG_HEADER: self._header_digest,
+            self.MF_LABEL_LOG_SERIES: self._component_series,
         }
         container_name = self.get_container_name()
         self.swift_client.put_object(container_name, metafile_name,
@@ -403,8 +455,11 @@ class GuestLog(object):
             'datastore': CONF.datastore_manager,
             'log': self._name}
 
-    def _object_name(self):
-        return 'log-%s' % str(timeutils.utcnow()).replace(' ', 'T')
+    def _object_name(self, offset):
+        name = 'log-%s-%020d' % (self._component_series, offset)
+        if CONF.guest_log_compress:
+            name += '.gz'
+        return name
 
     def _get_meta_details(self):
         LOG.debug("Getting meta details for '%s'", self._name)
@@ -414,3 +469,8 @@ class GuestLog(object):
             container_name, metafile_name)
         LOG.debug("Found meta details for '%s'", self._name)
         return self._codec.deserialize(metafile_details)
+
+
+def _gzip(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
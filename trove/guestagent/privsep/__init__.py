@@ -0,0 +1,32 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Privileged helper of the guest agent.
+
+The functions decorated with one of the contexts below are the only
+operations the helper process runs on behalf of the agent.
+"""
+
+from oslo_privsep import capabilities
+from oslo_privsep import priv_context
+
+file_pctxt = priv_context.PrivContext(
+    'trove',
+    cfg_section='trove_file_privsep',
+    pypath=__name__ + '.file_pctxt',
+    capabilities=[capabilities.CAP_CHOWN,
+                  capabilities.CAP_DAC_OVERRIDE,
+                  capabilities.CAP_DAC_READ_SEARCH,
+                  capabilities.CAP_FOWNER],
+)
@@ -0,0 +1,157 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""File operations run by the privileged helper.
+
+These follow the behavior of the shell commands operating_system runs
+through sudo otherwise, see the functions of the same name there.
+"""
+
+import errno
+import grp
+import os
+import pwd
+import shutil
+import stat
+
+from trove.guestagent import privsep
+
+
+def _walk(path, recursive):
+    """Yield the path and, if recursive, everything below it."""
+    yield path
+    if recursive and os.path.isdir(path) and not os.path.islink(path):
+        for root, dirs, files in os.walk(path):
+            for name in dirs + files:
+                yield os.path.join(root, name)
+
+
+def _apply(func, paths, force):
+    for path in paths:
+        try:
+            func(path)
+        except OSError:
+            if not force:
+                raise
+
+
+@privsep.file_pctxt.entrypoint
+def exists(path, is_directory):
+    if is_directory:
+        return os.path.isdir(path)
+    return os.path.isfile(path)
+
+
+@privsep.file_pctxt.entrypoint
+def read_file(path):
+    with open(path, 'rb') as fp:
+        return fp.read()
+
+
+@privsep.file_pctxt.entrypoint
+def write_file(path, data):
+    # An existing file keeps its owner and mode, a new one is only
+    # accessible by root, as with 'cp' from a temporary file.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as fp:
+        fp.write(data)
+
+
+@privsep.file_pctxt.entrypoint
+def create_directory(path, force):
+    try:
+        if force:
+            os.makedirs(path)
+        else:
+            os.mkdir(path)
+    except OSError as e:
+        if not (force and e.errno == errno.EEXIST and os.path.isdir(path)):
+            raise
+
+
+@privsep.file_pctxt.entrypoint
+def chown(path, user, group, recursive, force):
+    uid = gid = -1
+    if user:
+        entry = pwd.getpwnam(user)
+        uid = entry.pw_uid
+        # 'user:' also changes the group to the login group of the user.
+        gid = entry.pw_gid
+    if group:
+        gid = grp.getgrnam(group).gr_gid
+
+    def change(item):
+        if item == path:
+            os.chown(item, uid, gid)
+        else:
+            os.lchown(item, uid, gid)
+
+    _apply(change, _walk(path, recursive), force)
+
+
+@privsep.file_pctxt.entrypoint
+def chmod(path, reset, add, remove, recursive, force):
+    def change(item):
+        # Symbolic links met while recursing are left alone.
+        if item != path and os.path.islink(item):
+            return
+        if reset is not None:
+            mode = reset
+        else:
+            mode = stat.S_IMODE(os.stat(item).st_mode)
+        os.chmod(item, (mode | add) & ~remove)
+
+    _apply(change, _walk(path, recursive), force)
+
+
+@privsep.file_pctxt.entrypoint
+def remove(path, recursive, force):
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            if not recursive:
+                raise OSError(errno.EISDIR, os.strerror(errno.EISDIR), path)
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except OSError as e:
+        if not (force and e.errno == errno.ENOENT):
+            raise
+
+
+@privsep.file_pctxt.entrypoint
+def move(source, destination):
+    shutil.move(source, destination)
+
+
+@privsep.file_pctxt.entrypoint
+def copy(source, destination, preserve, recursive, dereference):
+    if os.path.isdir(destination):
+        destination = os.path.join(destination,
+                                   os.path.basename(source.rstrip('/')))
+    if os.path.islink(source) and recursive and not dereference:
+        os.symlink(os.readlink(source), destination)
+    elif os.path.isdir(source):
+        if not recursive:
+            raise OSError(errno.EISDIR, os.strerror(errno.EISDIR), source)
+        shutil.copytree(source, destination, symlinks=not dereference)
+    else:
+        existed = os.path.exists(destination)
+        shutil.copyfile(source, destination)
+        if preserve:
+            shutil.copystat(source, destination)
+        elif not existed:
+            shutil.copymode(source, destination)
+    if preserve:
+        source_stat = os.stat(source)
+        os.lchown(destination, source_stat.st_uid, source_stat.st_gid)
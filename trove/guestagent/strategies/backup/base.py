@@ -21,6 +21,7 @@ from oslo_log import log as logging
 from eventlet.green import subprocess
 from trove.common import cfg, utils
 from trove.common.strategies.strategy import Strategy
+from trove.guestagent.strategies import codecs
 
 CONF = cfg.CONF
 
@@ -45,11 +46,14 @@ class BackupRunner(Strategy):
     is_zipped = CONF.backup_use_gzip_compression
     is_encrypted = CONF.backup_use_openssl_encryption
     encrypt_key = CONF.backup_aes_cbc_key
+    compression_codec = CONF.backup_compression_codec
+    encryption_codec = CONF.backup_encryption_codec
 
     def __init__(self, filename, **kwargs):
         self.base_filename = filename
         self.process = None
         self.pid = None
+        self._encoder = None
         kwargs.update({'filename': filename})
         self.command = self.cmd % kwargs
         super(BackupRunner, self).__init__()
@@ -114,29 +118,55 @@ class BackupRunner(Strategy):
                            self.zip_manifest,
                            self.encrypt_manifest)
 
+    @property
+    def compressor(self):
+        if self.is_zipped:
+            return codecs.get_compression_codec(self.compression_codec)
+        return None
+
+    @property
+    def encryptor(self):
+        if self.is_encrypted:
+            return codecs.get_encryption_codec(self.encryption_codec,
+                                               self.encrypt_key)
+        return None
+
     @property
     def zip_cmd(self):
-        return ' | gzip' if self.is_zipped else ''
+        return self.compressor.encode_cmd() if self.is_zipped else ''
 
     @property
     def zip_manifest(self):
-        return '.gz' if self.is_zipped else ''
+        return self.compressor.extension if self.is_zipped else ''
 
     @property
     def encrypt_cmd(self):
-        return (' | openssl enc -aes-256-cbc -salt -pass pass:%s' %
-                self.encrypt_key) if self.is_encrypted else ''
+        return self.encryptor.encode_cmd() if self.is_encrypted else ''
 
     @property
     def encrypt_manifest(self):
-        return '.enc' if self.is_encrypted else ''
+        return self.encryptor.extension if self.is_encrypted else ''
 
     def check_process(self):
         """Hook for subclasses to check process for errors."""
         return True
 
     def read(self, chunk_size):
-        return self.process.stdout.read(chunk_size)
+        if self._encoder is None:
+            self._encoder = (self.encryptor and
+                             self.encryptor.encoder()) or False
+        if not self._encoder:
+            return self.process.stdout.read(chunk_size)
+        # The encoder buffers partial blocks, keep reading until it has
+        # something to return or the stream has ended.
+        while True:
+            chunk = self.process.stdout.read(chunk_size)
+            if not chunk:
+                data, self._encoder = self._encoder.finalize(), False
+                return data
+            data = self._encoder.update(chunk)
+            if data:
+                return data
 
     def _run_pre_backup(self):
         pass
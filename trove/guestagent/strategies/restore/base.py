@@ -20,6 +20,7 @@ from oslo_log import log as logging
 from trove.common import cfg
 from trove.common.strategies.strategy import Strategy
 from trove.common import utils
+from trove.guestagent.strategies import codecs
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -80,14 +81,26 @@ class RestoreRunner(Strategy):
         return self._unpack(self.location, self.checksum, self.restore_cmd)
 
     def _unpack(self, location, checksum, command):
+        if location != self.location:
+            # The parents of an incremental backup may have been written
+            # with other codecs than the backup being restored.
+            prefix = self._decode_cmd(self.location)
+            if command.startswith(prefix):
+                command = self._decode_cmd(location) + command[len(prefix):]
+        encryption = self._codecs(location)[1]
+        decoder = encryption.decoder() if encryption else None
         stream = self.storage.load(location, checksum)
         self.process = subprocess.Popen(command, shell=True,
                                         stdin=subprocess.PIPE,
                                         stderr=subprocess.PIPE)
         content_length = 0
         for chunk in stream:
-            self.process.stdin.write(chunk)
             content_length += len(chunk)
+            if decoder:
+                chunk = decoder.update(chunk)
+            self.process.stdin.write(chunk)
+        if decoder:
+            self.process.stdin.write(decoder.finalize())
         self.process.stdin.close()
         utils.raise_if_process_errored(self.process, RestoreError)
         if not self.check_process():
@@ -96,17 +109,30 @@ class RestoreRunner(Strategy):
 
         return content_length
 
+    def _codecs(self, location):
+        """Return the (compression, encryption) codecs of a backup."""
+        detected = codecs.detect_codecs(location, self.decrypt_key)
+        if detected is not None:
+            return detected
+        # Without a known extension, fall back to the configured behaviour.
+        return (codecs.GzipCodec() if self.is_zipped else None,
+                codecs.OpenSSLCodec(self.decrypt_key)
+                if self.is_encrypted else None)
+
+    def _decode_cmd(self, location):
+        compression, encryption = self._codecs(location)
+        return ((encryption.decode_cmd() if encryption else '') +
+                (compression.decode_cmd() if compression else ''))
+
     @property
     def decrypt_cmd(self):
-        if self.is_encrypted:
-            return ('openssl enc -d -aes-256-cbc -salt -pass pass:%s | '
-                    % self.decrypt_key)
-        else:
-            return ''
+        encryption = self._codecs(self.location)[1]
+        return encryption.decode_cmd() if encryption else ''
 
     @property
     def unzip_cmd(self):
-        return 'gzip -d -c | ' if self.is_zipped else ''
+        compression = self._codecs(self.location)[0]
+        return compression.decode_cmd() if compression else ''
 
     def check_process(self):
         """Hook for subclasses to check the restore process for errors."""
@@ -46,7 +46,6 @@ from trove.common import utils
 from trove.configuration.models import Configuration
 from trove.datastore import models as datastore_models
 from trove.datastore.models import DatastoreVersionMetadata as dvm
-from trove.datastore.models import DBDatastoreVersionMetadata
 from trove.db import get_db_api
 from trove.db import models as dbmodels
 from trove.extensions.security_group.models import SecurityGroup
@@ -142,6 +141,32 @@ AGENT_INVALID_STATUSES = ["BUILD", "REBOOT", "RESIZE", "PROMOTE", "EJECT",
                           "UPGRADE"]
 
 
+class InstanceRecords(object):
+    """Identity map of the datastores and datastore versions of instances.
+
+    A list of instances shares one, so that each datastore and version is
+    resolved once for the list rather than once per instance. It is meant
+    to live for a single request.
+    """
+
+    def __init__(self):
+        self.datastores = {}
+        self.datastore_versions = {}
+
+    def datastore_version(self, datastore_version_id):
+        if datastore_version_id not in self.datastore_versions:
+            self.datastore_versions[datastore_version_id] = (
+                datastore_models.DatastoreVersion.load_by_uuid(
+                    datastore_version_id))
+        return self.datastore_versions[datastore_version_id]
+
+    def datastore(self, datastore_id):
+        if datastore_id not in self.datastores:
+            self.datastores[datastore_id] = (
+                datastore_models.Datastore.load(datastore_id))
+        return self.datastores[datastore_id]
+
+
 class SimpleInstance(object):
     """A simple view of an instance.
     This gets loaded directly from the local database, so its cheaper than
@@ -162,12 +187,13 @@ class SimpleInstance(object):
     """
 
     def __init__(self, context, db_info, datastore_status, root_password=None,
-                 ds_version=None, ds=None, locality=None):
+                 ds_version=None, ds=None, locality=None, records=None):
         """
         :type context: trove.common.context.TroveContext
         :type db_info: trove.instance.models.DBInstance
         :type datastore_status: trove.instance.models.InstanceServiceStatus
         :type root_password: str
+        :type records: trove.instance.models.InstanceRecords
         """
         self.context = context
         self.db_info = db_info
@@ -175,12 +201,15 @@ class SimpleInstance(object):
         self.root_pass = root_password
         self._fault = None
         self._fault_loaded = False
+        if records is None:
+            records = InstanceRecords()
         if ds_version is None:
-            self.ds_version = (datastore_models.DatastoreVersion.
-                               load_by_uuid(self.db_info.datastore_version_id))
+            ds_version = records.datastore_version(
+                self.db_info.datastore_version_id)
+        self.ds_version = ds_version
         if ds is None:
-            self.ds = (datastore_models.Datastore.
-                       load(self.ds_version.datastore_id))
+            ds = records.datastore(self.ds_version.datastore_id)
+        self.ds = ds
         self.locality = locality
 
         self.slave_list = None
@@ -417,6 +446,14 @@ class SimpleInstance(object):
             self._fault_loaded = True
         return self._fault
 
+    @fault.setter
+    def fault(self, fault):
+        # Allows list loaders to hand over a fault fetched in bulk
+        if fault is not None and not self.context.is_admin:
+            fault.details = None
+        self._fault = fault
+        self._fault_loaded = True
+
     @property
     def configuration(self):
         if self.db_info.configuration_id is not None:
@@ -548,20 +585,34 @@ def load_instance(cls, context, id, needs_server=False,
     return cls(context, db_info, server, service_status)
 
 
-def load_instance_with_info(cls, context, id, cluster_id=None):
+def load_instance_with_info(cls, context, id, cluster_id=None,
+                            refresh_volume=False):
     db_info = get_db_info(context, id, cluster_id)
     load_simple_instance_server_status(context, db_info)
     service_status = InstanceServiceStatus.find_by(instance_id=id)
     LOG.debug("Instance %(instance_id)s service status is %(service_status)s.",
               {'instance_id': id, 'service_status': service_status.status})
     instance = cls(context, db_info, service_status)
-    load_guest_info(instance, context, id)
+    load_guest_info(instance, context, id, refresh_volume=refresh_volume)
     load_server_group_info(instance, context, db_info.compute_instance_id)
     return instance
 
 
-def load_guest_info(instance, context, id):
+def load_guest_info(instance, context, id, refresh_volume=False):
+    """Load the volume usage of an instance.
+
+    The usage last reported in the guest heartbeats is used as long as it is
+    recent enough (see volume_stats_cache_expiry); otherwise, or if
+    refresh_volume is set, the guest is asked for it.
+    """
     if instance.status not in AGENT_INVALID_STATUSES:
+        if not refresh_volume:
+            volume_info = instance.datastore_status.get_volume_info(
+                CONF.volume_stats_cache_expiry)
+            if volume_info:
+                instance.volume_used = volume_info['used']
+                instance.volume_total = volume_info['total']
+                return instance
         guest = create_guest_client(context, id)
         try:
             volume_info = guest.get_volume_info()
@@ -594,7 +645,8 @@ class BaseInstance(SimpleInstance):
     -----------
     """
 
-    def __init__(self, context, db_info, server, datastore_status):
+    def __init__(self, context, db_info, server, datastore_status,
+                 records=None):
         """
         Creates a new initialized representation of an instance composed of its
         state in the database and its state from Nova
@@ -611,8 +663,11 @@ class BaseInstance(SimpleInstance):
         :type db_info: trove.instance.models.DBInstance
         :type server: novaclient.v2.servers.Server
         :typdatastore_statusus: trove.instance.models.InstanceServiceStatus
+        :param records: the datastores and versions already resolved for
+        the list this instance is loaded for
         """
-        super(BaseInstance, self).__init__(context, db_info, datastore_status)
+        super(BaseInstance, self).__init__(context, db_info, datastore_status,
+                                           records=records)
         self.server = server
         self._guest = None
         self._nova_client = None
@@ -876,12 +931,8 @@ class Instance(BuiltInstance):
         # All nova flavors are permitted for a datastore-version unless one
         # or more entries are found in datastore_version_metadata,
         # in which case only those are permitted.
-        bound_flavors = DBDatastoreVersionMetadata.find_all(
-            datastore_version_id=datastore_version.id,
-            key='flavor', deleted=False
-        )
-        if bound_flavors.count() > 0:
-            valid_flavors = tuple(f.value for f in bound_flavors)
+        valid_flavors = dvm.get_values(datastore_version.id, 'flavor')
+        if valid_flavors:
             if flavor_id not in valid_flavors:
                 raise exception.DatastoreFlavorAssociationNotFound(
                     datastore=datastore.name,
@@ -1463,8 +1514,12 @@ class Instance(BuiltInstance):
 
 def create_server_list_matcher(server_list):
     # Returns a method which finds a server from the given list.
+    servers_by_id = {}
+    for server in server_list:
+        servers_by_id.setdefault(server.id, []).append(server)
+
     def find_server(instance_id, server_id):
-        matches = [server for server in server_list if server.id == server_id]
+        matches = servers_by_id.get(server_id, [])
         if len(matches) == 1:
             return matches[0]
         elif len(matches) < 1:
@@ -1483,44 +1538,154 @@ def create_server_list_matcher(server_list):
     return find_server
 
 
+def _needs_local_server(db_info):
+    """Whether the nova server for db_info comes from the local region
+    server listing (as opposed to a per-region lookup or no lookup at all).
+    """
+    return (InstanceTasks.BUILDING != db_info.task_status and
+            (not db_info.region_id or
+             db_info.region_id == CONF.os_region_name))
+
+
+def load_servers_for_instances(context, db_infos):
+    """Return the local region nova servers backing the given instances.
+
+    Nova is only contacted if at least one of the instances actually needs
+    its server, and only the servers belonging to those instances are kept.
+    """
+    compute_ids = set(db_info.compute_instance_id for db_info in db_infos
+                      if _needs_local_server(db_info))
+    if not compute_ids:
+        return []
+    client = create_nova_client(context)
+    return [server for server in client.servers.list()
+            if server.id in compute_ids]
+
+
+def load_instance_page(limit, marker=None, filters=None, **conditions):
+    """Load one page of instances along with their service status and fault.
+
+    The instance, service_statuses and instance_faults rows are fetched in a
+    single joined query, paginated on the instance id (rows after the marker
+    are selected, rather than skipped with an offset), so the cost does not
+    depend on how many instances the tenant owns.
+
+    :return: a list of (DBInstance, InstanceServiceStatus, DBInstanceFault)
+             tuples (the last two may be None) and the next page marker
+    """
+    query = DBInstance.query().filter_by(**conditions)
+    if filters:
+        query = query.filter(*filters)
+    if marker:
+        query = query.filter(DBInstance.id > marker)
+    query = query.outerjoin(
+        InstanceServiceStatus,
+        InstanceServiceStatus.instance_id == DBInstance.id)
+    query = query.outerjoin(
+        DBInstanceFault,
+        DBInstanceFault.instance_id == DBInstance.id)
+    query = query.add_entity(InstanceServiceStatus)
+    query = query.add_entity(DBInstanceFault)
+    query = query.order_by(DBInstance.id).limit(int(limit) + 1)
+    rows = query.all()
+    next_marker = None
+    if len(rows) > int(limit):
+        rows = rows[:int(limit)]
+        next_marker = rows[-1][0].id
+    return rows, next_marker
+
+
+def load_instance_statuses(instance_ids):
+    """Load the service and task statuses of many instances in one query.
+
+    :return: dict of instance id to a (ServiceStatus, InstanceTask) tuple;
+             instances that do not exist are left out, and the service
+             status is None for an instance without a service status row
+    """
+    if not instance_ids:
+        return {}
+    query = DBInstance.query().filter(DBInstance.id.in_(instance_ids))
+    query = query.outerjoin(
+        InstanceServiceStatus,
+        InstanceServiceStatus.instance_id == DBInstance.id)
+    query = query.with_entities(DBInstance.id, DBInstance.task_id,
+                                InstanceServiceStatus.status_id)
+    return dict(
+        (instance_id, (tr_instance.ServiceStatus.from_code(status_id)
+                       if status_id is not None else None,
+                       InstanceTask.from_code(task_id)))
+        for instance_id, task_id, status_id in query.all())
+
+
+class InstanceStatusWatch(object):
+    """Follows the statuses of a group of instances, such as the members of
+    a cluster, with one query per poll whatever the size of the group.
+    """
+
+    def __init__(self, instance_ids):
+        self.instance_ids = list(instance_ids)
+        # Latest (ServiceStatus, InstanceTask) of each instance
+        self.statuses = {}
+
+    def poll(self):
+        """Reload the statuses of the instances.
+
+        :return: dict of instance id to (previous, current) statuses, for
+                 the instances whose statuses changed (on the first poll,
+                 all of them); the previous or current statuses are None
+                 if the instance was not found
+        """
+        statuses = load_instance_statuses(self.instance_ids)
+        transitions = {}
+        for instance_id in self.instance_ids:
+            previous = self.statuses.get(instance_id)
+            current = statuses.get(instance_id)
+            if previous != current or instance_id not in self.statuses:
+                transitions[instance_id] = (previous, current)
+        self.statuses = dict((instance_id, statuses.get(instance_id))
+                             for instance_id in self.instance_ids)
+        return transitions
+
+
 class Instances(object):
     DEFAULT_LIMIT = CONF.instances_page_size
 
     @staticmethod
     def load(context, include_clustered, instance_ids=None):
 
-        def load_simple_instance(context, db_info, status, **kwargs):
-            return SimpleInstance(context, db_info, status)
-
         if context is None:
             raise TypeError(_("Argument context not defined."))
-        client = create_nova_client(context)
-        servers = client.servers.list()
         query_opts = {'tenant_id': context.tenant,
                       'deleted': False}
         if not include_clustered:
             query_opts['cluster_id'] = None
+        filters = None
         if instance_ids:
             if context.is_admin:
                 query_opts.pop('tenant_id')
             filters = [DBInstance.id.in_(instance_ids)]
-            db_infos = DBInstance.find_by_filter(filters=filters, **query_opts)
-        else:
-            db_infos = DBInstance.find_all(**query_opts)
         limit = utils.pagination_limit(context.limit, Instances.DEFAULT_LIMIT)
-        data_view = DBInstance.find_by_pagination('instances', db_infos, "foo",
-                                                  limit=limit,
-                                                  marker=context.marker)
-        next_marker = data_view.next_page_marker
+        rows, next_marker = load_instance_page(
+            limit, marker=context.marker, filters=filters, **query_opts)
+
+        db_infos = [db_info for db_info, _status, _fault in rows]
+        statuses = dict((db_info.id, status)
+                        for db_info, status, _fault in rows
+                        if status is not None)
+        faults = dict((db_info.id, fault) for db_info, _status, fault in rows)
+        records = InstanceRecords()
+
+        def load_simple_instance(context, db_info, status, **kwargs):
+            instance = SimpleInstance(context, db_info, status,
+                                      records=records)
+            instance.fault = faults.get(db_info.id)
+            return instance
 
+        servers = load_servers_for_instances(context, db_infos)
         find_server = create_server_list_matcher(servers)
-        for db in db_infos:
-            LOG.debug("Checking for db [id=%(db_id)s, "
-                      "compute_instance_id=%(instance_id)s].",
-                      {'db_id': db.id, 'instance_id': db.compute_instance_id})
         ret = Instances._load_servers_status(load_simple_instance, context,
-                                             data_view.collection,
-                                             find_server)
+                                             db_infos, find_server,
+                                             statuses=statuses)
         return ret, next_marker
 
     @staticmethod
@@ -1541,7 +1706,14 @@ class Instances(object):
         return db_insts
 
     @staticmethod
-    def _load_servers_status(load_instance, context, db_items, find_server):
+    def _load_servers_status(load_instance, context, db_items, find_server,
+                             statuses=None):
+        """Attach the server status to each item and build its instance.
+
+        :param statuses: optional mapping of instance id to an already
+                         loaded InstanceServiceStatus; if given, the service
+                         statuses are not looked up one at a time.
+        """
         ret = []
         for db in db_items:
             server = None
@@ -1568,8 +1740,14 @@ class Instances(object):
                 # TODO(tim.simpson): End of hack.
 
                 # volumes = find_volumes(server.id)
-                datastore_status = InstanceServiceStatus.find_by(
-                    instance_id=db.id)
+                if statuses is None:
+                    datastore_status = InstanceServiceStatus.find_by(
+                        instance_id=db.id)
+                elif db.id in statuses:
+                    datastore_status = statuses[db.id]
+                else:
+                    raise exception.ModelNotFoundError(
+                        _("InstanceServiceStatus Not Found"))
                 if not datastore_status.status:  # This should never happen.
                     LOG.error("Server status could not be read for "
                               "instance id(%s).", db.id)
@@ -1790,7 +1968,8 @@ class DBInstanceFault(dbmodels.DatabaseModelBase):
 
 class InstanceServiceStatus(dbmodels.DatabaseModelBase):
     _data_fields = ['instance_id', 'status_id', 'status_description',
-                    'updated_at']
+                    'updated_at', 'volume_used', 'volume_total',
+                    'volume_updated']
     _table_name = 'service_statuses'
 
     def __init__(self, status, **kwargs):
@@ -1824,6 +2003,27 @@ class InstanceServiceStatus(dbmodels.DatabaseModelBase):
         self.status_id = value.code
         self.status_description = value.description
 
+    def set_volume_info(self, volume_info):
+        """
+        Records the volume usage reported by the guest
+        :param volume_info: dict with the 'used' and 'total' size (in GB)
+        """
+        self.volume_used = volume_info['used']
+        self.volume_total = volume_info['total']
+        self.volume_updated = timeutils.utcnow()
+
+    def get_volume_info(self, expiry):
+        """
+        Returns the volume usage last reported by the guest, or None if it
+        is older than expiry seconds
+        """
+        if not expiry or self.volume_updated is None:
+            return None
+        if self.volume_updated < timeutils.utcnow() - timedelta(
+                seconds=expiry):
+            return None
+        return {'used': self.volume_used, 'total': self.volume_total}
+
     def save(self):
         self['updated_at'] = timeutils.utcnow()
         return get_db_api().save(self)
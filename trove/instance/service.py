@@ -248,8 +248,10 @@ class InstanceController(wsgi.Controller):
         LOG.debug("req : '%s'\n\n", req)
 
         context = req.environ[wsgi.CONTEXT_KEY]
-        server = models.load_instance_with_info(models.DetailInstance,
-                                                context, id)
+        refresh_volume = (
+            req.GET.get('refresh_volume', '').lower() == 'true')
+        server = models.load_instance_with_info(
+            models.DetailInstance, context, id, refresh_volume=refresh_volume)
         self.authorize_instance_action(context, 'show', server)
         return wsgi.Result(views.InstanceDetailView(server,
                                                     req=req).data(), 200)
@@ -168,11 +168,9 @@ class InstancesView(object):
         self.req = req
 
     def data(self):
-        data = []
-        # These are model instances
-        for instance in self.instances:
-            data.append(self.data_for_instance(instance))
-        return {'instances': data}
+        # These are model instances, viewed as the response is written.
+        return {'instances': wsgi.LazyList(self.instances,
+                                           self.data_for_instance)}
 
     def data_for_instance(self, instance):
         view = self.item_view(instance, req=self.req)
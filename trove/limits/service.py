@@ -33,6 +33,9 @@ class LimitsController(wsgi.Controller):
         quotas = QUOTAS.get_all_quotas_by_tenant(tenant_id)
         abs_limits = {k: v['hard_limit'] for k, v in quotas.items()}
         rate_limits = req.environ.get("trove.limits", [])
+        if callable(rate_limits):
+            # Deferred by RateLimitingMiddleware until somebody asks.
+            rate_limits = rate_limits()
 
         return wsgi.Result(views.LimitViews(abs_limits,
                                             rate_limits).data(), 200)
@@ -58,8 +58,6 @@ class Modules(object):
             query_opts['datastore_id'] = datastore
         if context.is_admin:
             db_info = DBModule.find_all(**query_opts)
-            if db_info.count() == 0:
-                LOG.debug("No modules found for admin user")
         else:
             # build a query manually, since we need current tenant
             # plus the 'all' tenant ones
@@ -67,9 +65,12 @@ class Modules(object):
             db_info = DBModule.query().filter_by(**query_opts)
             db_info = db_info.filter(or_(DBModule.tenant_id == context.tenant,
                                          DBModule.tenant_id.is_(None)))
-            if db_info.count() == 0:
-                LOG.debug("No modules found for tenant %s", context.tenant)
         modules = db_info.all()
+        if not modules:
+            if context.is_admin:
+                LOG.debug("No modules found for admin user")
+            else:
+                LOG.debug("No modules found for tenant %s", context.tenant)
         return modules
 
     @staticmethod
@@ -358,13 +359,13 @@ class InstanceModules(object):
     def load(context, instance_id=None, module_id=None, md5=None):
         db_info = InstanceModules.load_all(
             context, instance_id=instance_id, module_id=module_id, md5=md5)
-        if db_info.count() == 0:
-            LOG.debug("No instance module records found")
 
         limit = utils.pagination_limit(
             context.limit, Modules.DEFAULT_LIMIT)
         data_view = DBInstanceModule.find_by_pagination(
             'modules', db_info, 'foo', limit=limit, marker=context.marker)
+        if not data_view.collection and not context.marker:
+            LOG.debug("No instance module records found")
         next_marker = data_view.next_page_marker
         return data_view.collection, next_marker
 
@@ -444,6 +445,63 @@ class InstanceModule(object):
         DBInstanceModule.save(instance_module)
 
 
+class ModuleReapplyStatus(object):
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+
+
+class ModuleReapply(object):
+
+    @staticmethod
+    def start(context, module_id, md5, include_clustered, force):
+        """Start a reapply run of a module, or resume an unfinished one.
+
+        A run is unfinished if it stopped (or failed) before reaching all
+        the instances; it is resumed as long as the module contents have
+        not changed since.  Skipped and failed instances are looked at
+        again, so only the applied count is carried over.
+        """
+        run = DBModuleReapply.query().filter(
+            DBModuleReapply.module_id == module_id,
+            DBModuleReapply.md5 == md5,
+            DBModuleReapply.status != ModuleReapplyStatus.COMPLETED).order_by(
+            DBModuleReapply.created.desc()).first()
+        if run:
+            LOG.info("Resuming reapply %(run)s of module %(module)s "
+                     "(%(applied)d instances already done).",
+                     {'run': run.id, 'module': module_id,
+                      'applied': run.applied})
+            run.update(status=ModuleReapplyStatus.RUNNING,
+                       include_clustered=include_clustered, force=force,
+                       skipped=0, failed=0)
+            return run
+        return DBModuleReapply.create(
+            module_id=module_id, md5=md5,
+            status=ModuleReapplyStatus.RUNNING,
+            include_clustered=include_clustered, force=force,
+            total=0, applied=0, skipped=0, failed=0)
+
+    @staticmethod
+    def is_done(run, instance_module):
+        """Whether a run already applied the module to an instance."""
+        return (instance_module.md5 == run.md5 and
+                instance_module.updated >= run.created)
+
+    @staticmethod
+    def load_latest(context, module_id):
+        return DBModuleReapply.query().filter_by(
+            module_id=module_id).order_by(
+            DBModuleReapply.created.desc()).first()
+
+
+class DBModuleReapply(models.DatabaseModelBase):
+    _data_fields = [
+        'module_id', 'md5', 'status', 'include_clustered', 'force',
+        'total', 'applied', 'skipped', 'failed', 'created', 'updated']
+    _table_name = 'module_reapplies'
+
+
 class DBInstanceModule(models.DatabaseModelBase):
     _data_fields = [
         'instance_id', 'module_id', 'md5', 'created',
@@ -462,4 +520,5 @@ class DBModule(models.DatabaseModelBase):
 
 
 def persisted_models():
-    return {'modules': DBModule, 'instance_modules': DBInstanceModule}
+    return {'modules': DBModule, 'instance_modules': DBInstanceModule,
+            'module_reapplies': DBModuleReapply}
@@ -71,6 +71,7 @@ class ModuleController(wsgi.Controller):
         self.authorize_module_action(context, 'show', module)
         module.instance_count = len(models.InstanceModules.load(
             context, module_id=module.id, md5=module.md5))
+        module.reapply = models.ModuleReapply.load_latest(context, module.id)
 
         return wsgi.Result(
             views.DetailedModuleView(module).data(), 200)
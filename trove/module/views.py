@@ -99,6 +99,18 @@ class DetailedModuleView(ModuleView):
         module_dict["live_update"] = bool(self.module.live_update)
         if hasattr(self.module, 'instance_count'):
             module_dict["instance_count"] = self.module.instance_count
+        if getattr(self.module, 'reapply', None):
+            reapply = self.module.reapply
+            module_dict["reapply"] = {
+                "status": reapply.status,
+                "md5": reapply.md5,
+                "total": reapply.total,
+                "applied": reapply.applied,
+                "skipped": reapply.skipped,
+                "failed": reapply.failed,
+                "created": reapply.created,
+                "updated": reapply.updated,
+            }
         if include_contents:
             if not hasattr(self.module, 'encrypted_contents'):
                 self.module.encrypted_contents = self.module.contents
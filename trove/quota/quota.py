@@ -21,6 +21,7 @@ from oslo_utils import importutils
 import six
 
 from trove.common import exception
+from trove.db import get_db_api
 from trove.quota.models import Quota
 from trove.quota.models import QuotaUsage
 from trove.quota.models import Reservation
@@ -134,11 +135,7 @@ class DbQuotaDriver(object):
         :param deltas: A dictionary of the proposed delta changes.
         """
 
-        unregistered_resources = [delta for delta in deltas
-                                  if delta not in resources]
-        if unregistered_resources:
-            raise exception.QuotaResourceUnknown(
-                unknown=unregistered_resources)
+        self._check_resources(resources, deltas)
 
         quotas = self.get_all_quotas_by_tenant(tenant_id, deltas.keys())
         quota_usages = self.get_all_quota_usages_by_tenant(tenant_id,
@@ -154,6 +151,13 @@ class DbQuotaDriver(object):
         if overs:
             raise exception.QuotaExceeded(overs=sorted(overs))
 
+    def _check_resources(self, resources, deltas):
+        unregistered_resources = [delta for delta in deltas
+                                  if delta not in resources]
+        if unregistered_resources:
+            raise exception.QuotaResourceUnknown(
+                unknown=unregistered_resources)
+
     def reserve(self, tenant_id, resources, deltas):
         """Check quotas and reserve resources for a tenant.
 
@@ -165,28 +169,25 @@ class DbQuotaDriver(object):
         resources which are too high.  Otherwise, the method returns a
         list of reservation objects which were created.
 
+        The check and the reservation are done in a single transaction
+        with the usages of the tenant locked, so concurrent reservations
+        cannot exceed the quotas.
+
         :param tenant_id: The ID of the tenant reserving the resources.
         :param resources: A dictionary of the registered resources.
         :param deltas: A dictionary of the proposed delta changes.
         """
 
-        self.check_quotas(tenant_id, resources, deltas)
-        quota_usages = self.get_all_quota_usages_by_tenant(tenant_id,
-                                                           deltas.keys())
-
-        reservations = []
-        for resource in sorted(deltas):
-            reserved = deltas[resource]
-            usage = quota_usages[resource]
-            usage.reserved += reserved
-            usage.save()
-
-            resv = Reservation.create(usage_id=usage.id,
-                                      delta=reserved,
-                                      status=Reservation.Statuses.RESERVED)
-            reservations.append(resv)
+        self._check_resources(resources, deltas)
+        quotas = self.get_all_quotas_by_tenant(tenant_id, deltas.keys())
+        limits = {resource: quotas[resource].hard_limit
+                  for resource in deltas}
 
-        return reservations
+        rows = get_db_api().quota_reserve(
+            QuotaUsage, Reservation, tenant_id,
+            {resource: int(delta) for resource, delta in deltas.items()},
+            limits)
+        return [Reservation(**row) for row in rows]
 
     def commit(self, reservations):
         """Commit reservations.
@@ -195,15 +196,11 @@ class DbQuotaDriver(object):
                              returned by the reserve() method.
         """
 
+        get_db_api().reservation_commit(
+            QuotaUsage, Reservation,
+            [reservation.id for reservation in reservations])
         for reservation in reservations:
-            usage = QuotaUsage.find_by(id=reservation.usage_id)
-            usage.in_use += reservation.delta
-            if usage.in_use < 0:
-                usage.in_use = 0
-            usage.reserved -= reservation.delta
             reservation.status = Reservation.Statuses.COMMITTED
-            usage.save()
-            reservation.save()
 
     def rollback(self, reservations):
         """Roll back reservations.
@@ -212,12 +209,11 @@ class DbQuotaDriver(object):
                              returned by the reserve() method.
         """
 
+        get_db_api().reservation_rollback(
+            QuotaUsage, Reservation,
+            [reservation.id for reservation in reservations])
         for reservation in reservations:
-            usage = QuotaUsage.find_by(id=reservation.usage_id)
-            usage.reserved -= reservation.delta
             reservation.status = Reservation.Statuses.ROLLEDBACK
-            usage.save()
-            reservation.save()
 
 
 class QuotaEngine(object):
@@ -12,11 +12,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import os.path
 import time
 import traceback
 
 from cinderclient import exceptions as cinder_exceptions
+from eventlet import greenpool
 from eventlet import greenthread
 from eventlet.timeout import Timeout
 from novaclient import exceptions as nova_exceptions
@@ -29,6 +31,8 @@ from trove.backup.models import Backup
 from trove.backup.models import DBBackup
 from trove.backup.state import BackupState
 from trove.cluster.models import Cluster
+from trove.cluster.models import ClusterRoll
+from trove.cluster.models import ClusterRollStatus
 from trove.cluster.models import DBCluster
 from trove.cluster import tasks
 from trove.common import cfg
@@ -42,6 +46,7 @@ from trove.common.exception import MalformedSecurityGroupRuleError
 from trove.common.exception import PollTimeOut
 from trove.common.exception import TroveError
 from trove.common.exception import VolumeCreationFailure
+from trove.common import fanout
 from trove.common.i18n import _
 from trove.common import instance as rd_instance
 from trove.common.instance import ServiceStatuses
@@ -60,6 +65,7 @@ from trove.common.remote import create_dns_client
 from trove.common.remote import create_guest_client
 from trove.common import server_group as srv_grp
 from trove.common.strategies.cluster import strategy
+from trove.common.strategies.storage.swift import is_chunk_manifest
 from trove.common import template
 from trove.common import timeutils
 from trove.common import utils
@@ -74,6 +80,7 @@ from trove.instance.models import FreshInstance
 from trove.instance.models import Instance
 from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import InstanceStatus
+from trove.instance.models import InstanceStatusWatch
 from trove.instance.tasks import InstanceTasks
 from trove.module import models as module_models
 from trove.module import views as module_views
@@ -236,48 +243,46 @@ class ClusterTasks(Cluster):
                     ((status == fast_fail_statuses) or
                      (status in fast_fail_statuses)))
 
-        def _all_have_status(ids):
-            for instance_id in ids:
-                status = InstanceServiceStatus.find_by(
-                    instance_id=instance_id).get_status()
-                task_status = DBInstance.find_by(
-                    id=instance_id).get_task_status()
-                if (_is_fast_fail_status(status) or
-                        (task_status == InstanceTasks.BUILDING_ERROR_SERVER)):
+        def _has_failed(statuses):
+            if statuses is None:
+                # The instance (or its service status) is gone.
+                return True
+            status, task_status = statuses
+            return (status is None or _is_fast_fail_status(status) or
+                    (task_status == InstanceTasks.BUILDING_ERROR_SERVER))
+
+        # The statuses of all the instances are loaded with a single query
+        # on each poll.
+        watch = InstanceStatusWatch(instance_ids)
+
+        def _all_have_status():
+            for instance_id, (previous, current) in watch.poll().items():
+                LOG.debug("Instance %(id)s went from %(previous)s to "
+                          "%(current)s.", {'id': instance_id,
+                                           'previous': previous,
+                                           'current': current})
+            all_have_status = True
+            for instance_id, statuses in watch.statuses.items():
+                if _has_failed(statuses):
                     # if one has failed, no need to continue polling
                     LOG.debug("Instance %(id)s has acquired a fast-fail "
-                              "status %(status)s and"
-                              " task_status %(task_status)s.",
-                              {'id': instance_id, 'status': status,
-                               'task_status': task_status})
+                              "status %(statuses)s.",
+                              {'id': instance_id, 'statuses': statuses})
                     return True
-                if status != expected_status:
+                if statuses[0] != expected_status:
                     # if one is not in the expected state, continue polling
-                    LOG.debug("Instance %(id)s was %(status)s.",
-                              {'id': instance_id, 'status': status})
-                    return False
+                    all_have_status = False
+            return all_have_status
 
-            return True
-
-        def _instance_ids_with_failures(ids):
-            LOG.debug("Checking for service failures on instances: %s", ids)
-            failed_instance_ids = []
-            for instance_id in ids:
-                status = InstanceServiceStatus.find_by(
-                    instance_id=instance_id).get_status()
-                task_status = DBInstance.find_by(
-                    id=instance_id).get_task_status()
-                if (_is_fast_fail_status(status) or
-                        (task_status == InstanceTasks.BUILDING_ERROR_SERVER)):
-                    failed_instance_ids.append(instance_id)
-            return failed_instance_ids
+        def _instance_ids_with_failures():
+            return [instance_id for instance_id in watch.instance_ids
+                    if _has_failed(watch.statuses[instance_id])]
 
         LOG.debug("Polling until all instances acquire %(expected)s "
                   "status: %(ids)s",
                   {'expected': expected_status, 'ids': instance_ids})
         try:
-            utils.poll_until(lambda: instance_ids,
-                             lambda ids: _all_have_status(ids),
+            utils.poll_until(_all_have_status,
                              sleep_time=CONF.usage_sleep_time,
                              time_out=CONF.usage_timeout)
         except PollTimeOut:
@@ -286,7 +291,7 @@ class ClusterTasks(Cluster):
             self.update_statuses_on_failure(cluster_id, shard_id)
             return False
 
-        failed_ids = _instance_ids_with_failures(instance_ids)
+        failed_ids = _instance_ids_with_failures()
         if failed_ids:
             LOG.error("Some instances failed: %s", failed_ids)
             self.update_statuses_on_failure(cluster_id, shard_id)
@@ -322,15 +327,106 @@ class ClusterTasks(Cluster):
         cluster.save()
         LOG.debug("end delete_cluster for id: %s", cluster_id)
 
+    def _wait_for_rejoin(self, instances, delay_sec=0):
+        """Wait for the given nodes to be back in the cluster and healthy,
+        as told by their guest.
+
+        :param delay_sec: time given to the nodes whose guest cannot tell,
+                          once they are running
+        """
+        instance_ids = [instance.id for instance in instances]
+        unknown = set()
+
+        def _has_rejoined(instance, statuses):
+            if not statuses or statuses[0] != ServiceStatuses.RUNNING:
+                return False
+            try:
+                healthy = self.get_guest(instance).cluster_node_healthy()
+            except Exception as e:
+                LOG.debug("Node %(id)s is not healthy yet: %(error)s",
+                          {'id': instance.id, 'error': e})
+                return False
+            if healthy is None:
+                unknown.add(instance.id)
+                return True
+            return healthy
+
+        def _all_rejoined():
+            statuses = inst_models.load_instance_statuses(instance_ids)
+            return all(_has_rejoined(instance, statuses.get(instance.id))
+                       for instance in instances)
+
+        LOG.debug("Waiting for nodes %s to rejoin the cluster.",
+                  instance_ids)
+        try:
+            utils.poll_until(_all_rejoined,
+                             sleep_time=CONF.usage_sleep_time,
+                             time_out=CONF.cluster_rejoin_timeout)
+        except PollTimeOut:
+            raise TroveError(_("Nodes %s did not rejoin the cluster in "
+                               "time.") % instance_ids)
+        if unknown and delay_sec:
+            LOG.debug("Waiting (%(delay)ds) for nodes %(ids)s, which cannot "
+                      "report their health, to rejoin the cluster.",
+                      {'delay': delay_sec, 'ids': sorted(unknown)})
+            time.sleep(delay_sec)
+
+    def _roll_cluster(self, context, cluster_id, operation, roll_instance,
+                      datastore_version_id=None, delay_sec=0,
+                      resume_failed=False):
+        """Run an operation on all the nodes of a cluster, a wave of nodes
+        at a time.
+
+        The operation runs on the nodes of a wave in parallel; the next
+        wave only starts once they are all back in the cluster and healthy.
+        The nodes done are recorded after each wave, so that an operation
+        which was interrupted is resumed by the next one, from where it
+        stopped; see ClusterRoll.start.
+
+        :param roll_instance: called with a context of its own and each
+                              instance of the cluster
+        :param resume_failed: resume the operation if it last failed,
+                              rather than run it again on all the nodes
+        """
+        roll = ClusterRoll.start(cluster_id, operation,
+                                 datastore_version_id=datastore_version_id,
+                                 resume_failed=resume_failed)
+        done = set(roll.completed_ids)
+        instance_ids = [db_inst.id for db_inst in DBInstance.find_all(
+            cluster_id=cluster_id, deleted=False).all()
+            if db_inst.id not in done]
+        roll.update(total=len(done) + len(instance_ids))
+        wave_size = CONF.cluster_rolling_wave_size
+
+        def _roll_instance(instance_id):
+            # The notifications of a node go through its own context.
+            instance_context = copy.copy(context)
+            instance = BuiltInstanceTasks.load(instance_context, instance_id)
+            roll_instance(instance_context, instance)
+            return instance
+
+        try:
+            for start in range(0, len(instance_ids), wave_size):
+                wave = instance_ids[start:start + wave_size]
+                LOG.debug("Running %(operation)s on nodes %(ids)s.",
+                          {'operation': operation, 'ids': wave})
+                instances = fanout.fan_out(_roll_instance, wave)
+                self._wait_for_rejoin(instances, delay_sec=delay_sec)
+                roll.add_completed(wave)
+        except BaseException:
+            roll.update(status=ClusterRollStatus.FAILED)
+            raise
+        roll.update(status=ClusterRollStatus.COMPLETED)
+
     def rolling_restart_cluster(self, context, cluster_id, delay_sec=0):
         LOG.debug("Begin rolling cluster restart for id: %s", cluster_id)
 
-        def _restart_cluster_instance(instance):
+        def _restart_cluster_instance(instance_context, instance):
             LOG.debug("Restarting instance with id: %s", instance.id)
-            context.notification = (
-                DBaaSInstanceRestart(context, **request_info))
-            with StartNotification(context, instance_id=instance.id):
-                with EndNotification(context):
+            instance_context.notification = (
+                DBaaSInstanceRestart(instance_context, **request_info))
+            with StartNotification(instance_context, instance_id=instance.id):
+                with EndNotification(instance_context):
                     instance.update_db(task_status=InstanceTasks.REBOOTING)
                     instance.restart()
 
@@ -338,23 +434,16 @@ class ClusterTasks(Cluster):
         cluster_notification = context.notification
         request_info = cluster_notification.serialize(context)
         try:
-            node_db_inst = DBInstance.find_all(cluster_id=cluster_id,
-                                               deleted=False).all()
-            for index, db_inst in enumerate(node_db_inst):
-                if index > 0:
-                    LOG.debug(
-                        "Waiting (%ds) for restarted nodes to rejoin the "
-                        "cluster before proceeding.", delay_sec)
-                    time.sleep(delay_sec)
-                instance = BuiltInstanceTasks.load(context, db_inst.id)
-                _restart_cluster_instance(instance)
+            self._roll_cluster(context, cluster_id, 'restart',
+                               _restart_cluster_instance,
+                               delay_sec=delay_sec)
         except Timeout as t:
             if t is not timeout:
                 raise  # not my timeout
             LOG.exception("Timeout for restarting cluster.")
             raise
         except Exception:
-            LOG.exception("Error restarting cluster.", cluster_id)
+            LOG.exception("Error restarting cluster %s.", cluster_id)
             raise
         finally:
             context.notification = cluster_notification
@@ -366,14 +455,14 @@ class ClusterTasks(Cluster):
     def rolling_upgrade_cluster(self, context, cluster_id, datastore_version):
         LOG.debug("Begin rolling cluster upgrade for id: %s.", cluster_id)
 
-        def _upgrade_cluster_instance(instance):
+        def _upgrade_cluster_instance(instance_context, instance):
             LOG.debug("Upgrading instance with id: %s.", instance.id)
-            context.notification = (
-                DBaaSInstanceUpgrade(context, **request_info))
+            instance_context.notification = (
+                DBaaSInstanceUpgrade(instance_context, **request_info))
             with StartNotification(
-                    context, instance_id=instance.id,
+                    instance_context, instance_id=instance.id,
                     datastore_version_id=datastore_version.id):
-                with EndNotification(context):
+                with EndNotification(instance_context):
                     instance.update_db(
                         datastore_version_id=datastore_version.id,
                         task_status=InstanceTasks.UPGRADING)
@@ -383,11 +472,12 @@ class ClusterTasks(Cluster):
         cluster_notification = context.notification
         request_info = cluster_notification.serialize(context)
         try:
-            for db_inst in DBInstance.find_all(cluster_id=cluster_id,
-                                               deleted=False).all():
-                instance = BuiltInstanceTasks.load(
-                    context, db_inst.id)
-                _upgrade_cluster_instance(instance)
+            # The nodes a failed upgrade is done on already run the new
+            # version, the upgrade is not run on them again.
+            self._roll_cluster(context, cluster_id, 'upgrade',
+                               _upgrade_cluster_instance,
+                               datastore_version_id=datastore_version.id,
+                               resume_failed=True)
 
             self.reset_task()
         except Timeout as t:
@@ -1434,7 +1524,7 @@ class BackupTasks(object):
         return container, prefix
 
     @classmethod
-    def delete_files_from_swift(cls, context, filename):
+    def delete_files_from_swift(cls, context, filename, backup=None):
         container = CONF.backup_swift_container
         client = remote.create_swift_client(context)
         obj = client.head_object(container, filename)
@@ -1444,6 +1534,10 @@ class BackupTasks(object):
                       {'cont': container, 'filename': filename})
             client.delete_object(container, filename,
                                  query_string='multipart-manifest=delete')
+        elif backup is not None and is_chunk_manifest(obj):
+            # Deduplicated backup, its chunks may be shared
+            bkup_models.BackupChunks.delete(client, backup, container,
+                                            filename)
         else:
             # Single object
             LOG.debug("Deleting object file: %(cont)s/%(filename)s",
@@ -1458,7 +1552,8 @@ class BackupTasks(object):
         try:
             filename = backup.filename
             if filename:
-                BackupTasks.delete_files_from_swift(context, filename)
+                BackupTasks.delete_files_from_swift(context, filename,
+                                                    backup=backup)
         except ValueError:
             backup.delete()
         except ClientException as e:
@@ -1477,12 +1572,51 @@ class BackupTasks(object):
         LOG.info("Deleted backup %s successfully.", backup_id)
 
 
+class ModuleReapplyRate(object):
+    """Lets a batch of reapplies start per datastore every so often.
+
+    At most batch_size reapplies to the instances of a datastore are
+    started in each window of batch_delay seconds; the datastores are
+    throttled independently of each other.
+    """
+
+    def __init__(self, batch_size, batch_delay):
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._windows = {}
+
+    def wait(self, datastore_id):
+        while True:
+            now = time.time()
+            start, count = self._windows.get(datastore_id, (now, 0))
+            if now - start >= self.batch_delay:
+                start, count = now, 0
+            if not self.batch_size or count < self.batch_size:
+                self._windows[datastore_id] = (start, count + 1)
+                return
+            LOG.debug("Reapplied module to %(cnt)d instances of datastore "
+                      "%(ds)s - sleeping for %(batch)ds",
+                      {'cnt': count, 'ds': datastore_id,
+                       'batch': self.batch_delay})
+            time.sleep(start + self.batch_delay - now)
+
+
 class ModuleTasks(object):
 
+    # Minimum interval (in seconds) between saves of the reapply progress.
+    REAPPLY_PROGRESS_INTERVAL = 1
+
     @classmethod
     def reapply_module(cls, context, module_id, md5, include_clustered,
                        batch_size, batch_delay, force):
-        """Reapply module."""
+        """Reapply module.
+
+        The module is reapplied to up to module_reapply_concurrency
+        instances at a time, in batches of batch_size instances per
+        datastore every batch_delay seconds.  Progress is saved as the run
+        goes; a run that did not finish is resumed by the next reapply of
+        the same module contents, skipping the instances it already did.
+        """
         LOG.info("Reapplying module %s.", module_id)
 
         batch_size = batch_size or CONF.module_reapply_max_batch_size
@@ -1495,56 +1629,68 @@ class ModuleTasks(object):
         current_md5 = modules[0].md5
         LOG.debug("MD5: %(md5)s  Force: %(f)s.", {'md5': md5, 'f': force})
 
-        # Process all the instances
-        instance_modules = module_models.InstanceModules.load_all(
-            context, module_id=module_id, md5=md5)
-        total_count = instance_modules.count()
-        reapply_count = 0
-        skipped_count = 0
-        if instance_modules:
-            module_list = module_views.convert_modules_to_list(modules)
-            for instance_module in instance_modules:
-                instance_id = instance_module.instance_id
-                if (instance_module.md5 != current_md5 or force) and (
-                        not md5 or md5 == instance_module.md5):
-                    instance = BuiltInstanceTasks.load(context, instance_id,
-                                                       needs_server=False)
-                    if instance and (
-                            include_clustered or not instance.cluster_id):
-                        try:
-                            module_models.Modules.validate(
-                                modules, instance.datastore.id,
-                                instance.datastore_version.id)
-                            client = create_guest_client(context, instance_id)
-                            client.module_apply(module_list)
-                            Instance.add_instance_modules(
-                                context, instance_id, modules)
-                            reapply_count += 1
-                        except exception.ModuleInvalid as ex:
-                            LOG.info("Skipping: %s", ex)
-                            skipped_count += 1
-
-                        # Sleep if we've fired off too many in a row.
-                        if (batch_size and
-                                not reapply_count % batch_size and
-                                (reapply_count + skipped_count) < total_count):
-                            LOG.debug("Applied module to %(cnt)d of %(total)d "
-                                      "instances - sleeping for %(batch)ds",
-                                      {'cnt': reapply_count,
-                                       'total': total_count,
-                                       'batch': batch_delay})
-                            time.sleep(batch_delay)
-                    else:
-                        LOG.debug("Instance '%s' not found or doesn't match "
-                                  "criteria, skipping reapply.", instance_id)
-                        skipped_count += 1
-                else:
-                    LOG.debug("Instance '%s' does not match "
+        run = module_models.ModuleReapply.start(
+            context, module_id, current_md5, include_clustered, force)
+        instance_modules = [
+            instance_module for instance_module in
+            module_models.InstanceModules.load_all(
+                context, module_id=module_id, md5=md5)
+            if not module_models.ModuleReapply.is_done(run, instance_module)]
+        run.total = run.applied + len(instance_modules)
+        run.save()
+        module_list = module_views.convert_modules_to_list(modules)
+        rate = ModuleReapplyRate(batch_size, batch_delay)
+
+        def _reapply(instance_module):
+            instance_id = instance_module.instance_id
+            if not ((instance_module.md5 != current_md5 or force) and (
+                    not md5 or md5 == instance_module.md5)):
+                LOG.debug("Instance '%s' does not match "
+                          "criteria, skipping reapply.", instance_id)
+                return 'skipped'
+            try:
+                instance = BuiltInstanceTasks.load(context, instance_id,
+                                                   needs_server=False)
+                if not instance or (
+                        instance.cluster_id and not include_clustered):
+                    LOG.debug("Instance '%s' not found or doesn't match "
                               "criteria, skipping reapply.", instance_id)
-                    skipped_count += 1
+                    return 'skipped'
+                module_models.Modules.validate(
+                    modules, instance.datastore.id,
+                    instance.datastore_version.id)
+                rate.wait(instance.datastore.id)
+                client = create_guest_client(context, instance_id)
+                client.module_apply(module_list)
+                Instance.add_instance_modules(context, instance_id, modules)
+                return 'applied'
+            except exception.ModuleInvalid as ex:
+                LOG.info("Skipping: %s", ex)
+                return 'skipped'
+            except Exception:
+                LOG.exception("Failed to reapply module %(module)s to "
+                              "instance %(instance)s.",
+                              {'module': module_id, 'instance': instance_id})
+                return 'failed'
+
+        pool = greenpool.GreenPool(CONF.module_reapply_concurrency)
+        saved = time.time()
+        try:
+            for result in pool.imap(_reapply, instance_modules):
+                run[result] += 1
+                if time.time() - saved >= cls.REAPPLY_PROGRESS_INTERVAL:
+                    run.save()
+                    saved = time.time()
+        except Exception:
+            run.status = module_models.ModuleReapplyStatus.FAILED
+            run.save()
+            raise
+        run.status = module_models.ModuleReapplyStatus.COMPLETED
+        run.save()
         LOG.info("Reapplied module to %(num)d instances "
-                 "(skipped %(skip)d).",
-                 {'num': reapply_count, 'skip': skipped_count})
+                 "(skipped %(skip)d, failed %(fail)d).",
+                 {'num': run.applied, 'skip': run.skipped,
+                  'fail': run.failed})
 
 
 class ResizeVolumeAction(object):
@@ -18,6 +18,10 @@ Tests dealing with HTTP rate-limiting.
 """
 
 
+import os
+import shutil
+import tempfile
+
 from mock import Mock, MagicMock, patch
 from oslo_serialization import jsonutils
 import six
@@ -213,6 +217,15 @@ class LimitMiddlewareTest(BaseLimitTestSuite):
         response = request.get_response(self.app)
         self.assertEqual(200, response.status_int)
 
+    def test_limits_deferred(self):
+        # The limits are only computed for the limits API.
+        request = webob.Request.blank("/")
+        with patch.object(self.app._limiter, 'get_limits',
+                          return_value=['limit']) as get_limits:
+            request.get_response(self.app)
+            self.assertFalse(get_limits.called)
+            self.assertEqual(['limit'], request.environ["trove.limits"]())
+
     def test_limited_request_json(self):
         # Test a rate-limited (413) GET request through middleware.
         request = webob.Request.blank("/")
@@ -485,6 +498,110 @@ class LimiterTest(BaseLimitTestSuite):
         self.assertEqual(expected, results)
 
 
+class BucketLimiterTest(BaseLimitTestSuite):
+    """
+    Tests for the `limits.BucketLimiter` class.
+    """
+
+    def setUp(self):
+        super(BucketLimiterTest, self).setUp()
+        userlimits = {'user:user3': '',
+                      'user:user4': '(PUT, /a*, ^/a(b)?\\1, 2, MINUTE)'}
+        self.limiter = self._limiter(**userlimits)
+
+    def _limiter(self, **kwargs):
+        limiter = limits.BucketLimiter(TEST_LIMITS, **kwargs)
+        limiter._get_time = Mock(return_value=0.0)
+        return limiter
+
+    def _check(self, num, verb, url, username=None, limiter=None):
+        limiter = limiter or self.limiter
+        return [limiter.check_for_delay(verb, url, username)[0]
+                for x in range(num)]
+
+    def test_no_delay(self):
+        self.assertEqual((None, None),
+                         self.limiter.check_for_delay("GET", "/anything"))
+        self.assertEqual((None, None),
+                         self.limiter.check_for_delay("PUT", "/anything"))
+
+    def test_delay_PUT_wait(self):
+        self.assertEqual([None] * 10 + [6.0] * 10,
+                         self._check(20, "PUT", "/anything"))
+
+        self.limiter._get_time.return_value = 1.0
+        self.assertEqual([5.0] * 10, self._check(10, "PUT", "/anything"))
+
+        self.limiter._get_time.return_value = 7.0
+        self.assertEqual([None, 5.0], self._check(2, "PUT", "/anything"))
+
+    def test_delay_POST_mgmt(self):
+        self.assertEqual([None] * 3, self._check(3, "POST", "/mgmt"))
+
+        delay, error = self.limiter.check_for_delay("POST", "/mgmt")
+        self.assertAlmostEqual(60.0 / 3.0, delay, 4)
+        self.assertEqual(
+            "Only 3 POST request(s) can be made to /mgmt every minute.", error)
+        # The mgmt limit does not apply to other POSTs.
+        self.assertEqual([None] * 3, self._check(3, "POST", "/other"))
+
+    def test_multiple_users(self):
+        self.assertEqual([None] * 10 + [6.0] * 5,
+                         self._check(15, "PUT", "/anything", "user1"))
+        self.assertEqual([None] * 10 + [6.0],
+                         self._check(11, "PUT", "/anything", "user2"))
+        self.assertEqual([None] * 20,
+                         self._check(20, "PUT", "/anything", "user3"))
+
+    def test_user_limit_with_groups(self):
+        self.assertEqual([None, None, 30.0],
+                         self._check(3, "PUT", "/abb", "user4"))
+        self.assertEqual([None], self._check(1, "PUT", "/b", "user4"))
+
+    def test_get_limits(self):
+        self._check(4, "PUT", "/anything", "user1")
+
+        put = [limit for limit in self.limiter.get_limits("user1")
+               if limit['verb'] == 'PUT'][0]
+        self.assertEqual({'verb': 'PUT', 'URI': '*', 'regex': '',
+                          'value': 10, 'remaining': 6, 'unit': 'MINUTE',
+                          'resetTime': 0}, put)
+        self.assertEqual([], self.limiter.get_limits("user3"))
+
+    def test_idle_users_evicted(self):
+        self._check(1, "PUT", "/anything", "user1")
+        self._check(1, "PUT", "/anything", "user2")
+        self.assertEqual(2, len(self.limiter.store))
+
+        self.limiter._get_time.return_value = 30.0
+        self._check(1, "PUT", "/anything", "user2")
+        self.assertEqual(2, len(self.limiter.store))
+
+        self.limiter._get_time.return_value = 61.0
+        self._check(1, "PUT", "/anything", "user2")
+        self.assertEqual(1, len(self.limiter.store))
+
+    def test_sqlite_store_shared(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'limits.sqlite')
+        first = self._limiter(store='trove.common.limits.SQLiteBucketStore',
+                              store_path=path)
+        second = self._limiter(store='trove.common.limits.SQLiteBucketStore',
+                               store_path=path)
+
+        self.assertEqual([None] * 5, self._check(5, "PUT", "/x", "user1",
+                                                 limiter=first))
+        self.assertEqual([None] * 5 + [6.0],
+                         self._check(6, "PUT", "/x", "user1", limiter=second))
+        self.assertEqual([None], self._check(1, "PUT", "/x", "user2",
+                                             limiter=first))
+
+        first._get_time.return_value = 6.0
+        self.assertEqual([None, 6.0], self._check(2, "PUT", "/x", "user1",
+                                                  limiter=first))
+
+
 class WsgiLimiterTest(BaseLimitTestSuite):
     """
     Tests for `limits.WsgiLimiter` class.
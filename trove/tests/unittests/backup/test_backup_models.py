@@ -13,6 +13,8 @@
 
 
 import datetime
+import json
+
 from mock import DEFAULT
 from mock import MagicMock
 from mock import patch
@@ -23,11 +25,13 @@ from trove.backup import state
 from trove.common import context
 from trove.common import exception
 from trove.common import remote
+from trove.common.strategies.storage import swift
 from trove.common import timeutils
 from trove.common import utils
 from trove.db.models import DatabaseModelBase
 from trove.instance import models as instance_models
 from trove.taskmanager import api
+from trove.tests.unittests.backup.test_storage import MemorySwiftConnection
 from trove.tests.unittests import trove_testtools
 from trove.tests.unittests.util import util
 
@@ -468,39 +472,49 @@ class PaginationTests(trove_testtools.TestCase):
         query = models.DBBackup.query()
         query.filter_by(instance_id=self.instance_id).delete()
 
+    def _list_pages(self, list_func):
+        pages = []
+        self.context.marker = None
+        while True:
+            backups, marker = list_func()
+            pages.append([backup.name for backup in backups])
+            if marker is None:
+                return pages
+            self.assertIsInstance(marker, str)
+            self.context.marker = marker
+
     def test_pagination_list(self):
-        # page one
-        backups, marker = models.Backup.list(self.context)
-        self.assertEqual(20, marker)
-        self.assertEqual(20, len(backups))
-        # page two
-        self.context.marker = 20
-        backups, marker = models.Backup.list(self.context)
-        self.assertEqual(40, marker)
-        self.assertEqual(20, len(backups))
-        # page three
-        self.context.marker = 40
-        backups, marker = models.Backup.list(self.context)
-        self.assertIsNone(marker)
-        self.assertEqual(10, len(backups))
+        pages = self._list_pages(lambda: models.Backup.list(self.context))
+        self.assertEqual([20, 20, 10], [len(page) for page in pages])
+        self.assertEqual(set('Backup-%s' % backup for backup in range(50)),
+                         set(sum(pages, [])))
 
     def test_pagination_list_for_instance(self):
-        # page one
-        backups, marker = models.Backup.list_for_instance(self.context,
-                                                          self.instance_id)
-        self.assertEqual(20, marker)
-        self.assertEqual(20, len(backups))
-        # page two
-        self.context.marker = 20
-        backups, marker = models.Backup.list(self.context)
-        self.assertEqual(40, marker)
-        self.assertEqual(20, len(backups))
-        # page three
-        self.context.marker = 40
-        backups, marker = models.Backup.list_for_instance(self.context,
-                                                          self.instance_id)
-        self.assertIsNone(marker)
-        self.assertEqual(10, len(backups))
+        pages = self._list_pages(lambda: models.Backup.list_for_instance(
+            self.context, self.instance_id))
+        self.assertEqual([20, 20, 10], [len(page) for page in pages])
+        self.assertEqual(50, len(set(sum(pages, []))))
+
+    def test_pagination_same_date(self):
+        updated = timeutils.utcnow()
+        for backup in models.DBBackup.find_all(
+                instance_id=self.instance_id):
+            backup.updated = updated
+            models.DBBackup().db_api.save(backup)
+
+        pages = self._list_pages(lambda: models.Backup.list(self.context))
+        self.assertEqual([20, 20, 10], [len(page) for page in pages])
+        self.assertEqual(50, len(set(sum(pages, []))))
+
+    def test_pagination_full_last_page(self):
+        self.context.limit = 25
+        pages = self._list_pages(lambda: models.Backup.list(self.context))
+        self.assertEqual([25, 25], [len(page) for page in pages])
+
+    def test_pagination_invalid_marker(self):
+        self.context.marker = '20'
+        self.assertRaises(exception.BadRequest,
+                          models.Backup.list, self.context)
 
 
 class OrderingTests(trove_testtools.TestCase):
@@ -555,3 +569,139 @@ class OrderingTests(trove_testtools.TestCase):
         actual = [b.name for b in backups]
         expected = [u'one', u'two', u'three', u'four']
         self.assertEqual(expected, actual)
+
+
+class BackupChunksTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(BackupChunksTest, self).setUp()
+        util.init_db()
+        self.context, self.instance_id = _prep_conf(timeutils.utcnow())
+        self.client = MemorySwiftConnection()
+        self.container = 'database_backups'
+        self.one = self._create_backup('one', ['a', 'b'])
+        self.two = self._create_backup('two', ['b', 'c', 'c'])
+
+    def tearDown(self):
+        super(BackupChunksTest, self).tearDown()
+        models.DBBackup.query().filter_by(
+            tenant_id=self.context.tenant).delete()
+        models.DBBackupChunk.query().filter_by(
+            tenant_id=self.context.tenant).delete()
+
+    def _store(self, filename, chunks):
+        for chunk in chunks:
+            self.client.put_object(self.container, 'chunks/' + chunk, chunk)
+        manifest = [{'name': '/%s/chunks/%s' % (self.container, chunk),
+                     'hash': 'md5', 'bytes': 1} for chunk in chunks]
+        self.client.put_object(self.container, filename,
+                               json.dumps(manifest),
+                               content_type=swift.CHUNK_MANIFEST_TYPE)
+
+    def _create_backup(self, name, chunks, backup_state=None):
+        filename = '%s.xbstream.gz' % name
+        self._store(filename, chunks)
+        return models.DBBackup.create(
+            tenant_id=self.context.tenant, name=name,
+            state=backup_state or BACKUP_STATE_COMPLETED,
+            instance_id=self.instance_id, deleted=False, size=1.0,
+            location='http://mockswift/v1/%s/%s' % (self.container,
+                                                    filename))
+
+    def _delete(self, backup):
+        backup = models.DBBackup.find_by(id=backup.id)
+        models.BackupChunks.delete(self.client, backup, self.container,
+                                   backup.filename)
+        backup.delete()
+
+    def _chunks(self):
+        return sorted(name[len('chunks/'):] for container, name
+                      in self.client.objects if name.startswith('chunks/'))
+
+    def _refcounts(self):
+        return dict((chunk.name[len('chunks/'):], chunk.refcount)
+                    for chunk in models.DBBackupChunk.find_all(
+                        tenant_id=self.context.tenant).all())
+
+    def test_delete_keeps_shared_chunks(self):
+        self._delete(self.one)
+
+        self.assertEqual(['b', 'c'], self._chunks())
+        self.assertEqual({'b': 1, 'c': 1}, self._refcounts())
+        self.assertNotIn((self.container, 'one.xbstream.gz'),
+                         self.client.objects)
+
+        self._delete(self.two)
+
+        self.assertEqual([], self._chunks())
+        self.assertEqual({}, self._refcounts())
+
+    def test_manifests_are_counted_once(self):
+        three = self._create_backup('three', ['c', 'd'])
+
+        self._delete(self.one)
+        self._delete(self.two)
+
+        # Counted when 'one' was deleted, and read again to be deleted.
+        self.assertEqual(2, self.client.gets.count('two.xbstream.gz'))
+        self.assertEqual(1, self.client.gets.count('three.xbstream.gz'))
+        self.assertEqual(['c', 'd'], self._chunks())
+        self.assertEqual({'c': 1, 'd': 1}, self._refcounts())
+        self.assertTrue(models.DBBackup.find_by(id=three.id).chunks_counted)
+
+    @patch('trove.backup.models.LOG')
+    def test_collection_waits_for_running_backups(self, mock_logging):
+        running = self._create_backup('running', ['a'],
+                                      backup_state=state.BackupState.BUILDING)
+
+        self._delete(self.one)
+
+        # 'a' might be reused by the running backup.
+        self.assertEqual(['a', 'b', 'c'], self._chunks())
+        self.assertEqual({'a': 0, 'b': 1, 'c': 1}, self._refcounts())
+
+        running.state = BACKUP_STATE_COMPLETED
+        running.save()
+        self._delete(self.two)
+
+        self.assertEqual(['a'], self._chunks())
+        self.assertEqual({'a': 1}, self._refcounts())
+
+    @patch('trove.backup.models.LOG')
+    def test_collection_stops_for_backups_started_meanwhile(
+            self, mock_logging):
+        count = models.BackupChunks._count
+        started = []
+
+        def count_then_start_backup(*args, **kwargs):
+            count(*args, **kwargs)
+            # Started, and even completed, once the chunks were counted; it
+            # reused 'a' rather than upload it again.
+            started.append(self._create_backup('late', ['a']))
+
+        with patch.object(models.BackupChunks, '_count',
+                          side_effect=count_then_start_backup):
+            self._delete(self.one)
+
+        self.assertEqual(1, len(started))
+        self.assertEqual(['a', 'b', 'c'], self._chunks())
+        self.assertEqual({'a': 0, 'b': 1, 'c': 1}, self._refcounts())
+
+        self._delete(self.two)
+
+        self.assertEqual(['a'], self._chunks())
+        self.assertEqual({'a': 1}, self._refcounts())
+
+    def test_other_backups_are_not_counted(self):
+        self.client.put_object(self.container, 'plain.xbstream.gz', b'data')
+        plain = models.DBBackup.create(
+            tenant_id=self.context.tenant, name='plain',
+            state=BACKUP_STATE_COMPLETED, instance_id=self.instance_id,
+            deleted=False, size=1.0,
+            location='http://mockswift/v1/%s/plain.xbstream.gz' %
+            self.container)
+
+        self._delete(self.one)
+
+        self.assertNotIn('plain.xbstream.gz', self.client.gets)
+        self.assertTrue(models.DBBackup.find_by(id=plain.id).chunks_counted)
@@ -12,11 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import binascii
 import hashlib
+import json
+import random
+import time
 
+import eventlet
 from mock import Mock, MagicMock, patch
+import six
+from swiftclient.client import ClientException
 
 from trove.common.strategies.storage import swift
+from trove.common.strategies.storage.swift import DedupSwiftStorage
 from trove.common.strategies.storage.swift import StreamReader
 from trove.common.strategies.storage.swift \
     import SwiftDownloadIntegrityError
@@ -166,6 +174,116 @@ class SwiftStorageSaveChecksumTests(trove_testtools.TestCase):
                          "Incorrect swift location was returned.")
 
 
+class MockStream(object):
+
+    def __init__(self, data):
+        self.data = six.BytesIO(data)
+
+    def read(self, chunk_size):
+        return self.data.read(chunk_size)
+
+    def metadata(self):
+        return {}
+
+
+class SlowFakeSwiftConnection(FakeSwiftConnection):
+    """Fake swift with a fixed latency per PUT, tracking PUTs in flight."""
+
+    def __init__(self, *args, **kwargs):
+        super(SlowFakeSwiftConnection, self).__init__(*args, **kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def put_object(self, container, name, contents, **kwargs):
+        if kwargs.get('query_string') or kwargs.get('headers'):
+            return super(SlowFakeSwiftConnection, self).put_object(
+                container, name, contents, **kwargs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            eventlet.sleep(0.02)
+            return super(SlowFakeSwiftConnection, self).put_object(
+                container, name, contents, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+class SwiftStorageConcurrentSaveTests(trove_testtools.TestCase):
+    """SwiftStorage.save with several segments uploaded at the same time."""
+
+    def setUp(self):
+        super(SwiftStorageConcurrentSaveTests, self).setUp()
+        self.context = trove_testtools.TroveTestContext(self)
+        self.max_file_size = swift.MAX_FILE_SIZE
+        swift.MAX_FILE_SIZE = 256
+        self.addCleanup(setattr, swift, 'MAX_FILE_SIZE', self.max_file_size)
+        self.data = b''.join(six.int2byte(i % 256)
+                             for i in range(16 * 256 + 100))
+
+    def _save(self, swift_client, concurrency, filename='123.gz.enc'):
+        self.patch_conf_property('backup_upload_concurrency', concurrency)
+        self.patch_conf_property('backup_upload_buffer_size', 4096)
+        # Every pooled connection is the same fake, so that the manifest
+        # checksum sees all of the segments.
+        with patch.object(swift, 'create_swift_client',
+                          return_value=swift_client) as mock_create:
+            storage_strategy = SwiftStorage(self.context)
+            result = storage_strategy.save(filename, MockStream(self.data))
+        return result, mock_create.call_count
+
+    def test_concurrent_save_matches_sequential_save(self):
+        sequential_client = FakeSwiftConnection()
+        (success, _, checksum, _), _ = self._save(sequential_client, 1)
+        self.assertTrue(success)
+
+        concurrent_client = FakeSwiftConnection()
+        (success, note, concurrent_checksum, location), connections = (
+            self._save(concurrent_client, 4))
+
+        self.assertTrue(success, "The backup should have been successful.")
+        self.assertEqual(checksum, concurrent_checksum)
+        self.assertEqual(sequential_client.container_objects,
+                         concurrent_client.container_objects)
+        self.assertEqual(17, len(concurrent_client.container_objects))
+        self.assertEqual(4, connections)
+        self.assertEqual('http://mockswift/v1/database_backups/123.gz.enc',
+                         location)
+
+    @patch('trove.common.strategies.storage.swift.LOG')
+    def test_concurrent_save_segment_etag_mismatch(self, mock_logging):
+        (success, note, checksum, location), _ = self._save(
+            FakeSwiftConnection(), 4, filename='bad_segment_etag_123.gz.enc')
+
+        self.assertFalse(success, "The backup should have failed!")
+        self.assertTrue(note.startswith("Error saving data to Swift!"))
+        self.assertIsNone(checksum)
+
+    @patch('trove.common.strategies.storage.swift.LOG')
+    def test_concurrent_save_put_error(self, mock_logging):
+        swift_client = FakeSwiftConnection()
+        with patch.object(swift_client, 'put_object',
+                          side_effect=IOError('connection reset')):
+            self.assertRaises(IOError, self._save, swift_client, 4)
+
+    def test_concurrent_save_throughput(self):
+        """Upload 17 segments to a fake swift with a fixed PUT latency."""
+        sequential_client = SlowFakeSwiftConnection()
+        start = time.time()
+        (success, _, _, _), _ = self._save(sequential_client, 1)
+        sequential_time = time.time() - start
+        self.assertTrue(success)
+
+        concurrent_client = SlowFakeSwiftConnection()
+        start = time.time()
+        (success, _, _, _), _ = self._save(concurrent_client, 4)
+        concurrent_time = time.time() - start
+        self.assertTrue(success)
+
+        self.assertEqual(1, sequential_client.max_in_flight)
+        self.assertEqual(4, concurrent_client.max_in_flight)
+        self.assertLess(concurrent_time * 2, sequential_time)
+
+
 class SwiftStorageUtils(trove_testtools.TestCase):
 
     def setUp(self):
@@ -251,6 +369,266 @@ class SwiftStorageLoad(trove_testtools.TestCase):
                           backup_checksum)
 
 
+class RangedFakeSwiftConnection(object):
+    """Fake swift serving ranged GETs of segments and SLO manifests."""
+
+    url = 'http://mockswift/v1'
+
+    def __init__(self, segments, large_object=True):
+        self.segments = segments
+        self.large_object = large_object
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _md5(self, data):
+        return hashlib.md5(data).hexdigest()
+
+    def head_object(self, container, name):
+        if not self.large_object:
+            data = self.segments[name]
+            return {'etag': '"%s"' % self._md5(data),
+                    'content-length': str(len(data))}
+        checksum = hashlib.md5()
+        for segment in sorted(self.segments):
+            checksum.update(self._md5(self.segments[segment]).encode())
+        return {'etag': '"%s"' % checksum.hexdigest(),
+                'x-static-large-object': 'True',
+                'content-length': str(sum(len(data) for data in
+                                          self.segments.values()))}
+
+    def get_object(self, container, name, query_string=None, headers=None,
+                   **kwargs):
+        if query_string == 'multipart-manifest=get':
+            manifest = [{'name': '/%s/%s' % (container, segment),
+                         'hash': self._md5(self.segments[segment]),
+                         'bytes': len(self.segments[segment])}
+                        for segment in sorted(self.segments)]
+            return {}, json.dumps(manifest).encode('utf-8')
+        start, end = headers['Range'][len('bytes='):].split('-')
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            eventlet.sleep(0.001)
+            return {}, self.segments[name][int(start):int(end) + 1]
+        finally:
+            self.in_flight -= 1
+
+
+class SwiftStorageConcurrentLoadTests(trove_testtools.TestCase):
+    """SwiftStorage.load with ranges downloaded at the same time."""
+
+    def setUp(self):
+        super(SwiftStorageConcurrentLoadTests, self).setUp()
+        self.context = trove_testtools.TroveTestContext(self)
+        self.patch_conf_property('restore_download_concurrency', 3)
+        self.patch_conf_property('restore_download_range_size', 100)
+        self.segments = {
+            '123_00000000': b'a' * 250,
+            '123_00000001': b'b' * 250,
+            '123_00000002': b'c' * 30,
+        }
+        self.location = 'http://mockswift/v1/database_backups/123.gz.enc'
+
+    def _load(self, swift_client, checksum=None):
+        if checksum is None:
+            checksum = swift_client.head_object(
+                'database_backups', '123.gz.enc')['etag'].strip('"')
+        with patch.object(swift, 'create_swift_client',
+                          return_value=swift_client):
+            storage_strategy = SwiftStorage(self.context)
+            return storage_strategy.load(self.location, checksum)
+
+    def test_load_large_object(self):
+        swift_client = RangedFakeSwiftConnection(self.segments)
+
+        data = b''.join(self._load(swift_client))
+
+        self.assertEqual(b'a' * 250 + b'b' * 250 + b'c' * 30, data)
+        self.assertEqual(3, swift_client.max_in_flight)
+
+    def test_load_single_object(self):
+        swift_client = RangedFakeSwiftConnection(
+            {'123.gz.enc': b'x' * 1000}, large_object=False)
+
+        data = b''.join(self._load(swift_client))
+
+        self.assertEqual(b'x' * 1000, data)
+
+    @patch('trove.common.strategies.storage.swift.LOG')
+    def test_load_corrupt_segment(self, mock_logging):
+        swift_client = RangedFakeSwiftConnection(self.segments)
+        stream = self._load(swift_client)
+        # The manifest was written for the original data.
+        self.segments['123_00000001'] = b'B' * 250
+
+        self.assertRaises(SwiftDownloadIntegrityError, b''.join, stream)
+
+    @patch('trove.common.strategies.storage.swift.LOG')
+    def test_load_checksum_mismatch(self, mock_logging):
+        swift_client = RangedFakeSwiftConnection(self.segments)
+
+        self.assertRaises(SwiftDownloadIntegrityError, self._load,
+                          swift_client, 'not-the-backup-checksum')
+
+
+def random_bytes(size, seed=0):
+    value = random.Random(seed).getrandbits(size * 8)
+    return binascii.unhexlify('%0*x' % (size * 2, value))
+
+
+class MemorySwiftConnection(object):
+    """Fake swift keeping whole objects in memory."""
+
+    url = 'http://mockswift/v1'
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = []
+        self.gets = []
+
+    def _find(self, container, name):
+        if (container, name) not in self.objects:
+            raise ClientException('Object not found', http_status=404)
+        return self.objects[(container, name)]
+
+    def put_container(self, container):
+        pass
+
+    def get_container(self, container, prefix='', full_listing=False):
+        return {}, [{'name': name} for cont, name in sorted(self.objects)
+                    if cont == container and name.startswith(prefix)]
+
+    def put_object(self, container, name, contents, content_type=None,
+                   headers=None, **kwargs):
+        if not isinstance(contents, bytes):
+            contents = contents.encode('utf-8')
+        etag = hashlib.md5(contents).hexdigest()
+        obj_headers = {'etag': '"%s"' % etag,
+                       'content-length': str(len(contents))}
+        if content_type:
+            obj_headers['content-type'] = content_type
+        self.objects[(container, name)] = (contents, obj_headers)
+        self.puts.append(name)
+        return etag
+
+    def head_object(self, container, name):
+        return dict(self._find(container, name)[1])
+
+    def get_object(self, container, name, headers=None, **kwargs):
+        data, obj_headers = self._find(container, name)
+        self.gets.append(name)
+        if headers and 'Range' in headers:
+            start, end = headers['Range'][len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1]
+        return dict(obj_headers), data
+
+    def delete_object(self, container, name, **kwargs):
+        self._find(container, name)
+        del self.objects[(container, name)]
+
+
+class ContentDefinedChunkerTests(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ContentDefinedChunkerTests, self).setUp()
+        self.data = random_bytes(1024 * 1024)
+
+    def _chunks(self, data):
+        return list(swift.ContentDefinedChunker(
+            MockStream(data), avg_size=16 * 1024, read_size=4096))
+
+    def test_chunks_cover_stream(self):
+        chunks = self._chunks(self.data)
+
+        self.assertEqual(self.data, b''.join(chunks))
+        for chunk in chunks[:-1]:
+            self.assertGreaterEqual(len(chunk), 4 * 1024)
+            self.assertLessEqual(len(chunk), 64 * 1024)
+        self.assertGreater(len(chunks), 16)
+        self.assertLess(len(chunks), 256)
+
+    def test_insertion_only_changes_nearby_chunks(self):
+        chunks = self._chunks(self.data)
+        changed = self._chunks(self.data[:500000] + b'inserted' +
+                               self.data[500000:])
+
+        self.assertLessEqual(len(set(changed) - set(chunks)), 2)
+
+    def test_constant_data_is_cut_at_max_size(self):
+        chunks = self._chunks(b'\0' * 150000)
+
+        self.assertEqual([65536, 65536, 18928], [len(c) for c in chunks])
+
+    def test_empty_stream(self):
+        self.assertEqual([], self._chunks(b''))
+
+
+class DedupSwiftStorageTests(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(DedupSwiftStorageTests, self).setUp()
+        self.context = trove_testtools.TroveTestContext(self)
+        self.patch_conf_property('backup_dedup_chunk_size', 64 * 1024)
+        self.swift_client = MemorySwiftConnection()
+        self.data = random_bytes(1536 * 1024)
+
+    def _storage(self):
+        with patch.object(swift, 'create_swift_client',
+                          return_value=self.swift_client):
+            return DedupSwiftStorage(self.context)
+
+    def _save(self, filename, data):
+        return self._storage().save(filename, MockStream(data))
+
+    def test_save_and_load(self):
+        success, note, checksum, location = self._save('123.gz', self.data)
+
+        self.assertTrue(success)
+        self.assertEqual('http://mockswift/v1/database_backups/123.gz',
+                         location)
+        headers = self.swift_client.head_object('database_backups',
+                                                '123.gz')
+        self.assertTrue(swift.is_chunk_manifest(headers))
+        self.assertEqual('"%s"' % checksum, headers['etag'])
+        self.assertEqual(
+            self.data, b''.join(self._storage().load(location, checksum)))
+
+    def test_save_stores_shared_chunks_once(self):
+        self._save('123.gz', self.data)
+        first_puts = len(self.swift_client.puts)
+        changed = self.data[:700000] + b'inserted' + self.data[700000:]
+
+        success, _, checksum, location = self._save('456.gz', changed)
+
+        self.assertTrue(success)
+        # The changed chunk and the manifest.
+        self.assertLessEqual(len(self.swift_client.puts) - first_puts, 3)
+        self.assertEqual(
+            changed, b''.join(self._storage().load(location, checksum)))
+
+    @patch('trove.common.strategies.storage.swift.LOG')
+    def test_load_checksum_mismatch(self, mock_logging):
+        _, _, _, location = self._save('123.gz', self.data)
+
+        self.assertRaises(SwiftDownloadIntegrityError,
+                          self._storage().load, location, 'bad-checksum')
+
+    def test_load_backup_saved_by_swift_storage(self):
+        checksum = self.swift_client.put_object('database_backups',
+                                                '123.gz', b'not chunked')
+
+        data = self._storage().load(
+            'http://mockswift/v1/database_backups/123.gz', checksum)
+
+        self.assertEqual(b'not chunked', data)
+
+    @patch('trove.common.strategies.storage.swift.LOG')
+    def test_save_put_error(self, mock_logging):
+        with patch.object(self.swift_client, 'put_object',
+                          side_effect=IOError('connection reset')):
+            self.assertRaises(IOError, self._save, '123.gz', self.data)
+
+
 class MockBackupStream(MockBackupRunner):
 
     def read(self, chunk_size):
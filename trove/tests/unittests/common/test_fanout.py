@@ -0,0 +1,107 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from eventlet.timeout import Timeout
+from mock import Mock
+
+from trove.common import exception
+from trove.common import fanout
+from trove.tests.unittests import trove_testtools
+
+
+class TestFanOut(trove_testtools.TestCase):
+
+    def test_results_in_order_of_nodes(self):
+        def call(node):
+            # The first nodes finish last.
+            eventlet.sleep(0.01 * (5 - node))
+            return node * 2
+
+        self.assertEqual([0, 2, 4, 6, 8], fanout.fan_out(call, range(5)))
+
+    def test_concurrency_bounded(self):
+        running = []
+        most = []
+
+        def call(node):
+            running.append(node)
+            most.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(node)
+
+        fanout.fan_out(call, range(10), concurrency=3)
+        self.assertEqual(3, max(most))
+
+    def test_runs_in_parallel(self):
+        started = []
+
+        def call(node):
+            started.append(node)
+            eventlet.sleep(0.01)
+            # Every call started before any of them finished.
+            return len(started)
+
+        self.assertEqual([4] * 4,
+                         fanout.fan_out(call, range(4), concurrency=4))
+
+    def test_failures_aggregated(self):
+        nodes = [Mock(id='node%d' % i) for i in range(4)]
+
+        def call(node):
+            if node.id in ('node1', 'node3'):
+                raise exception.TroveError('%s failed' % node.id)
+            return node.id
+
+        error = self.assertRaises(exception.ClusterNodesFailed,
+                                  fanout.fan_out, call, nodes)
+        self.assertEqual(['node1', 'node3'], sorted(error.failures))
+        self.assertEqual(['node0', None, 'node2', None], error.results)
+        self.assertIn('node1 failed', str(error))
+
+    def test_node_timeout(self):
+        def call(node):
+            eventlet.sleep(node)
+            return node
+
+        error = self.assertRaises(exception.ClusterNodesFailed,
+                                  fanout.fan_out, call, [0, 10], timeout=0.05,
+                                  name=str)
+        self.assertEqual(['10'], list(error.failures))
+        self.assertEqual([0, None], error.results)
+
+    def test_default_timeout_from_config(self):
+        self.patch_conf_property('cluster_node_timeout', 0)
+        self.assertEqual([0.01], fanout.fan_out(
+            lambda node: eventlet.sleep(node) or node, [0.01]))
+
+    def test_outer_timeout_not_swallowed(self):
+        finished = []
+
+        def call(node):
+            eventlet.sleep(node)
+            finished.append(node)
+
+        timeout = Timeout(0.05)
+        try:
+            self.assertRaises(Timeout, fanout.fan_out, call, [0, 0.2],
+                              timeout=10)
+        finally:
+            timeout.cancel()
+        eventlet.sleep(0.3)
+        # The calls still running were abandoned.
+        self.assertEqual([0], finished)
+
+    def test_no_nodes(self):
+        self.assertEqual([], fanout.fan_out(Mock(), []))
@@ -16,8 +16,11 @@
 #    under the License.
 #
 
+import datetime
+
 from mock import Mock
 
+from trove.common import exception
 from trove.common import pagination
 from trove.tests.unittests import trove_testtools
 
@@ -84,6 +87,28 @@ class TestPaginatedDataView(trove_testtools.TestCase):
         self.assertEqual([], li_5)
         self.assertIsNone(marker_5)
 
+    def test_paginate_unsorted_list(self):
+        li = ['e', 'a', 'd', 'b', 'c']
+        self.assertEqual((['c', 'd'], 'd'),
+                         pagination.paginate_list(li, limit=2, marker='b'))
+        self.assertEqual((['d', 'e'], None),
+                         pagination.paginate_list(li, limit=2, marker='d',
+                                                  include_marker=True))
+
+    def test_marker_round_trip(self):
+        updated = datetime.datetime(2026, 10, 18, 12, 30, 5, 42)
+        marker = pagination.encode_marker([updated, 'id/1+2'])
+        self.assertNotIn('=', marker)
+        self.assertEqual(marker, pagination.url_quote(marker))
+        self.assertEqual([updated.isoformat(), 'id/1+2'],
+                         pagination.decode_marker(marker))
+
+    def test_decode_invalid_marker(self):
+        # The last one is valid, but not a list.
+        for marker in ['20', 'not-a-marker!', 'eyJhIjogMX0']:
+            self.assertRaises(exception.BadRequest,
+                              pagination.decode_marker, marker)
+
     def test_dict_paginate(self):
         li = [{'_collate': 'en_US.UTF-8',
                '_character_set': 'UTF8',
@@ -0,0 +1,185 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import random
+
+import jsonschema
+from mock import patch
+
+from trove.common import apischema
+from trove.common import exception
+from trove.common import schema_validator
+from trove.common import wsgi
+from trove.tests.unittests import trove_testtools
+
+SCALARS = [None, True, False, 0, 1, -1, 2, 65536, 1.5, '', 'a', '1',
+           'name', 'x' * 300, '10.0.0.1', '2001:db8::1',
+           'c3e79f6d-1f42-4d9e-8d6b-5d4b3b0a7a5e', 'ON', [], {}]
+
+
+def _schemas(schemas):
+    if any(key in jsonschema.Draft4Validator.VALIDATORS for key in schemas):
+        yield schemas
+        return
+    for schema in schemas.values():
+        if isinstance(schema, dict):
+            for subschema in _schemas(schema):
+                yield subschema
+
+
+def _instance(schema, rand, depth=0):
+    """A value which is likely, but not certain, to match the schema."""
+    if (depth > 6 or not isinstance(schema, dict) or
+            rand.random() < 0.1):
+        return rand.choice(SCALARS)
+    for keyword in ('oneOf', 'anyOf'):
+        if keyword in schema:
+            return _instance(rand.choice(schema[keyword]), rand, depth + 1)
+    if 'enum' in schema:
+        return rand.choice(list(schema['enum']) + SCALARS[:3])
+    types = schema.get('type', 'object')
+    if isinstance(types, list):
+        types = rand.choice(types)
+    if types == 'object':
+        properties = schema.get('properties', {})
+        instance = dict(
+            (name, _instance(subschema, rand, depth + 1))
+            for name, subschema in properties.items()
+            if rand.random() < 0.9)
+        if rand.random() < 0.2:
+            instance['extra'] = rand.choice(SCALARS)
+        return instance
+    if types == 'array':
+        items = schema.get('items', {})
+        instance = [_instance(items, rand, depth + 1)
+                    for index in range(rand.randint(0, 3))]
+        if instance and rand.random() < 0.2:
+            instance.append(instance[0])
+        return instance
+    return rand.choice(SCALARS)
+
+
+class TestSchemaValidator(trove_testtools.TestCase):
+
+    def test_same_outcome_as_jsonschema(self):
+        rand = random.Random(1234)
+        modules = [value for name, value in vars(apischema).items()
+                   if not name.startswith('_') and isinstance(value, dict)]
+        outcomes = set()
+        for schemas in modules:
+            for schema in _schemas(schemas):
+                validator = schema_validator.SchemaValidator(schema)
+                reference = jsonschema.Draft4Validator(schema)
+                for attempt in range(100):
+                    instance = _instance(schema, rand)
+                    expected = reference.is_valid(instance)
+                    self.assertEqual(
+                        expected, validator.is_valid(instance),
+                        "%r against %r" % (instance, schema))
+                    outcomes.add(expected)
+        # Both valid and invalid instances were compared.
+        self.assertEqual({True, False}, outcomes)
+
+    def test_keywords(self):
+        schema = {
+            "type": "object",
+            "required": ["name"],
+            "additionalProperties": False,
+            "properties": {
+                "name": {"type": "string", "minLength": 1, "maxLength": 4,
+                         "pattern": "^[a-z]+$"},
+                "size": {"type": ["integer", "null"], "minimum": 1,
+                         "maximum": 5, "exclusiveMaximum": True},
+                "tags": {"type": "array", "uniqueItems": True,
+                         "minItems": 1, "items": {"enum": ["a", "b"]}},
+                "ref": {"oneOf": [{"type": "string"},
+                                  {"type": "integer"}]},
+                "not_bool": {"not": {"type": "boolean"}},
+            }
+        }
+        validator = schema_validator.SchemaValidator(schema)
+        valid = [{"name": "abc"}, {"name": "abcd", "size": None},
+                 {"name": "a", "size": 4, "tags": ["a", "b"], "ref": 1,
+                  "not_bool": 0}]
+        invalid = [{}, {"name": ""}, {"name": "abcde"}, {"name": "AB"},
+                   {"name": "a", "size": 5}, {"name": "a", "size": True},
+                   {"name": "a", "size": 0}, {"name": "a", "tags": []},
+                   {"name": "a", "tags": ["a", "a"]},
+                   {"name": "a", "tags": ["c"]}, {"name": "a", "ref": 1.5},
+                   {"name": "a", "not_bool": False},
+                   {"name": "a", "other": 1}, []]
+        for instance in valid:
+            self.assertTrue(validator.is_valid(instance), instance)
+        for instance in invalid:
+            self.assertFalse(validator.is_valid(instance), instance)
+
+    def test_unique_items(self):
+        validator = schema_validator.SchemaValidator({"uniqueItems": True})
+
+        self.assertTrue(validator.is_valid([1, True, 0, False]))
+        self.assertFalse(validator.is_valid([1, 1.0]))
+        self.assertTrue(validator.is_valid([{"name": "a"}, {"name": "b"}]))
+        self.assertFalse(validator.is_valid([{"name": "a"}, {"name": "a"}]))
+
+    def test_ref_falls_back_to_jsonschema(self):
+        schema = {"definitions": {"name": {"type": "string"}},
+                  "properties": {"name": {"$ref": "#/definitions/name"}}}
+        validator = schema_validator.SchemaValidator(schema)
+
+        self.assertTrue(validator.is_valid({"name": "a"}))
+        self.assertFalse(validator.is_valid({"name": 1}))
+
+    def test_validator_compiled_once(self):
+        schema = {"type": "object"}
+        with patch.object(schema_validator, 'SchemaValidator',
+                          wraps=schema_validator.SchemaValidator) as compile:
+            first = schema_validator.get_validator(schema)
+            self.assertIs(first, schema_validator.get_validator(schema))
+        compile.assert_called_once_with(schema)
+
+    def test_compile_schemas_of_actions(self):
+        schemas = {"create": {"type": "object"},
+                   "action": {"resize": {"type": "object"},
+                              "restart": {"type": "object"}}}
+        with patch.object(schema_validator, 'get_validator') as get:
+            schema_validator.compile_schemas(schemas)
+
+        self.assertEqual(
+            sorted([id(schemas["create"]),
+                    id(schemas["action"]["resize"]),
+                    id(schemas["action"]["restart"])]),
+            sorted(id(call[0][0]) for call in get.call_args_list))
+
+
+class DatabaseController(wsgi.Controller):
+    schemas = apischema.dbschema
+
+
+class TestValidateRequest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestValidateRequest, self).setUp()
+        self.controller = DatabaseController()
+
+    def test_valid(self):
+        self.controller.validate_request(
+            'create', {'body': {'databases': [{'name': 'db1'}]}})
+
+    def test_errors_reported(self):
+        error = self.assertRaises(
+            exception.BadRequest, self.controller.validate_request,
+            'create', {'body': {'databases': [{'name': ''}]}})
+
+        self.assertIn("Validation error: databases[0]['name']",
+                      str(error))
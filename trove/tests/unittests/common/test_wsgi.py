@@ -13,7 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 #
+import datetime
+
 from mock import Mock, patch
+from oslo_serialization import jsonutils
 from testtools.matchers import Equals, Is, Not
 import webob.exc
 
@@ -60,3 +63,108 @@ class TestController(trove_testtools.TestCase):
         result = resource.execute_action('delete', req)
         self.assertIsInstance(result.wrapped_exc,
                               webob.exc.HTTPNotFound)
+
+
+class TestLazyListSerialization(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestLazyListSerialization, self).setUp()
+        self.viewed = []
+        self.items = list(range(50))
+
+    def _view(self, item):
+        self.viewed.append(item)
+        return {'id': item, 'name': 'item-%d' % item,
+                'created': datetime.datetime(2026, 1, 2, 3, 4, 5, 678)}
+
+    def _data(self):
+        return {'items': base_wsgi.LazyList(self.items, self._view),
+                'links': []}
+
+    def _expected(self):
+        return {'items': [self._view(item) for item in self.items],
+                'links': []}
+
+    def test_items_serialized_as_written(self):
+        serializer = base_wsgi.JSONDictSerializer()
+        serializer.chunk_size = 256
+
+        chunks = serializer.serialize(self._data())
+        # Only the first item is made before the response is started.
+        self.assertEqual([0], self.viewed)
+        first = next(chunks)
+        self.assertLess(len(self.viewed), len(self.items))
+        body = first + b''.join(chunks)
+
+        self.assertEqual(self.items, self.viewed)
+        self.viewed = []
+        expected = self._expected()
+        self.assertEqual(jsonutils.loads(serializer.serialize(expected)),
+                         jsonutils.loads(body))
+        self.assertEqual('2026-01-02T03:04:05',
+                         jsonutils.loads(body)['items'][0]['created'])
+        if base_wsgi.orjson is None:
+            self.assertEqual(serializer.serialize(expected), body)
+
+    def test_empty_list(self):
+        self.items = []
+        body = b''.join(base_wsgi.JSONDictSerializer().serialize(
+            self._data()))
+
+        self.assertEqual({'items': [], 'links': []}, jsonutils.loads(body))
+
+    def test_response_streamed(self):
+        response = wsgi.TroveResponseSerializer().serialize(
+            wsgi.Result(self._data(), 200), 'application/json')
+
+        self.assertEqual([0], self.viewed)
+        self.assertIsNone(response.content_length)
+        self.assertEqual(len(self.items),
+                         len(jsonutils.loads(response.body)['items']))
+
+    def _fail_on(self, failing):
+        view = self._view
+
+        def fail_on(item):
+            if item == failing:
+                raise exception.NotFound(uuid=item)
+            return view(item)
+        self._view = fail_on
+
+    def test_view_failing_on_first_item(self):
+        self._fail_on(0)
+
+        self.assertRaises(exception.NotFound,
+                          base_wsgi.JSONDictSerializer().serialize,
+                          self._data())
+
+    @patch.object(wsgi.Controller, 'index', create=True)
+    def test_view_failing_on_first_item_fails_request(self, mock_index):
+        self._fail_on(0)
+        mock_index.return_value = wsgi.Result(self._data(), 200)
+        resource = wsgi.Controller().create_resource()
+
+        result = resource.execute_action('index', Mock())
+
+        self.assertIsInstance(result.wrapped_exc, webob.exc.HTTPNotFound)
+
+    @patch.object(base_wsgi, 'LOG')
+    def test_view_failing_mid_stream(self, mock_logging):
+        self._fail_on(30)
+        serializer = base_wsgi.JSONDictSerializer()
+        serializer.chunk_size = 256
+
+        chunks = serializer.serialize(self._data())
+        body = next(chunks)
+
+        # Raised for the server to drop the connection, rather than end a
+        # response which would look complete.
+        self.assertRaises(exception.NotFound, b''.join, chunks)
+        self.assertTrue(body.startswith(b'{'))
+        self.assertEqual(1, mock_logging.exception.call_count)
+
+    def test_xml_response(self):
+        response = wsgi.TroveResponseSerializer().serialize(
+            wsgi.Result(self._data(), 200), 'application/xml')
+
+        self.assertEqual(len(self.items), response.body.count(b'<item>'))
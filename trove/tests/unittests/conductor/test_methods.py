@@ -12,6 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from datetime import timedelta
+
+from mock import Mock
 from mock import patch
 from oslo_utils import timeutils
 
@@ -19,8 +22,12 @@ from trove.backup import models as bkup_models
 from trove.backup import state
 from trove.common import exception as t_exception
 from trove.common.instance import ServiceStatuses
+from trove.common.rpc import service as rpc_service
 from trove.common import utils
+from trove.conductor import heartbeat
 from trove.conductor import manager as conductor_manager
+from trove.conductor.models import LastSeen
+from trove.db import get_db_api
 from trove.instance import models as t_models
 from trove.tests.unittests import trove_testtools
 from trove.tests.unittests.util import util
@@ -109,6 +116,16 @@ class ConductorMethodTests(trove_testtools.TestCase):
         iss = self._get_iss(iss_id)
         self.assertEqual(ServiceStatuses.BUILDING, iss.status)
 
+    @patch('trove.conductor.manager.LOG')
+    def test_heartbeat_volume_info_saved(self, mock_logging):
+        iss_id = self._create_iss()
+        payload = {'service_status': ServiceStatuses.RUNNING.description,
+                   'volume': {'used': 1.5, 'total': 10.0}}
+        self.cond_mgr.heartbeat(None, self.instance_id, payload)
+        iss = self._get_iss(iss_id)
+        self.assertEqual({'used': 1.5, 'total': 10.0},
+                         iss.get_volume_info(60))
+
     # --- Tests for update_backup ---
 
     def test_backup_not_found(self):
@@ -198,3 +215,144 @@ class ConductorMethodTests(trove_testtools.TestCase):
                                     sent=past, name=new_name)
         bkup = self._get_backup(bkup_id)
         self.assertEqual(old_name, bkup.name)
+
+
+class HeartbeatBufferTests(trove_testtools.TestCase):
+    def setUp(self):
+        super(HeartbeatBufferTests, self).setUp()
+        util.init_db()
+        self.buffer = heartbeat.HeartbeatBuffer(flush_interval=100)
+        # The flusher is driven by hand in these tests.
+        start_patcher = patch.object(self.buffer, '_start')
+        self.addCleanup(start_patcher.stop)
+        start_patcher.start()
+        self.instance_id = utils.generate_uuid()
+        self.iss_id = utils.generate_uuid()
+        t_models.InstanceServiceStatus(
+            id=self.iss_id, instance_id=self.instance_id,
+            status=ServiceStatuses.NEW).save()
+
+    def _get_iss(self):
+        return t_models.InstanceServiceStatus.find_by(id=self.iss_id)
+
+    def test_manager_buffers_heartbeats(self):
+        self.patch_conf_property('conductor_heartbeat_coalescing', True)
+        cond_mgr = conductor_manager.Manager()
+        with patch.object(cond_mgr.heartbeat_buffer, 'add') as mock_add:
+            cond_mgr.heartbeat(None, self.instance_id, {}, sent=1.0)
+        mock_add.assert_called_once_with(self.instance_id, {}, sent=1.0)
+
+    def test_buffered_heartbeats_written_on_stop(self):
+        self.patch_conf_property('conductor_heartbeat_coalescing', True)
+        cond_mgr = conductor_manager.Manager()
+        service = rpc_service.RpcService(
+            key=None, topic='conductor', rpc_api_version='1.0',
+            manager='trove.conductor.manager.Manager')
+        service.manager_impl = cond_mgr
+        service.rpcserver = Mock()
+        cond_mgr.heartbeat(None, self.instance_id,
+                           {'service_status':
+                            ServiceStatuses.RUNNING.description},
+                           sent=timeutils.utcnow_ts(microsecond=True))
+        flusher = cond_mgr.heartbeat_buffer._flusher
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss().status)
+
+        service.stop()
+
+        self.assertEqual(ServiceStatuses.RUNNING, self._get_iss().status)
+        self.assertFalse(flusher._running)
+        self.assertIsNone(cond_mgr.heartbeat_buffer._flusher)
+
+    def test_bogus_status_rejected(self):
+        self.assertRaises(ValueError, self.buffer.add,
+                          self.instance_id, {'service_status': 'potato'})
+
+    def test_latest_heartbeat_wins(self):
+        now = timeutils.utcnow_ts(microsecond=True)
+        self.buffer.add(self.instance_id,
+                        {'service_status':
+                         ServiceStatuses.BUILDING.description}, sent=now)
+        self.buffer.add(self.instance_id,
+                        {'service_status':
+                         ServiceStatuses.RUNNING.description}, sent=now + 1)
+        self.buffer.add(self.instance_id,
+                        {'service_status':
+                         ServiceStatuses.SHUTDOWN.description}, sent=now - 1)
+        self.buffer.flush()
+
+        self.assertEqual(ServiceStatuses.RUNNING, self._get_iss().status)
+        seen = LastSeen.load(instance_id=self.instance_id,
+                             method_name='heartbeat')
+        self.assertEqual(now + 1, float(seen.sent))
+        self.assertEqual(3, self.buffer.counters['received'])
+        self.assertEqual(1, self.buffer.counters['coalesced'])
+        self.assertEqual(1, self.buffer.counters['dropped'])
+        self.assertEqual(1, self.buffer.counters['written'])
+        self.assertIsNotNone(self.buffer.last_flush_time)
+
+    def test_heartbeat_older_than_last_seen_discarded(self):
+        now = timeutils.utcnow_ts(microsecond=True)
+        LastSeen.create(instance_id=self.instance_id,
+                        method_name='heartbeat', sent=now)
+        self.buffer.add(self.instance_id,
+                        {'service_status':
+                         ServiceStatuses.BUILDING.description}, sent=now - 1)
+        self.buffer.flush()
+
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss().status)
+        self.assertEqual(1, self.buffer.counters['dropped'])
+
+    def test_unchanged_status_not_written(self):
+        now = timeutils.utcnow_ts(microsecond=True)
+        payload = {'service_status': ServiceStatuses.NEW.description}
+        old_updated_at = self._get_iss().updated_at
+        self.buffer.add(self.instance_id, payload, sent=now)
+        self.buffer.flush()
+
+        self.assertEqual(old_updated_at, self._get_iss().updated_at)
+        self.assertEqual(1, self.buffer.counters['unchanged'])
+        self.assertEqual(0, self.buffer.counters['written'])
+
+    def test_unchanged_status_refreshed_when_expiring(self):
+        iss = self._get_iss()
+        iss.updated_at = timeutils.utcnow() - timedelta(hours=1)
+        get_db_api().save(iss)
+        self.buffer.add(self.instance_id, {},
+                        sent=timeutils.utcnow_ts(microsecond=True))
+        self.buffer.flush()
+
+        self.assertGreater(self._get_iss().updated_at,
+                           timeutils.utcnow() - timedelta(minutes=1))
+        self.assertEqual(1, self.buffer.counters['written'])
+
+    def test_volume_info_written_when_changed(self):
+        now = timeutils.utcnow_ts(microsecond=True)
+        payload = {'service_status': ServiceStatuses.NEW.description,
+                   'volume': {'used': 1.5, 'total': 10.0}}
+        self.buffer.add(self.instance_id, payload, sent=now)
+        self.buffer.flush()
+        self.assertEqual({'used': 1.5, 'total': 10.0},
+                         self._get_iss().get_volume_info(60))
+        self.assertEqual(1, self.buffer.counters['written'])
+
+        self.buffer.add(self.instance_id, payload, sent=now + 1)
+        self.buffer.flush()
+        self.assertEqual(1, self.buffer.counters['unchanged'])
+
+        payload['volume'] = {'used': 2.0, 'total': 10.0}
+        self.buffer.add(self.instance_id, payload, sent=now + 2)
+        self.buffer.flush()
+        self.assertEqual({'used': 2.0, 'total': 10.0},
+                         self._get_iss().get_volume_info(60))
+        self.assertEqual(2, self.buffer.counters['written'])
+
+    @patch('trove.conductor.heartbeat.LOG')
+    def test_failed_flush_requeued(self, mock_logging):
+        self.buffer.add(self.instance_id, {}, sent=1.0)
+        with patch.object(self.buffer, '_write',
+                          side_effect=Exception('db down')):
+            self.buffer.flush()
+        with patch.object(self.buffer, '_write') as mock_write:
+            self.buffer.flush()
+        mock_write.assert_called_once_with(
+            {self.instance_id: (1.0, None, None)})
@@ -36,6 +36,7 @@ class TestDatastore(TestDatastoreBase):
     @patch.object(datastore_models, 'CONF')
     def test_create_failure_with_datastore_default(self, mock_conf):
         mock_conf.default_datastore = 'bad_ds'
+        mock_conf.datastore_metadata_cache_ttl = 0
         self.assertRaisesRegex(exception.DatastoreDefaultDatastoreNotFound,
                                "Default datastore 'bad_ds' cannot be found",
                                datastore_models.get_datastore_version)
@@ -165,14 +165,12 @@ class TestDatastoreVersionMetadata(TestDatastoreBase):
         mock_cinder_client.return_value.volume_types.list.return_value = (
             cinder_vts)
 
-        mock_trove_list_result = mock.MagicMock()
-        mock_trove_list_result.count.return_value = len(trove_volume_types)
-        mock_trove_list_result.__iter__.return_value = []
+        mock_trove_list_result = []
         for trove_vt in trove_volume_types:
             trove_type = mock.Mock()
             trove_type.value = trove_vt
-            mock_trove_list_result.__iter__.return_value.append(trove_type)
-        mock_list.return_value = mock_trove_list_result
+            mock_trove_list_result.append(trove_type)
+        mock_list.return_value = tuple(mock_trove_list_result)
 
         return self.dsmetadata.allowed_datastore_version_volume_types(
             None, 'ds', 'dsv')
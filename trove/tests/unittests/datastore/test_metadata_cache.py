@@ -0,0 +1,102 @@
+# Copyright 2026 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from mock import patch
+
+from trove.common import utils
+from trove.datastore import models as datastore_models
+from trove.datastore.models import Capabilities
+from trove.datastore.models import Capability
+from trove.datastore.models import Datastore
+from trove.datastore.models import DatastoreVersion
+from trove.datastore.models import DatastoreVersionMetadata
+from trove.datastore.models import metadata_cache
+from trove.db import get_db_api
+from trove.tests.unittests.datastore.base import TestDatastoreBase
+
+
+class TestMetadataCache(TestDatastoreBase):
+
+    def setUp(self):
+        super(TestMetadataCache, self).setUp()
+        self.patch_conf_property('datastore_metadata_cache_ttl', 3600)
+
+    def test_lookups_use_snapshot(self):
+        metadata_cache.get()
+
+        with patch.object(datastore_models.dbmodels.DatabaseModelBase,
+                          'find_by', side_effect=AssertionError):
+            datastore = Datastore.load(self.ds_name)
+            self.assertEqual(self.datastore.id, datastore.id)
+            self.assertEqual(self.test_id, DatastoreVersion.load(
+                datastore, self.ds_version).id)
+            version = DatastoreVersion.load_by_uuid(self.test_id)
+            self.assertEqual(self.ds_name, version.datastore_name)
+            self.assertEqual(self.cap1.id,
+                             Capability.load(self.cap1.name).id)
+            self.assertIn(self.cap2.name, Capabilities.load(self.test_id))
+            self.assertEqual(
+                (str(self.flavor_id),),
+                DatastoreVersionMetadata.get_values(self.test_id, 'flavor'))
+
+    def test_change_invalidates(self):
+        self.datastore_version.capabilities.add(self.cap1, enabled=False)
+        capabilities = Capabilities.load(self.test_id)
+        self.assertFalse([c for c in capabilities
+                          if c.name == self.cap1.name][0].enabled)
+
+        Capability.load(self.cap2.name).disable()
+        self.assertFalse(Capability.load(self.cap2.name).enabled)
+
+        datastore_models.update_datastore_version(
+            self.ds_name, self.ds_version, "mysql", "", "", False)
+        self.assertFalse(DatastoreVersion.load_by_uuid(self.test_id).active)
+
+    def test_generation_checked_after_ttl(self):
+        snapshot = metadata_cache.get()
+        self.assertIs(snapshot, metadata_cache.get())
+
+        # Another process changed the metadata.
+        datastore_models._bump_generation()
+        self.assertIs(snapshot, metadata_cache.get())
+
+        self.patch_conf_property('datastore_metadata_cache_ttl', 0)
+        reloaded = metadata_cache.get()
+        self.assertIsNot(snapshot, reloaded)
+        self.assertIs(reloaded, metadata_cache.get())
+
+    def test_miss_falls_back_to_database(self):
+        metadata_cache.get()
+        # Written by another process, without invalidating this one.
+        db_info = datastore_models.DBDatastore(
+            id=utils.generate_uuid(), name='uncached' + self.rand_id,
+            default_version_id=None)
+        get_db_api().save(db_info)
+        self.addCleanup(Datastore.load(db_info.id).delete)
+
+        self.assertEqual(db_info.id, Datastore.load(db_info.name).id)
+
+    def test_reset_during_load_not_kept(self):
+        snapshot_init = datastore_models.MetadataSnapshot.__init__
+
+        def load(snapshot, generation):
+            snapshot_init(snapshot, generation)
+            metadata_cache.reset()
+
+        with patch.object(datastore_models.MetadataSnapshot, '__init__',
+                          load):
+            metadata_cache.reset()
+            snapshot = metadata_cache.get()
+
+        self.assertIsNot(snapshot, metadata_cache.get())
@@ -209,6 +209,37 @@ class ApiTest(trove_testtools.TestCase):
         self._verify_call('get_hwinfo')
         self.assertThat(resp, Is('[blah]'))
 
+    def test_cluster_node_healthy(self):
+        self.call_context.call.return_value = True
+
+        resp = self.api.cluster_node_healthy()
+
+        self.api.client.prepare.assert_called_once_with(
+            version='1.1', timeout=mock.ANY)
+        self._verify_call('cluster_node_healthy')
+        self.assertThat(resp, Is(True))
+
+    @mock.patch('trove.guestagent.api.LOG')
+    def test_cluster_node_healthy_old_guest(self, mock_logging):
+        for exc_type in ('UnsupportedVersion', 'NoSuchMethod'):
+            self.call_context.call.side_effect = RemoteError(exc_type)
+
+            self.assertIsNone(self.api.cluster_node_healthy())
+
+    def test_cluster_node_healthy_version_capped(self):
+        with mock.patch.object(self.api.client, 'can_send_version',
+                               return_value=False):
+            self.assertIsNone(self.api.cluster_node_healthy())
+
+        self.assertFalse(self.call_context.call.called)
+
+    @mock.patch('trove.guestagent.api.LOG')
+    def test_cluster_node_healthy_error(self, mock_logging):
+        self.call_context.call.side_effect = RemoteError('Error')
+
+        self.assertRaises(exception.GuestError,
+                          self.api.cluster_node_healthy)
+
     def test_rpc_ping(self):
         # execute
         self.api.rpc_ping()
@@ -14,6 +14,7 @@
 
 import mock
 import os
+import six
 from mock import ANY, call, DEFAULT, Mock, patch, PropertyMock
 from testtools.testcase import ExpectedException
 from trove.common import exception
@@ -1169,3 +1170,116 @@ class MySQLRestoreTests(trove_testtools.TestCase):
         self.restore_runner.post_restore = mock.Mock()
         self.assertRaises(restoreBase.RestoreError,
                           self.restore_runner.restore)
+
+
+class BackupCodecTests(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(BackupCodecTests, self).setUp()
+        for runner in (backupBase.BackupRunner, restoreBase.RestoreRunner):
+            for attr, value in (('is_zipped', True), ('is_encrypted', True)):
+                patcher = patch.object(runner, attr, value)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+        self.patch_conf_property('backup_compression_level', None)
+        self.patch_conf_property('backup_compression_threads', 0)
+        auth_pwd_patch = patch.object(MySqlApp, 'get_auth_password',
+                                      Mock(return_value='password'))
+        auth_pwd_patch.start()
+        self.addCleanup(auth_pwd_patch.stop)
+
+    def _backup_runner(self, compression, encryption):
+        patcher = patch.multiple(backupBase.BackupRunner,
+                                 compression_codec=compression,
+                                 encryption_codec=encryption)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return utils.import_class(BACKUP_SQLDUMP_CLS)(12345, extra_opts="")
+
+    def _restore_runner(self, location):
+        return utils.import_class(RESTORE_SQLDUMP_CLS)(
+            None, restore_location="/var/lib/mysql/data",
+            location=location, checksum="md5")
+
+    def test_backup_zstd_command(self):
+        self.patch_conf_property('backup_compression_level', 3)
+        runner = self._backup_runner('zstd', 'openssl')
+        self.assertEqual(SQLDUMP_BACKUP + PIPE + "zstd -q -c -T0 -3" + PIPE +
+                         ENCRYPT, runner.command)
+        self.assertEqual("12345.zst.enc", runner.manifest)
+
+    def test_backup_pigz_command(self):
+        self.patch_conf_property('backup_compression_threads', 4)
+        runner = self._backup_runner('pigz', 'openssl')
+        self.assertEqual(SQLDUMP_BACKUP + PIPE + "pigz -p 4" + PIPE +
+                         ENCRYPT, runner.command)
+        self.assertEqual("12345.gz.enc", runner.manifest)
+
+    def test_backup_aes_command(self):
+        runner = self._backup_runner('gzip', 'aes')
+        self.assertEqual(SQLDUMP_BACKUP + PIPE + ZIP, runner.command)
+        self.assertEqual("12345.gz.aes", runner.manifest)
+
+    def test_restore_detects_codecs_from_location(self):
+        restoreBase.RestoreRunner.is_zipped = False
+        restoreBase.RestoreRunner.is_encrypted = False
+        runner = self._restore_runner(
+            "http://swift/v1/database_backups/12345.zst.enc")
+        self.assertEqual(DECRYPT + PIPE + "zstd -q -d -c" + PIPE +
+                         SQLDUMP_RESTORE, runner.restore_cmd)
+
+        runner = self._restore_runner(
+            "http://swift/v1/database_backups/12345.gz.aes")
+        self.assertEqual(UNZIP + PIPE + SQLDUMP_RESTORE, runner.restore_cmd)
+
+        runner = self._restore_runner(
+            "http://swift/v1/database_backups/12345.xbstream")
+        self.assertEqual(SQLDUMP_RESTORE, runner.restore_cmd)
+
+    def test_restore_falls_back_to_config(self):
+        runner = self._restore_runner("filename")
+        self.assertEqual(DECRYPT + PIPE + UNZIP + PIPE + SQLDUMP_RESTORE,
+                         runner.restore_cmd)
+
+    def test_aes_roundtrip(self):
+        data = os.urandom(100000)
+        runner = self._backup_runner('gzip', 'aes')
+        runner.process = Mock(stdout=six.BytesIO(data))
+        encrypted = b''
+        chunk = runner.read(7)
+        while chunk:
+            encrypted += chunk
+            chunk = runner.read(4096)
+        self.assertTrue(encrypted.startswith(b'Salted__'))
+        self.assertNotIn(data[:64], encrypted)
+
+        storage = Mock()
+        storage.load.return_value = [encrypted[i:i + 5]
+                                     for i in range(0, len(encrypted), 5)]
+        runner = self._restore_runner(
+            "http://swift/v1/database_backups/12345.aes")
+        with patch.object(restoreBase.subprocess, 'Popen') as popen:
+            popen.return_value.stdin = six.BytesIO()
+            popen.return_value.stdin.close = Mock()
+            popen.return_value.returncode = 0
+            popen.return_value.stderr.read.return_value = ''
+            runner.storage = storage
+            runner._unpack(runner.location, runner.checksum,
+                           runner.restore_cmd)
+        self.assertEqual(SQLDUMP_RESTORE, popen.call_args[0][0])
+        self.assertEqual(data, popen.return_value.stdin.getvalue())
+
+    def test_restore_incremental_parent_with_other_codecs(self):
+        runner = self._restore_runner(
+            "http://swift/v1/database_backups/child.xbstream.zst.enc")
+        storage = Mock()
+        storage.load.return_value = [b'data']
+        runner.storage = storage
+        with patch.object(restoreBase.subprocess, 'Popen') as popen:
+            popen.return_value.returncode = 0
+            popen.return_value.stderr.read.return_value = ''
+            runner._unpack(
+                "http://swift/v1/database_backups/parent.xbstream.gz.enc",
+                "md5", runner.restore_cmd)
+        self.assertEqual(DECRYPT + PIPE + UNZIP + PIPE + SQLDUMP_RESTORE,
+                         popen.call_args[0][0])
@@ -573,6 +573,27 @@ class GuestAgentCassandraDBManagerTest(DatastoreManagerTest):
                 self.assertIn(usr2.serialize(), usrs[0])
                 self.assertIn(usr3.serialize(), usrs[0])
 
+    def test_get_listed_users_page(self):
+        users = []
+        for name in ('usr1', 'usr2', 'usr3', 'usr4'):
+            user = NonCallableMagicMock()
+            user.configure_mock(name=name, super=False)
+            users.append(user)
+
+        with patch.object(self.conn, 'execute', return_value=iter(users)):
+            with patch.object(self.admin, '_get_acl',
+                              side_effect=lambda client, username=None: {
+                                  username: {'db1': {'SELECT'}}}) as acl:
+                usrs, next_marker = self.manager.list_users(
+                    self.context, limit=2, marker='usr1')
+                self.assertEqual([call(ANY, username='usr2'),
+                                  call(ANY, username='usr3'),
+                                  call(ANY, username='usr4')],
+                                 acl.call_args_list)
+                self.assertEqual(['usr2', 'usr3'],
+                                 [usr['_name'] for usr in usrs])
+                self.assertEqual('usr3', next_marker)
+
     def test_list_access(self):
         usr1 = models.CassandraUser('usr1')
         usr2 = models.CassandraUser('usr2')
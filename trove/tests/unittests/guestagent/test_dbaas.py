@@ -19,6 +19,8 @@ import tempfile
 import time
 from uuid import uuid4
 
+from eventlet import event
+import eventlet
 from mock import ANY
 from mock import call
 from mock import DEFAULT
@@ -27,6 +29,7 @@ from mock import Mock
 from mock import patch
 from mock import PropertyMock
 from oslo_utils import netutils
+from pymysql import err as pymysql_err
 from six.moves import configparser
 import sqlalchemy
 
@@ -2005,6 +2008,65 @@ class BaseDbStatusTest(trove_testtools.TestCase):
                               rd_instance.ServiceStatuses.RUNNING,
                               rd_instance.ServiceStatuses.NEW)
 
+    def _run_delta_updates(self, base_db_status, statuses):
+        self.patch_conf_property('agent_heartbeat_delta', True)
+        self.patch_conf_property('agent_heartbeat_expiry', 300)
+        self.patch_conf_property('agent_status_probe_max_interval', 120)
+        self.patch_conf_property('report_interval', 30)
+        base_db_status._get_actual_db_status = Mock(side_effect=statuses)
+        clock = [1000.0]
+        with patch.object(BaseDbStatus, 'prepare_completed') as patch_pc:
+            patch_pc.__get__ = Mock(return_value=True)
+            with patch.object(time, 'time', side_effect=lambda: clock[0]):
+                for tick in range(len(statuses)):
+                    base_db_status.update()
+                    clock[0] += 30
+        return conductor_api.API.return_value.heartbeat
+
+    def test_update_delta_backs_off_while_running(self):
+        base_db_status = BaseDbStatus()
+        heartbeat = self._run_delta_updates(
+            base_db_status, [rd_instance.ServiceStatuses.RUNNING] * 10)
+
+        # Probed at 0, 30, 60, 120, 150 (keepalive) and 270 seconds.
+        self.assertEqual(6, base_db_status._get_actual_db_status.call_count)
+        self.assertEqual(2, heartbeat.call_count)
+        self.assertEqual({'sent': 2, 'suppressed': 4, 'probes_skipped': 4},
+                         dict(base_db_status.heartbeat_counters))
+
+    def test_update_delta_sends_changes(self):
+        base_db_status = BaseDbStatus()
+        running = rd_instance.ServiceStatuses.RUNNING
+        shutdown = rd_instance.ServiceStatuses.SHUTDOWN
+        # The status at 90 seconds is not probed for.
+        heartbeat = self._run_delta_updates(
+            base_db_status, [running, running, running, shutdown, shutdown])
+
+        self.assertEqual(shutdown, base_db_status.status)
+        self.assertEqual(2, heartbeat.call_count)
+        self.assertEqual(0, base_db_status._probe_interval)
+        base_db_status._get_actual_db_status = Mock(return_value=shutdown)
+        with patch.object(BaseDbStatus, 'prepare_completed') as patch_pc:
+            patch_pc.__get__ = Mock(return_value=True)
+            base_db_status.update()
+        # Not running, so it keeps being probed for.
+        self.assertEqual(1, base_db_status._get_actual_db_status.call_count)
+
+    @patch.object(dbaas_sr, 'get_filesystem_volume_stats',
+                  return_value={'used': 1.5, 'total': 10.0, 'free': 8.5})
+    @patch('trove.guestagent.datastore.service.conductor_api.API')
+    def test_set_status_heartbeat_volume_info(self, mock_api, mock_stats):
+        self.patch_conf_property('agent_heartbeat_volume_stats', True)
+        self.patch_conf_property('datastore_manager', 'mysql')
+        base_db_status = BaseDbStatus()
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING,
+                                  force=True)
+        heartbeat = mock_api.return_value.heartbeat
+        self.assertEqual(
+            {'service_status': rd_instance.ServiceStatuses.RUNNING.description,
+             'volume': {'used': 1.5, 'total': 10.0}},
+            heartbeat.call_args[0][1])
+
     def test_set_status_to_failed(self):
         self._test_set_status(rd_instance.ServiceStatuses.BUILDING,
                               rd_instance.ServiceStatuses.FAILED,
@@ -2197,11 +2259,51 @@ class BaseDbStatusTest(trove_testtools.TestCase):
             status.end_restart.assert_called_once_with()
 
 
+class StatusProbeTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(StatusProbeTest, self).setUp()
+        self.probe = base_datastore_service.StatusProbe()
+        self.connections = []
+        self.probe._connect = Mock(side_effect=self._connect)
+        self.probe._ping = Mock()
+
+    def _connect(self, timeout):
+        connection = Mock()
+        self.connections.append(connection)
+        return connection
+
+    def test_connection_kept(self):
+        self.assertTrue(self.probe.is_alive())
+        self.assertTrue(self.probe.is_alive())
+
+        self.assertEqual(1, len(self.connections))
+        self.assertEqual(2, self.probe._ping.call_count)
+        self.assertEqual({'alive': 2}, dict(self.probe.counters))
+        self.assertIsNotNone(self.probe.last_latency)
+
+    def test_reconnect_once(self):
+        self.probe.is_alive()
+        self.probe._ping.side_effect = [Exception('gone away'), None]
+
+        self.assertTrue(self.probe.is_alive())
+
+        self.assertEqual(2, len(self.connections))
+        self.connections[0].close.assert_called_once_with()
+
+    def test_down(self):
+        self.probe._connect.side_effect = Exception('refused')
+
+        self.assertFalse(self.probe.is_alive())
+        self.assertEqual({'failed': 1}, dict(self.probe.counters))
+
+
 class MySqlAppStatusTest(trove_testtools.TestCase):
 
     def setUp(self):
         super(MySqlAppStatusTest, self).setUp()
         util.init_db()
+        self.patch_conf_property('status_probe_native', False)
         self.orig_utils_execute_with_timeout = \
             mysql_common_service.utils.execute_with_timeout
         self.orig_load_mysqld_options = \
@@ -2276,6 +2378,40 @@ class MySqlAppStatusTest(trove_testtools.TestCase):
 
         self.assertEqual(rd_instance.ServiceStatuses.BLOCKED, status)
 
+    @patch.object(mysql_common_service.BaseMySqlApp, 'get_auth_password',
+                  return_value='password')
+    @patch.object(mysql_common_service.pymysql, 'connect')
+    @patch.object(utils, 'execute_with_timeout')
+    def test_get_actual_db_status_probe(self, mock_execute, mock_connect,
+                                        mock_password):
+        self.patch_conf_property('status_probe_native', True)
+        self.mySqlAppStatus = MySqlAppStatus.get()
+        self.addCleanup(self.mySqlAppStatus.probe.close)
+
+        status = self.mySqlAppStatus._get_actual_db_status()
+
+        self.assertEqual(rd_instance.ServiceStatuses.RUNNING, status)
+        mock_connect.return_value.ping.assert_called_once_with(
+            reconnect=False)
+        self.assertFalse(mock_execute.called)
+
+    @patch('trove.guestagent.datastore.mysql_common.service.LOG')
+    @patch.object(mysql_common_service.BaseMySqlApp, 'get_auth_password',
+                  return_value='password')
+    @patch.object(mysql_common_service.pymysql, 'connect',
+                  side_effect=pymysql_err.OperationalError(2003, 'refused'))
+    @patch.object(utils, 'execute_with_timeout',
+                  side_effect=[ProcessExecutionError(), ("1234", None)])
+    def test_get_actual_db_status_probe_fallback(self, mock_execute,
+                                                 mock_connect, *args):
+        self.patch_conf_property('status_probe_native', True)
+        self.mySqlAppStatus = MySqlAppStatus.get()
+
+        status = self.mySqlAppStatus._get_actual_db_status()
+
+        self.assertEqual(rd_instance.ServiceStatuses.BLOCKED, status)
+        self.assertEqual(2, mock_execute.call_count)
+
 
 class TestRedisApp(BaseAppTest.AppTestCase):
 
@@ -3701,6 +3837,220 @@ class MariaDBAppTest(trove_testtools.TestCase):
         self.assertEqual(1, self.MariaDBApp._bootstrap_cluster.call_count)
 
 
+class PostgresConnectionTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(PostgresConnectionTest, self).setUp()
+        self.patch_conf_property('datastore_manager', 'postgresql')
+        pools_patch = patch.dict(pg_service.PostgresConnectionPool._pools,
+                                 clear=True)
+        pools_patch.start()
+        self.addCleanup(pools_patch.stop)
+        self.connections = []
+        connect_patch = patch.object(pg_service.psycopg2, 'connect',
+                                     side_effect=self._connect)
+        self.mock_connect = connect_patch.start()
+        self.addCleanup(connect_patch.stop)
+        self.admin = pg_service.PgSqlAdmin(
+            pg_service.models.PostgreSQLUser('os_admin'))
+
+    def _connect(self, **connection_args):
+        connection = MagicMock(closed=0, autocommit=False)
+        connection.get_transaction_status.return_value = (
+            pg_service.psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+        self.connections.append(connection)
+        return connection
+
+    def _statements(self, connection):
+        cursor = connection.cursor.return_value.__enter__.return_value
+        return [args[0][0] for args in cursor.execute.call_args_list]
+
+    def test_connection_reused(self):
+        self.admin.psql('SELECT 1')
+        self.admin.query('SELECT 2')
+
+        self.assertEqual(1, len(self.connections))
+        self.assertEqual(['SELECT 1', 'SELECT 2'],
+                         self._statements(self.connections[0]))
+        self.assertTrue(self.connections[0].autocommit)
+
+    def test_broken_connection_discarded(self):
+        self.admin.psql('SELECT 1')
+        self.connections[0].closed = 2
+
+        self.admin.psql('SELECT 1')
+
+        self.assertEqual(2, len(self.connections))
+
+    @patch.object(pg_service.time, 'time')
+    def test_idle_connection_checked(self, mock_time):
+        mock_time.return_value = 1000
+        self.admin.psql('SELECT 1')
+        cursor = (self.connections[0].cursor.return_value.
+                  __enter__.return_value)
+        cursor.execute.side_effect = pg_service.psycopg2.OperationalError()
+        mock_time.return_value = (
+            1000 + pg_service.PostgresConnectionPool.PING_AFTER)
+
+        self.admin.psql('SELECT 1')
+
+        self.assertEqual(2, len(self.connections))
+        self.connections[0].close.assert_called_once_with()
+
+    def test_closed_connection_retried(self):
+        self.admin.psql('SELECT 1')
+        connection = self.connections[0]
+        cursor = connection.cursor.return_value.__enter__.return_value
+
+        def server_closed(statement, data_values):
+            connection.closed = 2
+            raise pg_service.psycopg2.OperationalError()
+        cursor.execute.side_effect = server_closed
+
+        self.admin.psql('SELECT 2')
+
+        self.assertEqual(2, len(self.connections))
+        self.assertEqual(['SELECT 2'], self._statements(self.connections[1]))
+        connection.close.assert_called_once_with()
+
+    def test_statement_errors_not_retried(self):
+        self.admin.psql('SELECT 1')
+        cursor = (self.connections[0].cursor.return_value.
+                  __enter__.return_value)
+        cursor.execute.side_effect = pg_service.psycopg2.OperationalError()
+
+        self.assertRaises(pg_service.psycopg2.OperationalError,
+                          self.admin.psql, 'SELECT 2')
+        self.assertEqual(1, len(self.connections))
+
+    @patch.object(pg_service.PgSqlApp, '__init__', return_value=None)
+    def test_pools_closed_when_server_stopped(self, mock_init):
+        app = pg_service.PgSqlApp()
+        app.status = Mock()
+        for stop in (app.stop_db, app.restart):
+            self.admin.psql('SELECT 1')
+            connection = self.connections[-1]
+
+            stop()
+
+            connection.close.assert_called_once_with()
+            self.assertEqual({}, pg_service.PostgresConnectionPool._pools)
+        self.admin.psql('SELECT 1')
+        self.assertEqual(3, len(self.connections))
+
+    def test_connection_in_use_closed_when_returned(self):
+        with self.admin.transaction():
+            self.admin.psql('SELECT 1')
+            pg_service.PostgresConnectionPool.close_all()
+            self.assertFalse(self.connections[0].close.called)
+
+        self.connections[0].close.assert_called_once_with()
+
+    def test_create_users_in_one_transaction(self):
+        users = []
+        for name in ('user1', 'user2'):
+            user = pg_service.models.PostgreSQLUser(name, password='password')
+            for db in ('db1', 'db2'):
+                user.databases.append(
+                    pg_service.models.PostgreSQLSchema(db).serialize())
+            users.append(user.serialize())
+
+        self.admin.create_user(None, users)
+
+        self.assertEqual(1, len(self.connections))
+        connection = self.connections[0]
+        self.assertFalse(connection.autocommit)
+        self.assertEqual(6, len(self._statements(connection)))
+        connection.commit.assert_called_once_with()
+
+    def test_transactions_of_green_threads_kept_apart(self):
+        in_transaction = event.Event()
+        others_done = event.Event()
+
+        def transaction():
+            with self.admin.transaction():
+                self.admin.psql('SELECT 1')
+                in_transaction.send()
+                others_done.wait()
+                self.admin.psql('SELECT 2')
+
+        def others():
+            in_transaction.wait()
+            self.admin.psql('SELECT 3')
+            with self.admin.transaction():
+                self.admin.psql('SELECT 4')
+            others_done.send()
+
+        pool = eventlet.GreenPool()
+        pool.spawn(transaction)
+        pool.spawn(others)
+        pool.waitall()
+
+        self.assertEqual(2, len(self.connections))
+        first, second = self.connections
+        self.assertEqual(['SELECT 1', 'SELECT 2'], self._statements(first))
+        first.commit.assert_called_once_with()
+        # The pooled connection is reused by the statement outside of any
+        # transaction, then by the second transaction.
+        self.assertEqual(['SELECT 3', 'SELECT 4'], self._statements(second))
+        second.commit.assert_called_once_with()
+
+    def test_transaction_rolled_back_on_error(self):
+        def fail_second(statement, data_values):
+            if 'user2' in statement:
+                raise pg_service.psycopg2.ProgrammingError()
+
+        self.admin.psql('SELECT 1')
+        connection = self.connections[0]
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = fail_second
+        connection.get_transaction_status.return_value = (
+            pg_service.psycopg2.extensions.TRANSACTION_STATUS_INERROR)
+        users = [pg_service.models.PostgreSQLUser(
+            name, password='password').serialize()
+            for name in ('user1', 'user2')]
+
+        self.assertRaises(pg_service.psycopg2.ProgrammingError,
+                          self.admin.create_user, None, users)
+
+        self.assertFalse(connection.commit.called)
+        connection.rollback.assert_called_once_with()
+        self.assertEqual(1, len(self.connections))
+
+    def test_list_users_page(self):
+        rows = [('user2', 'db1', 'UTF8', 'en_US'),
+                ('user2', 'db2', 'UTF8', 'en_US'),
+                ('user3', None, None, None),
+                ('user4', 'db1', 'UTF8', 'en_US')]
+
+        with patch.object(self.admin, 'query', return_value=rows) as query:
+            users, next_marker = self.admin.list_users(
+                None, limit=2, marker='user1')
+
+        statement = query.call_args[0][0]
+        self.assertIn("usename COLLATE \"C\" > 'user1'", statement)
+        self.assertIn("ORDER BY usename COLLATE \"C\" LIMIT 3", statement)
+        self.assertTrue(statement.endswith("ORDER BY usename COLLATE \"C\""))
+        self.assertEqual(['user2', 'user3'],
+                         [user['_name'] for user in users])
+        self.assertEqual(['db1', 'db2'],
+                         [db['_name'] for db in users[0]['_databases']])
+        self.assertEqual([], users[1]['_databases'])
+        self.assertEqual('user3', next_marker)
+
+    def test_list_users_page_in_code_point_order(self):
+        # As sorted by the "C" collation, upper case names come first.
+        rows = [('Zoe', None, None, None),
+                ('adam', None, None, None),
+                ('bob', None, None, None)]
+
+        with patch.object(self.admin, 'query', return_value=rows):
+            users, next_marker = self.admin.list_users(None, limit=2)
+
+        self.assertEqual(['Zoe', 'adam'], [user['_name'] for user in users])
+        self.assertEqual('adam', next_marker)
+
+
 class PostgresAppTest(BaseAppTest.AppTestCase):
 
     @patch.object(utils, 'execute_with_timeout', return_value=('0', ''))
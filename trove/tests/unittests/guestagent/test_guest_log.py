@@ -0,0 +1,170 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import zlib
+
+from mock import patch
+from swiftclient.client import ClientException
+
+from trove.common.context import TroveContext
+from trove.guestagent.common import operating_system
+from trove.guestagent import guest_log
+from trove.tests.unittests import trove_testtools
+
+
+class MemorySwiftClient(object):
+    """Just enough of a swift client to publish logs to."""
+
+    def __init__(self, objects, fail_on=None):
+        self.objects = objects
+        self.fail_on = fail_on
+
+    def get_container(self, container, prefix=None):
+        return {}, [{'name': name} for name in sorted(self.objects)
+                    if name.startswith(prefix or '')]
+
+    def put_container(self, container, headers=None):
+        pass
+
+    def put_object(self, container, name, contents, content_type=None,
+                   headers=None):
+        if self.fail_on and self.fail_on in name:
+            raise ClientException('Upload failed', http_status=503)
+        self.objects[name] = (contents, headers)
+
+    def get_object(self, container, name):
+        if name not in self.objects:
+            raise ClientException('Not found', http_status=404)
+        return {}, self.objects[name][0]
+
+    def delete_object(self, container, name):
+        del self.objects[name]
+
+
+class GuestLogPublishTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(GuestLogPublishTest, self).setUp()
+        chmod_patch = patch.object(operating_system, 'chmod')
+        chmod_patch.start()
+        self.addCleanup(chmod_patch.stop)
+        self.patch_conf_property('guest_log_limit', 100)
+        self.patch_conf_property('guest_id', 'instance')
+        self.patch_conf_property('datastore_manager', 'mysql')
+
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir)
+        self.log_file = os.path.join(self.log_dir, 'general.log')
+        self.objects = {}
+        self.client = MemorySwiftClient(self.objects)
+        client_patch = patch.object(guest_log, 'create_swift_client',
+                                    side_effect=self._create_client)
+        client_patch.start()
+        self.addCleanup(client_patch.stop)
+        self.guest_log = guest_log.GuestLog(
+            TroveContext(), 'general', guest_log.LogType.SYS, None,
+            self.log_file, True)
+
+    def _create_client(self, context):
+        return self.client
+
+    def _write_log(self, lines):
+        with open(self.log_file, 'ab') as log:
+            for line in lines:
+                log.write(line + b'\n')
+
+    def _publish(self, log):
+        # The manager always shows a log before publishing it.
+        log.show()
+        return log.publish_log()
+
+    def _components(self):
+        return sorted(name for name in self.objects
+                      if not name.endswith('_metafile'))
+
+    def _published(self):
+        return b''.join(self.objects[name][0] for name in self._components())
+
+    def _metafile(self):
+        metafile = self.guest_log._metafile_name()
+        return self.guest_log._codec.deserialize(self.objects[metafile][0])
+
+    def test_publish_cuts_components_at_lines(self):
+        self._write_log([b'%02d' % i * 10 for i in range(10)])
+
+        self._publish(self.guest_log)
+
+        components = self._components()
+        # Each line is 21 bytes, so four of them fit in a component.
+        self.assertEqual(3, len(components))
+        self.assertEqual(['4', '4', '2'],
+                         [self.objects[name][1]['x-object-meta-lines']
+                          for name in components])
+        with open(self.log_file, 'rb') as log:
+            self.assertEqual(log.read(), self._published())
+        self.assertEqual(210, self._metafile()['log_size'])
+
+    def test_publish_splits_long_lines(self):
+        self._write_log([b'x' * 250])
+
+        self._publish(self.guest_log)
+
+        self.assertEqual([100, 100, 51],
+                         [len(self.objects[name][0])
+                          for name in self._components()])
+        self.assertEqual(b'x' * 250 + b'\n', self._published())
+
+    def test_publish_resumes_after_last_component(self):
+        self._write_log([b'%02d' % i * 10 for i in range(10)])
+        self.client.fail_on = '%020d' % 84
+
+        self.assertRaises(ClientException, self._publish, self.guest_log)
+
+        self.assertEqual(84, self._metafile()['log_size'])
+        self.client.fail_on = None
+        uploaded = list(self.objects)
+        self._write_log([b'last'])
+        guest_log_restarted = guest_log.GuestLog(
+            TroveContext(), 'general', guest_log.LogType.SYS, None,
+            self.log_file, True)
+
+        details = self._publish(guest_log_restarted)
+
+        self.assertEqual(215, details['published'])
+        self.assertEqual(0, details['pending'])
+        self.assertEqual(3, len(self._components()))
+        self.assertTrue(set(uploaded).issubset(self.objects))
+        with open(self.log_file, 'rb') as log:
+            self.assertEqual(log.read(), self._published())
+
+    def test_publish_compressed(self):
+        self.patch_conf_property('guest_log_compress', True)
+        self._write_log([b'%02d' % i * 10 for i in range(10)])
+
+        self._publish(self.guest_log)
+
+        components = self._components()
+        self.assertEqual(3, len(components))
+        self.assertTrue(all(name.endswith('.gz') for name in components))
+        # Concatenated gzip files decompress as one.
+        decompressed = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data, compressed = b'', self._published()
+        while compressed:
+            data += decompressed.decompress(compressed)
+            compressed = decompressed.unused_data
+            decompressed = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        with open(self.log_file, 'rb') as log:
+            self.assertEqual(log.read(), data)
+        self.assertEqual(210, self._metafile()['log_size'])
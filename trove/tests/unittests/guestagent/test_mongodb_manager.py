@@ -24,6 +24,7 @@ import trove.guestagent.datastore.experimental.mongodb.service as service
 import trove.guestagent.volume as volume
 from trove.tests.unittests.guestagent.test_datastore_manager import \
     DatastoreManagerTest
+from trove.tests.unittests import trove_testtools
 
 
 class GuestAgentMongoDBManagerTest(DatastoreManagerTest):
@@ -369,3 +370,71 @@ class GuestAgentMongoDBManagerTest(DatastoreManagerTest):
         self.manager.delete_database(self.context, schema)
 
         mocked_client().__enter__().drop_database.assert_called_with('testdb')
+
+
+class MongoDBClientTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(MongoDBClientTest, self).setUp()
+        engine_patch = mock.patch.dict(service.MongoDBClient.engine,
+                                       clear=True)
+        engine_patch.start()
+        self.addCleanup(engine_patch.stop)
+        sessions_patch = mock.patch.dict(service.MongoDBClient.sessions,
+                                         clear=True)
+        sessions_patch.start()
+        self.addCleanup(sessions_patch.stop)
+        client_patch = mock.patch.object(
+            pymongo, 'MongoClient', side_effect=lambda **kw: mock.MagicMock())
+        self.mock_client = client_patch.start()
+        self.addCleanup(client_patch.stop)
+        self.user = models.MongoDBUser('admin.os_admin', 'password')
+
+    def test_authenticates_once(self):
+        with service.MongoDBClient(self.user) as first:
+            pass
+        with service.MongoDBClient(self.user) as second:
+            pass
+
+        self.assertIs(first, second)
+        first['admin'].authenticate.assert_called_once_with(
+            'os_admin', password='password')
+        first.close.assert_not_called()
+        first['admin'].logout.assert_not_called()
+
+    def test_password_change_logs_in_again(self):
+        with service.MongoDBClient(self.user) as first:
+            pass
+        self.user.password = 'new_password'
+        with service.MongoDBClient(self.user) as second:
+            pass
+
+        self.assertIsNot(first, second)
+        first.close.assert_called_once_with()
+        second['admin'].authenticate.assert_called_once_with(
+            'os_admin', password='new_password')
+
+    def test_connection_failure_drops_client(self):
+        def failing_call():
+            with service.MongoDBClient(self.user):
+                raise pymongo.errors.AutoReconnect()
+
+        with service.MongoDBClient(self.user) as first:
+            pass
+        self.assertRaises(pymongo.errors.AutoReconnect, failing_call)
+        with service.MongoDBClient(self.user) as second:
+            pass
+
+        first.close.assert_called_once_with()
+        self.assertIsNot(first, second)
+        second['admin'].authenticate.assert_called_once_with(
+            'os_admin', password='password')
+
+    def test_host_change_resets_sessions(self):
+        with service.MongoDBClient(self.user) as first:
+            pass
+
+        service.MongoDBClient(None, host='10.0.0.1')
+
+        first.close.assert_called_once_with()
+        self.assertEqual({}, service.MongoDBClient.sessions)
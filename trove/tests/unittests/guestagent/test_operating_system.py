@@ -15,6 +15,7 @@
 
 import os
 import re
+import shutil
 import stat
 import tempfile
 
@@ -31,6 +32,7 @@ from trove.common import utils
 from trove.guestagent.common import guestagent_utils
 from trove.guestagent.common import operating_system
 from trove.guestagent.common.operating_system import FileMode
+from trove.guestagent import privsep
 from trove.tests.unittests import trove_testtools
 
 
@@ -1229,3 +1231,92 @@ class TestOperatingSystem(trove_testtools.TestCase):
                 files.add(path)
 
         return files
+
+
+class TestPrivsepFileOperations(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestPrivsepFileOperations, self).setUp()
+        self.patch_conf_property('privsep_file_operations', True)
+        # Run the entrypoints in this process rather than in the helper.
+        privsep.file_pctxt.set_client_mode(False)
+        self.addCleanup(privsep.file_pctxt.set_client_mode, True)
+        execute_patch = patch.object(utils, 'execute_with_timeout')
+        self.mock_execute = execute_patch.start()
+        self.addCleanup(execute_patch.stop)
+        self.root_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_dir)
+
+    def _path(self, *names):
+        return os.path.join(self.root_dir, *names)
+
+    def test_read_write_file(self):
+        path = self._path('test.json')
+        data = {'key': 'value', 'list': [1, 2]}
+
+        operating_system.write_file(path, data, codec=JsonCodec(),
+                                    as_root=True)
+
+        self.assertEqual(data, operating_system.read_file(
+            path, codec=JsonCodec(), as_root=True))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+        self.assertFalse(self.mock_execute.called)
+
+    def test_write_file_keeps_mode(self):
+        path = self._path('test.txt')
+        operating_system.write_file(path, 'first', as_root=True)
+        os.chmod(path, 0o644)
+
+        operating_system.write_file(path, 'second', as_root=True)
+
+        self.assertEqual('second', operating_system.read_file(
+            path, as_root=True))
+        self.assertEqual(0o644, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_chmod_recursive(self):
+        operating_system.create_directory(self._path('a', 'b'),
+                                          as_root=True)
+        operating_system.write_file(self._path('a', 'b', 'f'), '',
+                                    as_root=True)
+
+        operating_system.chmod(self._path('a'), FileMode.SET_USR_RWX,
+                               as_root=True)
+
+        for path in (self._path('a'), self._path('a', 'b'),
+                     self._path('a', 'b', 'f')):
+            self.assertEqual(0o700, stat.S_IMODE(os.stat(path).st_mode))
+        self.assertFalse(self.mock_execute.called)
+
+    def test_chmod_reset(self):
+        path = self._path('f')
+        operating_system.write_file(path, '', as_root=True)
+        os.chmod(path, 0o644)
+
+        operating_system.chmod(path, FileMode(reset=[0o000]), as_root=True)
+        self.assertEqual(0o000, stat.S_IMODE(os.stat(path).st_mode))
+
+        operating_system.chmod(path, FileMode(add=[stat.S_IRUSR]),
+                               as_root=True)
+        self.assertEqual(0o400, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_copy_move_remove(self):
+        source = self._path('source')
+        operating_system.write_file(source, 'data', as_root=True)
+        operating_system.create_directory(self._path('dir'), as_root=True)
+
+        operating_system.copy(source, self._path('dir'), as_root=True)
+        operating_system.move(self._path('dir', 'source'),
+                              self._path('moved'), as_root=True)
+        operating_system.remove(source, as_root=True)
+
+        self.assertFalse(operating_system.exists(source, as_root=True))
+        self.assertEqual('data', operating_system.read_file(
+            self._path('moved'), as_root=True))
+        self.assertFalse(self.mock_execute.called)
+
+    def test_failure_raised_as_command_failure(self):
+        self.assertRaises(exception.ProcessExecutionError,
+                          operating_system.remove, self._path('missing'),
+                          as_root=True)
+        operating_system.remove(self._path('missing'), force=True,
+                                as_root=True)
@@ -11,21 +11,26 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+from datetime import timedelta
+import re
 import uuid
 
 from mock import Mock, patch
+from sqlalchemy import event
 
 from trove.backup import models as backup_models
 from trove.common import cfg
 from trove.common import exception
 from trove.common.instance import ServiceStatuses
 from trove.datastore import models as datastore_models
+from trove.db.sqlalchemy import session
 from trove.instance import models
 from trove.instance.models import DBInstance
 from trove.instance.models import DBInstanceFault
 from trove.instance.models import filter_ips
 from trove.instance.models import Instance
 from trove.instance.models import instance_encryption_key_cache
+from trove.instance.models import Instances
 from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import SimpleInstance
 from trove.instance.tasks import InstanceTasks
@@ -126,6 +131,50 @@ class SimpleInstanceTest(trove_testtools.TestCase):
             self.assertEqual(fault_date, fault.updated)
 
 
+class LoadGuestInfoTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(LoadGuestInfoTest, self).setUp()
+        self.instance = Mock(status='ACTIVE', volume_used=None,
+                             volume_total=None)
+        self.instance.datastore_status = InstanceServiceStatus(
+            ServiceStatuses.RUNNING, instance_id='instance')
+        guest_patch = patch.object(models, 'create_guest_client')
+        self.guest = guest_patch.start().return_value
+        self.addCleanup(guest_patch.stop)
+        self.guest.get_volume_info.return_value = {'used': 3.0,
+                                                   'total': 10.0}
+
+    def test_cached_volume_info(self):
+        self.instance.datastore_status.set_volume_info(
+            {'used': 2.0, 'total': 10.0})
+
+        models.load_guest_info(self.instance, Mock(), 'instance')
+
+        self.assertEqual(2.0, self.instance.volume_used)
+        self.assertFalse(self.guest.get_volume_info.called)
+
+    def test_expired_volume_info(self):
+        self.instance.datastore_status.set_volume_info(
+            {'used': 2.0, 'total': 10.0})
+        self.instance.datastore_status.volume_updated -= timedelta(
+            seconds=CONF.volume_stats_cache_expiry + 1)
+
+        models.load_guest_info(self.instance, Mock(), 'instance')
+
+        self.assertEqual(3.0, self.instance.volume_used)
+
+    def test_refresh_volume_info(self):
+        self.instance.datastore_status.set_volume_info(
+            {'used': 2.0, 'total': 10.0})
+
+        models.load_guest_info(self.instance, Mock(), 'instance',
+                               refresh_volume=True)
+
+        self.assertEqual(3.0, self.instance.volume_used)
+        self.assertEqual(10.0, self.instance.volume_total)
+
+
 class CreateInstanceTest(trove_testtools.TestCase):
 
     @patch.object(task_api.API, 'get_client', Mock(return_value=Mock()))
@@ -257,6 +306,202 @@ class CreateInstanceTest(trove_testtools.TestCase):
         self.assertIsNotNone(instance)
 
 
+class InstancesLoadTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        util.init_db()
+        super(InstancesLoadTest, self).setUp()
+        self.tenant_id = str(uuid.uuid4())
+        self.context = trove_testtools.TroveTestContext(
+            self, tenant=self.tenant_id, is_admin=False)
+        self.datastore = datastore_models.DBDatastore.create(
+            id=str(uuid.uuid4()),
+            name='mysql' + str(uuid.uuid4()),
+        )
+        self.datastore_version = (
+            datastore_models.DBDatastoreVersion.create(
+                id=str(uuid.uuid4()),
+                datastore_id=self.datastore.id,
+                name="5.5" + str(uuid.uuid4()),
+                manager="mysql",
+                image_id="image_id",
+                packages="",
+                active=True))
+        self.db_infos = []
+        self.servers = []
+        nova_patcher = patch.object(models, 'create_nova_client')
+        self.addCleanup(nova_patcher.stop)
+        self.nova_client = nova_patcher.start().return_value
+        self.nova_client.servers.list.side_effect = lambda: self.servers
+        self.addCleanup(self._delete_instances)
+
+    def _delete_instances(self):
+        for db_info in self.db_infos:
+            InstanceServiceStatus.find_by(instance_id=db_info.id).delete()
+            db_info.delete()
+        self.datastore_version.delete()
+        self.datastore.delete()
+
+    def _create_instances(self, count):
+        for _ in range(count):
+            compute_id = str(uuid.uuid4())
+            db_info = DBInstance.create(
+                name='instance', flavor_id=1, tenant_id=self.tenant_id,
+                volume_size=1, compute_instance_id=compute_id,
+                datastore_version_id=self.datastore_version.id,
+                task_status=InstanceTasks.NONE)
+            InstanceServiceStatus.create(instance_id=db_info.id,
+                                         status=ServiceStatuses.RUNNING)
+            self.db_infos.append(db_info)
+            self.servers.append(Mock(id=compute_id, status='ACTIVE',
+                                     addresses={}))
+
+    def _load_counting_queries(self):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = session.get_engine()
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            instances, marker = Instances.load(self.context, False)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        return instances, marker, statements
+
+    def test_load_pages_by_marker(self):
+        self._create_instances(5)
+        self.context.limit = 2
+        expected = sorted(db_info.id for db_info in self.db_infos)
+
+        loaded = []
+        marker = None
+        while True:
+            self.context.marker = marker
+            instances, marker = Instances.load(self.context, False)
+            loaded.extend(instances)
+            if not marker:
+                break
+        self.assertEqual(expected, [instance.id for instance in loaded])
+        self.assertEqual(['ACTIVE'] * 5,
+                         [instance.db_info.server_status
+                          for instance in loaded])
+        self.assertEqual(3, self.nova_client.servers.list.call_count)
+
+    def test_load_attaches_fault(self):
+        self._create_instances(2)
+        fault = DBInstanceFault.create(instance_id=self.db_infos[0].id,
+                                       message='Error', details='trace')
+        self.addCleanup(fault.delete)
+
+        with patch.object(DBInstanceFault, 'find_by') as mock_find_by:
+            instances, _ = Instances.load(self.context, False)
+            faults = dict((instance.id, instance.fault)
+                          for instance in instances)
+        mock_find_by.assert_not_called()
+        self.assertEqual('Error', faults[self.db_infos[0].id].message)
+        self.assertIsNone(faults[self.db_infos[0].id].details)
+        self.assertIsNone(faults[self.db_infos[1].id])
+
+    def test_load_skips_nova_for_building_page(self):
+        self._create_instances(2)
+        for db_info in self.db_infos:
+            db_info.update(task_id=InstanceTasks.BUILDING.code,
+                           task_description=InstanceTasks.BUILDING.db_text)
+
+        instances, _ = Instances.load(self.context, False)
+
+        self.assertEqual(2, len(instances))
+        self.nova_client.servers.list.assert_not_called()
+
+    def test_load_query_count_independent_of_tenant_size(self):
+        self.context.limit = 5
+        self._create_instances(5)
+        # The datastore metadata is cached by the first load.
+        Instances.load(self.context, False)
+        instances, marker, small = self._load_counting_queries()
+        self.assertEqual(5, len(instances))
+        self.assertIsNone(marker)
+
+        self._create_instances(20)
+        instances, marker, large = self._load_counting_queries()
+        self.assertEqual(5, len(instances))
+        self.assertIsNotNone(marker)
+        self.assertEqual(len(small), len(large))
+
+    def test_load_metadata_query_count_independent_of_page_size(self):
+        # Every lookup in the metadata cache checks its generation.
+        self.patch_conf_property('datastore_metadata_cache_ttl', 0)
+        self._create_instances(20)
+        metadata = re.compile(
+            r'FROM (datastores|datastore_versions|metadata_generations)\b')
+
+        def metadata_queries(limit):
+            self.context.limit = limit
+            datastore_models.metadata_cache.reset()
+            instances, marker, statements = self._load_counting_queries()
+            self.assertEqual(limit, len(instances))
+            return [statement for statement in statements
+                    if metadata.search(statement)]
+
+        small = metadata_queries(5)
+        self.assertTrue(small)
+        self.assertEqual(len(small), len(metadata_queries(20)))
+
+    def test_status_watch_transitions(self):
+        self._create_instances(3)
+        ids = [db_info.id for db_info in self.db_infos]
+        watch = models.InstanceStatusWatch(ids + ['missing'])
+        running = (ServiceStatuses.RUNNING, InstanceTasks.NONE)
+
+        transitions = watch.poll()
+        self.assertEqual(dict([(instance_id, (None, running))
+                               for instance_id in ids] +
+                              [('missing', (None, None))]), transitions)
+
+        status = InstanceServiceStatus.find_by(instance_id=ids[1])
+        status.set_status(ServiceStatuses.SHUTDOWN)
+        status.save()
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = session.get_engine()
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            transitions = watch.poll()
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        # Leaves out the pings of the connection pool.
+        self.assertEqual(1, len([statement for statement in statements
+                                 if 'instances' in statement]))
+        self.assertEqual(
+            {ids[1]: (running, (ServiceStatuses.SHUTDOWN,
+                                InstanceTasks.NONE))}, transitions)
+        self.assertEqual({}, watch.poll())
+
+    def test_status_watch_instance_without_service_status(self):
+        self._create_instances(1)
+        # A cluster member whose guest has not reported yet.
+        member = DBInstance.create(
+            name='member', flavor_id=1, tenant_id=self.tenant_id,
+            volume_size=1, compute_instance_id=str(uuid.uuid4()),
+            datastore_version_id=self.datastore_version.id,
+            cluster_id=str(uuid.uuid4()), task_status=InstanceTasks.NONE)
+        self.addCleanup(member.delete)
+        instance_id = self.db_infos[0].id
+        watch = models.InstanceStatusWatch([instance_id, member.id])
+
+        transitions = watch.poll()
+
+        self.assertEqual(
+            {instance_id: (None, (ServiceStatuses.RUNNING,
+                                  InstanceTasks.NONE)),
+             member.id: (None, (None, InstanceTasks.NONE))}, transitions)
+
+
 class TestInstanceUpgrade(trove_testtools.TestCase):
 
     def setUp(self):
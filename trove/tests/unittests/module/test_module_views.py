@@ -78,3 +78,17 @@ class DetailedModuleViewTest(trove_testtools.TestCase):
                              result['module']['priority_apply'])
             self.assertEqual(self.module.apply_order,
                              result['module']['apply_order'])
+
+    def test_data_reapply(self):
+        self.module.reapply = Mock(status='RUNNING', md5='md5-hash', total=10,
+                                   applied=4, skipped=1, failed=2)
+        datastore = Mock()
+        ds_version = Mock()
+        with patch.object(models, 'get_datastore_version',
+                          Mock(return_value=(datastore, ds_version))):
+            result = DetailedModuleView(self.module).data()
+        reapply = result['module']['reapply']
+        self.assertEqual('RUNNING', reapply['status'])
+        self.assertEqual((10, 4, 1, 2),
+                         (reapply['total'], reapply['applied'],
+                          reapply['skipped'], reapply['failed']))
@@ -12,11 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 from mock import Mock, MagicMock, patch
 from testtools import skipIf
 
 from trove.common import cfg
 from trove.common import exception
+from trove.common import utils
 from trove.db.models import DatabaseModelBase
 from trove.extensions.mgmt.quota.service import QuotaController
 from trove.quota.models import Quota
@@ -27,6 +30,7 @@ from trove.quota.quota import DbQuotaDriver
 from trove.quota.quota import QUOTAS
 from trove.quota.quota import run_with_quotas
 from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
 """
 Unit tests for the classes and functions in DbQuotaDriver.py.
 """
@@ -423,33 +427,6 @@ class DbQuotaDriverTest(trove_testtools.TestCase):
         self.assertIsNone(self.driver.check_quotas(FAKE_TENANT1, resources,
                                                    delta))
 
-    def test_reserve(self):
-
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=1,
-                                  reserved=2),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=1,
-                                  reserved=1)]
-
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
-        QuotaUsage.save = Mock()
-        Reservation.create = Mock()
-
-        # Set up the deltas with the intention that after the reserve call
-        # the deltas should match usage_id + 1 for both instances and volumes
-        delta = {'instances': 2, 'volumes': 3}
-        self.driver.reserve(FAKE_TENANT1, resources, delta)
-
-        for _, kw in Reservation.create.call_args_list:
-            self.assertEqual(kw['usage_id'] + 1, kw['delta'])
-            self.assertEqual(Reservation.Statuses.RESERVED, kw['status'])
-
     def test_reserve_resource_unknown(self):
 
         delta = {'instances': 10, 'volumes': 2000, 'Fake_resource': 123}
@@ -459,196 +436,145 @@ class DbQuotaDriverTest(trove_testtools.TestCase):
                           resources,
                           delta)
 
-    def test_reserve_over_quota(self):
 
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=0,
-                                  reserved=0),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=0,
-                                  reserved=0)]
+class DbQuotaReservationTest(trove_testtools.TestCase):
 
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
+    def setUp(self):
+        super(DbQuotaReservationTest, self).setUp()
+        util.init_db()
+        self.driver = DbQuotaDriver(resources)
+        self.tenant_id = utils.generate_uuid()
+        self.addCleanup(self._delete_usages)
 
-        delta = {'instances': 1, 'volumes': CONF.max_volumes_per_tenant + 1}
-        self.assertRaises(exception.QuotaExceeded,
-                          self.driver.reserve,
-                          FAKE_TENANT1,
-                          resources,
-                          delta)
+    def _delete_usages(self):
+        for usage in QuotaUsage.find_all(tenant_id=self.tenant_id).all():
+            for reservation in Reservation.find_all(usage_id=usage.id).all():
+                reservation.delete()
+            usage.delete()
 
-    def test_reserve_over_quota_with_usage(self):
+    def _create_usage(self, resource, in_use, reserved):
+        return QuotaUsage.create(tenant_id=self.tenant_id, resource=resource,
+                                 in_use=in_use, reserved=reserved)
 
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=1,
-                                  reserved=0),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=0,
-                                  reserved=0)]
+    def _usage(self, resource):
+        return QuotaUsage.find_by(tenant_id=self.tenant_id, resource=resource)
 
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
+    def test_reserve(self):
+        self._create_usage(Resource.INSTANCES, 1, 2)
 
-        max_inst = CONF.max_instances_per_tenant
-        delta = {'instances': max_inst, 'volumes': 3}
-        self.assertRaises(exception.QuotaExceeded,
-                          self.driver.reserve,
-                          FAKE_TENANT1,
-                          resources,
-                          delta)
+        reservations = self.driver.reserve(
+            self.tenant_id, resources, {'instances': 2, 'volumes': 3})
 
-    def test_reserve_over_quota_with_reserved(self):
+        self.assertEqual(4, self._usage(Resource.INSTANCES).reserved)
+        self.assertEqual(3, self._usage(Resource.VOLUMES).reserved)
+        self.assertEqual([2, 3], [r.delta for r in reservations])
+        for reservation in reservations:
+            self.assertEqual(
+                Reservation.Statuses.RESERVED,
+                Reservation.find_by(id=reservation.id).status)
 
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=1,
-                                  reserved=2),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=0,
-                                  reserved=0)]
+    def test_reserve_over_quota(self):
+        delta = {'instances': 1, 'volumes': CONF.max_volumes_per_tenant + 1}
 
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
+        self.assertRaises(exception.QuotaExceeded, self.driver.reserve,
+                          self.tenant_id, resources, delta)
+        self.assertEqual(0, self._usage(Resource.INSTANCES).reserved)
+        self.assertEqual(0, self._usage(Resource.VOLUMES).reserved)
 
-        max_inst = CONF.max_instances_per_tenant
-        delta = {'instances': max_inst - 1, 'volumes': 2}
-        self.assertRaises(exception.QuotaExceeded,
-                          self.driver.reserve,
-                          FAKE_TENANT1,
-                          resources,
-                          delta)
+    def test_reserve_over_quota_with_usage(self):
+        self._create_usage(Resource.INSTANCES, 1, 0)
+        delta = {'instances': CONF.max_instances_per_tenant, 'volumes': 3}
 
-    def test_reserve_over_quota_but_can_apply_negative_deltas(self):
+        self.assertRaises(exception.QuotaExceeded, self.driver.reserve,
+                          self.tenant_id, resources, delta)
 
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=10,
-                                  reserved=0),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=50,
-                                  reserved=0)]
+    def test_reserve_over_quota_with_reserved(self):
+        self._create_usage(Resource.INSTANCES, 1, 2)
+        delta = {'instances': CONF.max_instances_per_tenant - 1,
+                 'volumes': 2}
 
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
+        self.assertRaises(exception.QuotaExceeded, self.driver.reserve,
+                          self.tenant_id, resources, delta)
 
-        QuotaUsage.save = Mock()
-        Reservation.create = Mock()
+    def test_reserve_over_quota_but_can_apply_negative_deltas(self):
+        self._create_usage(Resource.INSTANCES, 10, 0)
+        self._create_usage(Resource.VOLUMES, 50, 0)
 
-        # Set up the deltas with the intention that after the reserve call
-        # the deltas should match -usage_id for both instances and volumes
-        delta = {'instances': -1, 'volumes': -2}
-        self.driver.reserve(FAKE_TENANT1, resources, delta)
+        reservations = self.driver.reserve(
+            self.tenant_id, resources, {'instances': -1, 'volumes': -2})
 
-        for _, kw in Reservation.create.call_args_list:
-            self.assertEqual(-kw['usage_id'], kw['delta'])
-            self.assertEqual(Reservation.Statuses.RESERVED, kw['status'])
+        self.assertEqual([-1, -2], [r.delta for r in reservations])
+        self.assertEqual(-1, self._usage(Resource.INSTANCES).reserved)
 
     def test_commit(self):
-
-        Reservation.save = Mock()
-        QuotaUsage.save = Mock()
-
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=5,
-                                  reserved=2),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=1,
-                                  reserved=2)]
-
-        FAKE_RESERVATIONS = [Reservation(usage_id=1,
-                                         delta=1,
-                                         status=Reservation.Statuses.RESERVED),
-                             Reservation(usage_id=2,
-                                         delta=2,
-                                         status=Reservation.Statuses.RESERVED)]
-
-        QuotaUsage.find_by = Mock(side_effect=FAKE_QUOTAS)
-        self.driver.commit(FAKE_RESERVATIONS)
-
-        self.assertEqual(6, FAKE_QUOTAS[0].in_use)
-        self.assertEqual(1, FAKE_QUOTAS[0].reserved)
-        self.assertEqual(Reservation.Statuses.COMMITTED,
-                         FAKE_RESERVATIONS[0].status)
-
-        self.assertEqual(3, FAKE_QUOTAS[1].in_use)
-        self.assertEqual(0, FAKE_QUOTAS[1].reserved)
-        self.assertEqual(Reservation.Statuses.COMMITTED,
-                         FAKE_RESERVATIONS[1].status)
+        self._create_usage(Resource.INSTANCES, 5, 1)
+        self._create_usage(Resource.VOLUMES, 1, 0)
+        reservations = self.driver.reserve(
+            self.tenant_id, resources, {'instances': 1, 'volumes': 2})
+
+        self.driver.commit(reservations)
+        # Committing again changes nothing.
+        self.driver.commit(reservations)
+
+        instances = self._usage(Resource.INSTANCES)
+        self.assertEqual(6, instances.in_use)
+        self.assertEqual(1, instances.reserved)
+        volumes = self._usage(Resource.VOLUMES)
+        self.assertEqual(3, volumes.in_use)
+        self.assertEqual(0, volumes.reserved)
+        for reservation in reservations:
+            self.assertEqual(Reservation.Statuses.COMMITTED,
+                             reservation.status)
+            self.assertEqual(
+                Reservation.Statuses.COMMITTED,
+                Reservation.find_by(id=reservation.id).status)
 
     def test_commit_cannot_be_less_than_zero(self):
+        self._create_usage(Resource.INSTANCES, 0, 0)
+        reservations = self.driver.reserve(
+            self.tenant_id, resources, {'instances': -1})
 
-        Reservation.save = Mock()
-        QuotaUsage.save = Mock()
+        self.driver.commit(reservations)
 
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=0,
-                                  reserved=-1)]
-
-        FAKE_RESERVATIONS = [Reservation(usage_id=1,
-                                         delta=-1,
-                                         status=Reservation.Statuses.RESERVED)]
-
-        QuotaUsage.find_by = Mock(side_effect=FAKE_QUOTAS)
-        self.driver.commit(FAKE_RESERVATIONS)
-
-        self.assertEqual(0, FAKE_QUOTAS[0].in_use)
-        self.assertEqual(0, FAKE_QUOTAS[0].reserved)
-        self.assertEqual(Reservation.Statuses.COMMITTED,
-                         FAKE_RESERVATIONS[0].status)
+        instances = self._usage(Resource.INSTANCES)
+        self.assertEqual(0, instances.in_use)
+        self.assertEqual(0, instances.reserved)
 
     def test_rollback(self):
-
-        Reservation.save = Mock()
-        QuotaUsage.save = Mock()
-
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=5,
-                                  reserved=2),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=1,
-                                  reserved=2)]
-
-        FAKE_RESERVATIONS = [Reservation(usage_id=1,
-                                         delta=1,
-                                         status=Reservation.Statuses.RESERVED),
-                             Reservation(usage_id=2,
-                                         delta=2,
-                                         status=Reservation.Statuses.RESERVED)]
-
-        QuotaUsage.find_by = Mock(side_effect=FAKE_QUOTAS)
-        self.driver.rollback(FAKE_RESERVATIONS)
-
-        self.assertEqual(5, FAKE_QUOTAS[0].in_use)
-        self.assertEqual(1, FAKE_QUOTAS[0].reserved)
-        self.assertEqual(Reservation.Statuses.ROLLEDBACK,
-                         FAKE_RESERVATIONS[0].status)
-
-        self.assertEqual(1, FAKE_QUOTAS[1].in_use)
-        self.assertEqual(0, FAKE_QUOTAS[1].reserved)
-        self.assertEqual(Reservation.Statuses.ROLLEDBACK,
-                         FAKE_RESERVATIONS[1].status)
+        self._create_usage(Resource.INSTANCES, 5, 1)
+        reservations = self.driver.reserve(
+            self.tenant_id, resources, {'instances': 1, 'volumes': 2})
+
+        self.driver.rollback(reservations)
+
+        instances = self._usage(Resource.INSTANCES)
+        self.assertEqual(5, instances.in_use)
+        self.assertEqual(1, instances.reserved)
+        self.assertEqual(0, self._usage(Resource.VOLUMES).reserved)
+        for reservation in reservations:
+            self.assertEqual(
+                Reservation.Statuses.ROLLEDBACK,
+                Reservation.find_by(id=reservation.id).status)
+
+    def test_concurrent_reservations_do_not_exceed_quota(self):
+        limit = CONF.max_instances_per_tenant
+        results = []
+
+        def reserve():
+            try:
+                results.append(self.driver.reserve(
+                    self.tenant_id, resources, {'instances': 1}))
+            except exception.QuotaExceeded:
+                results.append(None)
+
+        threads = [threading.Thread(target=reserve)
+                   for _ in range(limit * 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reserved = [result for result in results if result]
+        self.assertEqual(limit * 3, len(results))
+        self.assertEqual(limit, len(reserved))
+        self.assertEqual(limit, self._usage(Resource.INSTANCES).reserved)
@@ -95,48 +95,71 @@ class MongoDbClusterTasksTest(trove_testtools.TestCase):
                                          datastore_version=mock_dv1)
 
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch('trove.instance.models.load_instance_statuses')
     @patch('trove.taskmanager.models.LOG')
     def test_all_instances_ready_with_server_error(self,
-                                                   mock_logging, mock_find,
-                                                   mock_db_find, mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.NEW
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.BUILDING_ERROR_SERVER
+                                                   mock_logging, mock_load,
+                                                   mock_update):
+        mock_load.return_value = dict(
+            (instance_id, (ServiceStatuses.NEW,
+                           InstanceTasks.BUILDING_ERROR_SERVER))
+            for instance_id in ["1", "2", "3", "4"])
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertFalse(ret_val)
 
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch('trove.instance.models.load_instance_statuses')
     @patch('trove.taskmanager.models.LOG')
     def test_all_instances_ready_bad_status(self, mock_logging,
-                                            mock_find, mock_db_find,
-                                            mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.FAILED
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.NONE
+                                            mock_load, mock_update):
+        mock_load.return_value = dict(
+            (instance_id, (ServiceStatuses.FAILED, InstanceTasks.NONE))
+            for instance_id in ["1", "2", "3", "4"])
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertFalse(ret_val)
 
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
-    def test_all_instances_ready(self, mock_find, mock_db_find):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.INSTANCE_READY
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.NONE
+    @patch('trove.instance.models.load_instance_statuses')
+    def test_all_instances_ready(self, mock_load):
+        mock_load.return_value = dict(
+            (instance_id, (ServiceStatuses.INSTANCE_READY,
+                           InstanceTasks.NONE))
+            for instance_id in ["1", "2", "3", "4"])
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         self.assertTrue(ret_val)
 
+    @patch('trove.instance.models.load_instance_statuses')
+    def test_all_instances_ready_polls_in_bulk(self, mock_load):
+        self.patch_conf_property('usage_sleep_time', 0)
+        building = (ServiceStatuses.NEW, InstanceTasks.BUILDING)
+        ready = (ServiceStatuses.INSTANCE_READY, InstanceTasks.NONE)
+        mock_load.side_effect = [
+            {"1": building, "2": building, "3": building},
+            {"1": ready, "2": building, "3": ready},
+            {"1": ready, "2": ready, "3": ready},
+        ]
+        ret_val = self.clustertasks._all_instances_ready(["1", "2", "3"],
+                                                         self.cluster_id)
+        self.assertTrue(ret_val)
+        # One load of all the instances per poll, none afterwards.
+        self.assertEqual(3, mock_load.call_count)
+        mock_load.assert_called_with(["1", "2", "3"])
+
+    @patch.object(ClusterTasks, 'update_statuses_on_failure')
+    @patch('trove.instance.models.load_instance_statuses')
+    def test_all_instances_ready_instance_gone(self, mock_load, mock_update):
+        mock_load.return_value = {
+            "1": (ServiceStatuses.NEW, InstanceTasks.BUILDING)}
+        ret_val = self.clustertasks._all_instances_ready(["1", "2"],
+                                                         self.cluster_id)
+        self.assertFalse(ret_val)
+        self.assertEqual(1, mock_load.call_count)
+        mock_update.assert_called_with(self.cluster_id, None)
+
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
     @patch.object(ClusterTasks, 'get_guest')
     @patch.object(ClusterTasks, 'get_ip')
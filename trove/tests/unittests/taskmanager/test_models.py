@@ -30,7 +30,10 @@ from testtools.matchers import Equals, Is
 import trove.backup.models
 from trove.backup import models as backup_models
 from trove.backup import state
+from trove.cluster.models import ClusterRollStatus
+from trove.cluster.models import DBClusterRoll
 import trove.common.context
+from trove.common.exception import ClusterNodesFailed
 from trove.common.exception import GuestError
 from trove.common.exception import MalformedSecurityGroupRuleError
 from trove.common.exception import PollTimeOut
@@ -38,6 +41,7 @@ from trove.common.exception import TroveError
 from trove.common.instance import ServiceStatuses
 from trove.common.notification import TroveInstanceModifyVolume
 from trove.common import remote
+from trove.common.strategies.storage import swift
 import trove.common.template as template
 from trove.common import timeutils
 from trove.common import utils
@@ -50,7 +54,9 @@ from trove.instance.models import BaseInstance
 from trove.instance.models import DBInstance
 from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import InstanceStatus
+from trove.instance.models import load_instance_statuses
 from trove.instance.tasks import InstanceTasks
+from trove.module import models as module_models
 from trove import rpc
 from trove.taskmanager import models as taskmanager_models
 from trove.tests.unittests import trove_testtools
@@ -1040,6 +1046,349 @@ class BuiltInstanceTasksTest(trove_testtools.TestCase):
                          _fix_device_path("vdb/dev"))
 
 
+class ModuleReapplyTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ModuleReapplyTest, self).setUp()
+        util.init_db()
+        self.context = trove_testtools.TroveTestContext(self, is_admin=True)
+        self.module = module_models.DBModule.create(
+            name='reapply', type='ping', contents='contents',
+            tenant_id=None, datastore_id=None, datastore_version_id=None,
+            auto_apply=False, visible=True, live_update=False,
+            priority_apply=False, apply_order=5, is_admin=False, md5='old')
+        self.instance_ids = ['reapply-%d' % i for i in range(5)]
+        for instance_id in self.instance_ids:
+            module_models.DBInstanceModule.create(
+                instance_id=instance_id, module_id=self.module.id, md5='old')
+        self.module.update(md5='new')
+        self.addCleanup(self._clean_db)
+
+        self.applied = []
+        self.fail_on = set()
+        self.instances = {}
+        for index, instance_id in enumerate(self.instance_ids):
+            instance = Mock(id=instance_id, cluster_id=None)
+            instance.datastore.id = 'ds-%d' % (index % 2)
+            self.instances[instance_id] = instance
+        patches = [
+            patch.object(taskmanager_models.BuiltInstanceTasks, 'load',
+                         side_effect=self._load_instance),
+            patch.object(taskmanager_models, 'create_guest_client',
+                         side_effect=self._create_guest),
+            patch.object(taskmanager_models.module_views,
+                         'convert_modules_to_list', return_value=[]),
+            patch.object(taskmanager_models, 'LOG'),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _clean_db(self):
+        for run in module_models.DBModuleReapply.find_all(
+                module_id=self.module.id):
+            run.delete()
+        for instance_module in module_models.DBInstanceModule.find_all(
+                module_id=self.module.id):
+            instance_module.delete()
+        self.module.delete()
+
+    def _load_instance(self, context, instance_id, needs_server=False):
+        return self.instances[instance_id]
+
+    def _create_guest(self, context, instance_id):
+        guest = Mock()
+
+        def module_apply(module_list):
+            if instance_id in self.fail_on:
+                raise GuestError(original_message='apply failed')
+            self.applied.append(instance_id)
+        guest.module_apply.side_effect = module_apply
+        return guest
+
+    def _reapply(self, force=False):
+        taskmanager_models.ModuleTasks.reapply_module(
+            self.context, self.module.id, None, False, 10, 1, force)
+        return module_models.ModuleReapply.load_latest(
+            self.context, self.module.id)
+
+    def test_reapply_counts_failures(self):
+        self.fail_on.add('reapply-3')
+        self.instances['reapply-4'].cluster_id = 'cluster'
+
+        run = self._reapply()
+
+        self.assertEqual(module_models.ModuleReapplyStatus.COMPLETED,
+                         run.status)
+        self.assertEqual('new', run.md5)
+        self.assertEqual((5, 3, 1, 1),
+                         (run.total, run.applied, run.skipped, run.failed))
+        self.assertEqual(['reapply-0', 'reapply-1', 'reapply-2'],
+                         sorted(self.applied))
+
+    def test_reapply_resumes_unfinished_run(self):
+        self.fail_on.add('reapply-3')
+        first = self._reapply(force=True)
+        # The run stopped before getting to the last instances.
+        first.update(status=module_models.ModuleReapplyStatus.FAILED)
+        self.fail_on.clear()
+        self.applied = []
+
+        run = self._reapply(force=True)
+
+        self.assertEqual(first.id, run.id)
+        self.assertEqual(['reapply-3'], self.applied)
+        self.assertEqual(module_models.ModuleReapplyStatus.COMPLETED,
+                         run.status)
+        self.assertEqual((5, 5, 0, 0),
+                         (run.total, run.applied, run.skipped, run.failed))
+
+    def test_reapply_after_completed_run_starts_over(self):
+        first = self._reapply(force=True)
+        self.applied = []
+
+        run = self._reapply(force=True)
+
+        self.assertNotEqual(first.id, run.id)
+        self.assertEqual(sorted(self.instance_ids), sorted(self.applied))
+
+    @patch.object(taskmanager_models.time, 'sleep')
+    @patch.object(taskmanager_models.time, 'time')
+    def test_reapply_rate_per_datastore(self, mock_time, mock_sleep):
+        clock = [100.0]
+        mock_time.side_effect = lambda: clock[0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+        mock_sleep.side_effect = sleep
+        rate = taskmanager_models.ModuleReapplyRate(2, 10)
+
+        for datastore_id in ['a', 'a', 'b', 'b', 'a']:
+            rate.wait(datastore_id)
+
+        mock_sleep.assert_called_once_with(10)
+        self.assertEqual(110.0, clock[0])
+
+
+class ClusterRollTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ClusterRollTest, self).setUp()
+        util.init_db()
+        self.context = trove_testtools.TroveTestContext(self, is_admin=True)
+        self.cluster_id = str(uuid.uuid4())
+        self.instance_ids = []
+        for index in range(5):
+            db_info = DBInstance.create(
+                name='node-%d' % index, flavor_id=1, tenant_id='tenant',
+                volume_size=1, datastore_version_id='version',
+                compute_instance_id='compute-%d' % index,
+                cluster_id=self.cluster_id, task_status=InstanceTasks.NONE)
+            self.instance_ids.append(db_info.id)
+        self.addCleanup(self._clean_db)
+        self.patch_conf_property('cluster_rolling_wave_size', 2)
+        self.patch_conf_property('usage_sleep_time', 0)
+
+        self.events = []
+        self.fail_on_call = None
+        self.health = {}
+        patches = [
+            patch.object(taskmanager_models.BuiltInstanceTasks, 'load',
+                         side_effect=self._load_instance),
+            patch.object(taskmanager_models.ClusterTasks, 'get_guest',
+                         side_effect=self._get_guest),
+            patch.object(taskmanager_models.inst_models,
+                         'load_instance_statuses',
+                         side_effect=self._load_statuses),
+            patch.object(taskmanager_models, 'LOG'),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cluster_tasks = taskmanager_models.ClusterTasks(
+            Mock(), Mock(id=self.cluster_id), datastore=Mock(),
+            datastore_version=Mock())
+
+    def _clean_db(self):
+        for roll in DBClusterRoll.find_all(
+                cluster_id=self.cluster_id):
+            roll.delete()
+        for db_info in DBInstance.find_all(cluster_id=self.cluster_id):
+            db_info.delete()
+
+    def _load_instance(self, context, instance_id, needs_server=False):
+        return Mock(id=instance_id)
+
+    def _load_statuses(self, instance_ids):
+        return dict((instance_id, (ServiceStatuses.RUNNING,
+                                   InstanceTasks.NONE))
+                    for instance_id in instance_ids)
+
+    def _get_guest(self, instance):
+        guest = Mock()
+
+        def cluster_node_healthy():
+            self.events.append(('healthy', instance.id))
+            answers = self.health.get(instance.id, [True])
+            return answers.pop(0) if len(answers) > 1 else answers[0]
+        guest.cluster_node_healthy.side_effect = cluster_node_healthy
+        return guest
+
+    def _roll_instance(self, context, instance):
+        self.events.append(('roll', instance.id))
+        if len(self.rolled) == self.fail_on_call:
+            raise TroveError('roll failed')
+
+    @property
+    def rolled(self):
+        return [instance_id for event, instance_id in self.events
+                if event == 'roll']
+
+    def _roll(self, operation='restart', **kwargs):
+        self.events = []
+        self.cluster_tasks._roll_cluster(
+            self.context, self.cluster_id, operation, self._roll_instance,
+            **kwargs)
+
+    def _load_roll(self):
+        return DBClusterRoll.query().filter_by(
+            cluster_id=self.cluster_id).order_by(
+            DBClusterRoll.created.desc()).first()
+
+    def test_roll_waits_for_waves_to_rejoin(self):
+        first = self.instance_ids[0]
+        self.health[first] = [False, False, True]
+
+        self._roll()
+
+        rolled = self.rolled
+        self.assertEqual(sorted(self.instance_ids), sorted(rolled))
+        waves = [rolled[0:2], rolled[2:4], rolled[4:]]
+        for wave, next_wave in zip(waves, waves[1:]):
+            # A wave starts once every node of the previous one is healthy.
+            last_check = max(index for index, event in enumerate(self.events)
+                             if event[0] == 'healthy' and event[1] in wave)
+            self.assertLess(last_check,
+                            self.events.index(('roll', next_wave[0])))
+        roll = self._load_roll()
+        self.assertEqual(ClusterRollStatus.COMPLETED, roll.status)
+        self.assertEqual(5, roll.total)
+        self.assertEqual(rolled, roll.completed_ids)
+
+    def _fail_second_wave(self, **kwargs):
+        # The first node of the second wave fails.
+        self.fail_on_call = 3
+        self.assertRaises(ClusterNodesFailed, self._roll, **kwargs)
+        self.fail_on_call = None
+        return self._load_roll(), self.rolled[0:2]
+
+    def test_roll_after_failed_starts_over(self):
+        first, done = self._fail_second_wave()
+        self.assertEqual(ClusterRollStatus.FAILED, first.status)
+        self.assertEqual(done, first.completed_ids)
+
+        self._roll()
+
+        roll = self._load_roll()
+        self.assertNotEqual(first.id, roll.id)
+        self.assertEqual(ClusterRollStatus.COMPLETED, roll.status)
+        self.assertEqual(sorted(self.instance_ids), sorted(self.rolled))
+        self.assertEqual(ClusterRollStatus.SUPERSEDED,
+                         DBClusterRoll.find_by(id=first.id).status)
+
+    def test_roll_resumes_failed_when_asked(self):
+        first, done = self._fail_second_wave(
+            operation='upgrade', datastore_version_id='new',
+            resume_failed=True)
+
+        self._roll(operation='upgrade', datastore_version_id='new',
+                   resume_failed=True)
+
+        roll = self._load_roll()
+        self.assertEqual(first.id, roll.id)
+        self.assertEqual(ClusterRollStatus.COMPLETED, roll.status)
+        self.assertEqual(sorted(set(self.instance_ids) - set(done)),
+                         sorted(self.rolled))
+        self.assertEqual(sorted(self.instance_ids),
+                         sorted(roll.completed_ids))
+        self.assertEqual(5, roll.total)
+
+    def test_roll_resumes_interrupted(self):
+        first, done = self._fail_second_wave()
+        # As left when the task manager stops in the middle of the roll.
+        first.update(status=ClusterRollStatus.RUNNING)
+
+        self._roll()
+
+        self.assertEqual(first.id, self._load_roll().id)
+        self.assertEqual(sorted(set(self.instance_ids) - set(done)),
+                         sorted(self.rolled))
+
+    def test_failed_roll_to_other_version_not_resumed(self):
+        first, done = self._fail_second_wave(
+            operation='upgrade', datastore_version_id='old',
+            resume_failed=True)
+
+        self._roll(operation='upgrade', datastore_version_id='new',
+                   resume_failed=True)
+
+        self.assertNotEqual(first.id, self._load_roll().id)
+        self.assertEqual(sorted(self.instance_ids), sorted(self.rolled))
+        self.assertEqual(ClusterRollStatus.SUPERSEDED,
+                         DBClusterRoll.find_by(id=first.id).status)
+
+    def test_roll_after_completed_starts_over(self):
+        self._roll()
+        first = self._load_roll()
+
+        self._roll()
+
+        self.assertNotEqual(first.id, self._load_roll().id)
+        self.assertEqual(sorted(self.instance_ids), sorted(self.rolled))
+
+    @patch.object(utils, 'poll_until', side_effect=PollTimeOut)
+    def test_roll_stops_when_nodes_do_not_rejoin(self, mock_poll_until):
+        self.assertRaises(TroveError, self._roll)
+
+        self.assertEqual(2, len(self.rolled))
+        roll = self._load_roll()
+        self.assertEqual(ClusterRollStatus.FAILED, roll.status)
+        self.assertEqual([], roll.completed_ids)
+
+    @patch.object(taskmanager_models.ClusterTasks,
+                  'update_statuses_on_failure')
+    def test_nodes_without_service_status(self, mock_update):
+        # None of the nodes has a service status row.
+        def poll_once(retriever, **kwargs):
+            if not retriever():
+                raise PollTimeOut()
+
+        with patch.object(taskmanager_models.inst_models,
+                          'load_instance_statuses', load_instance_statuses):
+            self.assertFalse(
+                self.cluster_tasks._all_instances_acquire_status(
+                    self.instance_ids, self.cluster_id, None,
+                    ServiceStatuses.INSTANCE_READY))
+            mock_update.assert_called_once_with(self.cluster_id, None)
+
+            with patch.object(utils, 'poll_until', side_effect=poll_once):
+                self.assertRaises(
+                    TroveError, self.cluster_tasks._wait_for_rejoin,
+                    [Mock(id=instance_id)
+                     for instance_id in self.instance_ids])
+
+    @patch.object(taskmanager_models, 'time')
+    def test_roll_delays_nodes_of_unknown_health(self, mock_time):
+        for instance_id in self.instance_ids:
+            self.health[instance_id] = [None]
+
+        self._roll(delay_sec=30)
+
+        self.assertEqual([call(30)] * 3, mock_time.sleep.call_args_list)
+        self.assertEqual(ClusterRollStatus.COMPLETED,
+                         self._load_roll().status)
+
+
 class BackupTasksTest(trove_testtools.TestCase):
 
     def setUp(self):
@@ -1125,6 +1474,19 @@ class BackupTasksTest(trove_testtools.TestCase):
                 self.backup.state,
                 "backup should be in DELETE_FAILED status")
 
+    def test_delete_backup_chunk_manifest(self):
+        with patch.object(self.swift_client, 'head_object',
+                          return_value={'content-type':
+                                        swift.CHUNK_MANIFEST_TYPE}):
+            with patch.object(backup_models.BackupChunks,
+                              'delete') as mock_delete:
+                taskmanager_models.BackupTasks.delete_backup(
+                    'dummy context', self.backup.id)
+        mock_delete.assert_called_once_with(
+            self.swift_client, self.backup, 'database_backups',
+            '12e48.xbstream.gz')
+        self.backup.delete.assert_any_call()
+
     def test_parse_manifest(self):
         manifest = 'container/prefix'
         cont, prefix = taskmanager_models.BackupTasks._parse_manifest(manifest)